@@ -0,0 +1,75 @@
+"""partition_play_by_play_by_season
+
+Revision ID: d4b7a2e9c615
+Revises: a91d3c5e7f20
+Create Date: 2026-10-18 17:32:44.218903
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b7a2e9c615'
+down_revision = 'a91d3c5e7f20'
+branch_labels = None
+depends_on = None
+
+# seasons that get a partition up front, the pipeline creates the others as it loads them
+SEASONS = range(2009, 2021)
+INDEXES = {
+    'ix_play_by_play_game_id_play_id': ('game_id', 'play_id'),
+    'ix_play_by_play_posteam_game_id': ('posteam', 'game_id'),
+    'ix_play_by_play_defteam_game_id': ('defteam', 'game_id'),
+    'ix_play_by_play_play_type_game_id': ('play_type', 'game_id'),
+}
+
+
+def _season_game_id_range(season):
+    # same as models.season_game_id_range, migrations don't import the models
+    return season * 10**6 + 30100, (season + 1) * 10**6 + 30100
+
+
+def _get_seasons(table_name):
+    """Gets the seasons to partition, the ones in SEASONS and the ones with plays in table_name."""
+    conn = op.get_bind()
+    rows = conn.execute(f"SELECT DISTINCT (game_id - 30100) / 1000000 FROM {table_name}")
+    return sorted(set(SEASONS) | {row[0] for row in rows})
+
+
+def upgrade():
+    op.rename_table('play_by_play', 'play_by_play_unpartitioned')
+    op.execute("ALTER TABLE play_by_play_unpartitioned "
+               "RENAME CONSTRAINT play_by_play_pkey TO play_by_play_unpartitioned_pkey")
+    for index_name in INDEXES:
+        op.drop_index(index_name, table_name='play_by_play_unpartitioned')
+
+    op.execute("CREATE TABLE play_by_play (LIKE play_by_play_unpartitioned INCLUDING DEFAULTS) "
+               "PARTITION BY RANGE (game_id)")
+    op.create_primary_key('play_by_play_pkey', 'play_by_play', ['play_id', 'game_id'])
+    for index_name, columns in INDEXES.items():
+        op.create_index(index_name, 'play_by_play', list(columns), unique=False)
+
+    for season in _get_seasons('play_by_play_unpartitioned'):
+        start, end = _season_game_id_range(season)
+        op.execute(f"CREATE TABLE play_by_play_{season} PARTITION OF play_by_play "
+                   f"FOR VALUES FROM ({start}) TO ({end})")
+
+    op.execute("INSERT INTO play_by_play SELECT * FROM play_by_play_unpartitioned")
+    op.drop_table('play_by_play_unpartitioned')
+
+
+def downgrade():
+    op.rename_table('play_by_play', 'play_by_play_partitioned')
+    op.execute("ALTER TABLE play_by_play_partitioned "
+               "RENAME CONSTRAINT play_by_play_pkey TO play_by_play_partitioned_pkey")
+    for index_name in INDEXES:
+        op.drop_index(index_name, table_name='play_by_play_partitioned')
+
+    op.execute("CREATE TABLE play_by_play (LIKE play_by_play_partitioned INCLUDING DEFAULTS)")
+    op.create_primary_key('play_by_play_pkey', 'play_by_play', ['play_id', 'game_id'])
+    op.execute("INSERT INTO play_by_play SELECT * FROM play_by_play_partitioned")
+    for index_name, columns in INDEXES.items():
+        op.create_index(index_name, 'play_by_play', list(columns), unique=False)
+
+    # drops the partitions with it
+    op.drop_table('play_by_play_partitioned')
@@ -0,0 +1,260 @@
+"""
+Situational analytics over play_by_play, answered in memory instead of in
+the database: "3rd and 7+ in the 4th quarter within one score, average epa
+and wpa" over every season.
+
+The columns of situations are loaded once per season into numpy arrays (see
+SeasonStore), and a situation is evaluated as boolean masks over them, then
+aggregated with vectorized sums. Only SITUATION_COLUMNS and METRIC_COLUMNS
+are loaded, a few MB per season, from the season's arrow store file written
+by the pipeline if there's one, from the database otherwise. Teams are held
+as their int16 codes, see pipeline/encoding.py.
+
+Example usage:
+    situation = {'down': [3], 'ydstogo': (7, None), 'qtr': [4], 'score_differential': (-8, 8)}
+    seasons = [analytics.season_store.get(db_conn, season) for season in range(2011, 2020)]
+    results = analytics.aggregate(seasons, situation, group_by='season')
+"""
+from collections import namedtuple
+import os
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+import cache
+import config
+import models
+from pipeline import (
+    config as pipeline_config,
+    encoding,
+    etl_tools
+)
+
+# filters matching any of a list of values
+TEAM_FILTERS = ('posteam', 'defteam')
+VALUE_FILTERS = ('down', 'qtr', 'play_type', *TEAM_FILTERS)
+# filters matching an inclusive (low, high) range, either bound can be None
+RANGE_FILTERS = ('ydstogo', 'score_differential', 'yardline_100', 'game_seconds_remaining')
+SITUATION_COLUMNS = VALUE_FILTERS + RANGE_FILTERS
+METRIC_COLUMNS = ('epa', 'wpa')
+GROUP_BY = ('season', 'down', 'qtr', 'play_type', *TEAM_FILTERS)
+
+# play types get the same int8 code in every season, others are -1 like nulls
+PLAY_TYPES = (
+    'pass', 'run', 'punt', 'field_goal', 'kickoff', 'extra_point', 'qb_kneel', 'qb_spike', 'no_play'
+)
+
+SEASON_QUERY = """
+SELECT {columns}
+FROM play_by_play
+WHERE game_id >= :start AND game_id < :end
+"""
+
+SeasonArrays = namedtuple('SeasonArrays', ['season', 'columns'])
+
+
+def to_arrays(df, season):
+    """Converts the plays of a season to the arrays situations are evaluated on.
+
+    - play_type becomes int8 codes of PLAY_TYPES, -1 for nulls and other types
+    - posteam and defteam become int16 codes of encoding.TEAMS, encoding.NULL_CODE
+      for nulls. They're already codes in the arrow store files
+    - other situation columns become float32, metric columns float64, with
+      nulls as NaN so no comparison matches them
+
+    :param df: plays, with SITUATION_COLUMNS and METRIC_COLUMNS
+    :type df: pandas.DataFrame
+    :param season: season of the plays
+    :type season: int
+    :return: the arrays of the season
+    :rtype: SeasonArrays
+    """
+    columns = {'play_type': pd.Categorical(df['play_type'], categories=PLAY_TYPES).codes.astype('int8')}
+    teams = encoding.encode_teams(df[list(TEAM_FILTERS)])
+    for column in TEAM_FILTERS:
+        columns[column] = teams[column].values.astype(encoding.TEAM_DTYPE)
+    for column in SITUATION_COLUMNS:
+        if column != 'play_type' and column not in TEAM_FILTERS:
+            columns[column] = df[column].astype('float32').values
+    for column in METRIC_COLUMNS:
+        columns[column] = df[column].astype('float64').values
+    return SeasonArrays(season, columns)
+
+
+def load_season(db_conn, season):
+    """Reads the plays of a season, as arrays. They're read from the memory
+    mapped arrow store file of the season if the pipeline wrote it, from
+    play_by_play otherwise (only its partition is scanned).
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param season: season, e.g. 2019
+    :type season: int
+    :return: the arrays of the season
+    :rtype: SeasonArrays
+    """
+    columns = SITUATION_COLUMNS + METRIC_COLUMNS
+    store_path = pipeline_config.PLAY_BY_PLAY_STORE_TEMPLATE.format(season)
+    if os.path.exists(store_path):
+        return to_arrays(etl_tools.extract_from_arrow_store(store_path, columns).to_pandas(), season)
+
+    start, end = models.season_game_id_range(season)
+    query = SEASON_QUERY.format(columns=", ".join(columns))
+    df = pd.read_sql(sa.text(query), db_conn, params={'start': start, 'end': end})
+    return to_arrays(df, season)
+
+
+class SeasonStore:
+    """Per-process cache of the arrays of each season, safe to share between
+    threads. Seasons are loaded on first use, and dropped when the pipeline
+    bumps the version of play_by_play. Bumps of other tables leave them be.
+
+    :param max_seasons: number of seasons kept, the least recently used are evicted first
+    :type max_seasons: int
+    :param ttl: seconds a season is kept for
+    :type ttl: float
+    """
+
+    def __init__(self, max_seasons=config.ANALYTICS_MAX_SEASONS, ttl=config.ANALYTICS_SEASON_TTL):
+        self._cache = cache.ResponseCache(max_entries=max_seasons, ttl=ttl, tables=('play_by_play',))
+
+    def get(self, db_conn, season):
+        """Gets the arrays of a season, loading them if they aren't cached.
+
+        :param db_conn: sqlalchemy database connection
+        :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+        :param season: season, e.g. 2019
+        :type season: int
+        :return: the arrays of the season
+        :rtype: SeasonArrays
+        """
+        key = (season, self._cache.get_data_version(db_conn))
+        arrays = self._cache.get(key)
+        if arrays is None:
+            arrays = load_season(db_conn, season)
+            self._cache.set(key, arrays)
+        return arrays
+
+    def get_metrics(self):
+        """Gets the hit/miss counters and the number of cached seasons.
+
+        :return: dict of {metric name: value}
+        :rtype: dict
+        """
+        return self._cache.get_metrics()
+
+
+def get_mask(arrays, situation):
+    """Evaluates a situation over the plays of a season.
+
+    :param arrays: the arrays of the season
+    :type arrays: SeasonArrays
+    :param situation: dict of {filter: values} for VALUE_FILTERS, and
+        {filter: (low, high)} for RANGE_FILTERS. Filters not in it match every play
+    :type situation: dict
+    :raises ValueError: if a filter isn't in VALUE_FILTERS or RANGE_FILTERS
+    :return: boolean mask of the plays in the situation
+    :rtype: numpy.ndarray
+    """
+    invalid_filters = set(situation) - set(SITUATION_COLUMNS)
+    if invalid_filters:
+        raise ValueError(f"Invalid situation filters: {', '.join(sorted(invalid_filters))}")
+
+    columns = arrays.columns
+    mask = np.ones(len(columns['play_type']), dtype=bool)
+    for name, values in situation.items():
+        if name == 'play_type':
+            mask &= np.isin(columns[name], [PLAY_TYPES.index(value) for value in values if value in PLAY_TYPES])
+        elif name in TEAM_FILTERS:
+            codes = [encoding.TEAM_CODES[value] for value in values if value in encoding.TEAM_CODES]
+            mask &= np.isin(columns[name], codes)
+        elif name in VALUE_FILTERS:
+            mask &= np.isin(columns[name], values)
+        else:
+            low, high = values
+            if low is not None:
+                mask &= columns[name] >= low
+            if high is not None:
+                mask &= columns[name] <= high
+    return mask
+
+
+def aggregate(seasons, situation, group_by=None):
+    """Aggregates the metrics of the plays in a situation, over seasons.
+
+    Metrics, over the plays with a value for them:
+    - plays: number of plays
+    - epa_per_play, total_epa, success_rate (share of plays with epa > 0)
+    - wpa_per_play, total_wpa
+
+    :param seasons: the arrays of the seasons, see SeasonStore
+    :type seasons: list of SeasonArrays
+    :param situation: the situation, see get_mask
+    :type situation: dict
+    :param group_by: aggregate by one of GROUP_BY, defaults to None (one row)
+    :type group_by: str, optional
+    :raises ValueError: if group_by isn't in GROUP_BY
+    :return: one row of metrics per group, ordered by group
+    :rtype: pandas.DataFrame
+    """
+    if group_by is not None and group_by not in GROUP_BY:
+        raise ValueError(f"{group_by} not an accepted value for group_by. Must be ({'|'.join(GROUP_BY)})")
+
+    keys, epa, wpa = [], [], []
+    for arrays in seasons:
+        mask = get_mask(arrays, situation)
+        epa.append(arrays.columns['epa'][mask])
+        wpa.append(arrays.columns['wpa'][mask])
+        if group_by == 'season':
+            keys.append(np.full(mask.sum(), arrays.season, dtype='int32'))
+        elif group_by is not None:
+            # nulls are grouped under -1
+            values = arrays.columns[group_by][mask]
+            keys.append(np.where(np.isnan(values), -1, values).astype('int32'))
+
+    epa = np.concatenate(epa) if epa else np.empty(0)
+    wpa = np.concatenate(wpa) if wpa else np.empty(0)
+    if group_by is None:
+        groups, inverse = np.zeros(1, dtype='int32'), np.zeros(len(epa), dtype='int64')
+    else:
+        groups, inverse = np.unique(np.concatenate(keys) if keys else np.empty(0, dtype='int32'), return_inverse=True)
+
+    results = pd.DataFrame({
+        'plays': np.bincount(inverse, minlength=len(groups)),
+        **_aggregate_metric('epa', epa, inverse, len(groups)),
+        'success_rate': _safe_divide(
+            np.bincount(inverse, weights=epa > 0, minlength=len(groups)),
+            np.bincount(inverse, weights=~np.isnan(epa), minlength=len(groups))
+        ),
+        **_aggregate_metric('wpa', wpa, inverse, len(groups))
+    })
+    if group_by is None:
+        return results
+
+    if group_by == 'play_type':
+        groups = [PLAY_TYPES[group] if group >= 0 else None for group in groups]
+    elif group_by in TEAM_FILTERS:
+        groups = pd.Series([encoding.TEAMS[group] if group >= 0 else None for group in groups], dtype=object)
+    elif group_by != 'season':
+        # object, so nulls don't turn the ints into floats
+        groups = pd.Series([int(group) if group >= 0 else None for group in groups], dtype=object)
+    results.insert(0, group_by, groups)
+    return results
+
+
+def _aggregate_metric(name, values, inverse, n_groups):
+    """Sums and averages a metric by group, ignoring NaNs."""
+    valid = ~np.isnan(values)
+    total = np.bincount(inverse, weights=np.where(valid, values, 0), minlength=n_groups)
+    count = np.bincount(inverse, weights=valid, minlength=n_groups)
+    return {f'{name}_per_play': _safe_divide(total, count), f'total_{name}': total}
+
+
+def _safe_divide(numerator, denominator):
+    """Divides element-wise, NaN where the denominator is 0."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+season_store = SeasonStore()
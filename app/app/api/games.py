@@ -1,8 +1,60 @@
+import api_utils
+from pipeline import config as pipeline_config
 
-import pandas as pd
+QUERY = """
+SELECT *
+FROM games
+WHERE state_of_game = 'POST'
+{filters}
+ORDER BY game_id DESC
+LIMIT :fetch_limit
+"""
+
+FILTERS = {
+    'season': "AND season = ANY(:season)",
+    'type': "AND type = ANY(:type)",
+    'week': "AND week = ANY(:week)",
+    'team': "AND (home_team = ANY(:team) OR away_team = ANY(:team))",
+    'after': "AND game_id < :after"
+}
 
 
 def main(db_conn, **kwargs):
-    query = "SELECT * FROM games WHERE state_of_game = 'POST' ORDER BY game_id DESC"
-    results = pd.read_sql(query, db_conn)
-    return results.to_json(orient="records")
+    """Gets finished games, most recent first, a page at a time.
+
+    Query parameters (all optional, season/type/week/team can be repeated):
+    - season, type, week, team: only return matching games
+    - limit: page size
+    - after: only return games before this game_id. The X-Next-After header
+      of a response holds the value to pass to get its next page.
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    - stream: stream the games instead (json and ndjson only).
+      Streamed responses have no page size limit and no X-Next-After header
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['main'])
+
+
+def _build_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query, see
+    api_utils.get_page_limits for its limit.
+
+    :return: query, its params, and the limit
+    :rtype: tuple of (str, dict, int | None)
+    """
+    params = {
+        'season': api_utils.get_list(kwargs, 'season', int),
+        'type': api_utils.get_list(kwargs, 'type', choices=pipeline_config.SEASON_TYPES),
+        'week': api_utils.get_list(kwargs, 'week', int),
+        'team': [team.upper() for team in api_utils.get_list(kwargs, 'team')],
+        'after': api_utils.get_value(kwargs, 'after', int)
+    }
+    params = {name: value for name, value in params.items() if value not in (None, [])}
+    filters = "\n".join(FILTERS[name] for name in FILTERS if name in params)
+    limit, params['fetch_limit'] = api_utils.get_page_limits(kwargs, stream)
+    return QUERY.format(filters=filters), params, limit
+
+
+QUERY_BUILDERS = {
+    'main': api_utils.QueryBuilder(_build_query, ('game_id',))
+}
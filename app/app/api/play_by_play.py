@@ -0,0 +1,104 @@
+import api_utils
+import models
+
+QUERY = """
+SELECT {columns}
+FROM play_by_play
+WHERE TRUE
+{filters}
+ORDER BY game_id, play_id
+LIMIT :fetch_limit
+"""
+
+FILTERS = {
+    'game_id': "AND game_id = ANY(:game_id)",
+    'team': "AND (posteam = ANY(:team) OR defteam = ANY(:team))",
+    'play_type': "AND play_type = ANY(:play_type)",
+    'down': "AND down = ANY(:down)",
+    'qtr': "AND qtr = ANY(:qtr)",
+    'after': "AND (game_id, play_id) > (:after_game_id, :after_play_id)"
+}
+
+COLUMNS = tuple(column.name for column in models.PlayByPlay.__table__.columns)
+# always returned, they're the cursor of the pagination
+KEY_COLUMNS = ('game_id', 'play_id')
+DEFAULT_COLUMNS = KEY_COLUMNS + (
+    'posteam', 'defteam', 'qtr', 'down', 'ydstogo', 'yardline_100', 'play_type', 'yards_gained', 'epa', 'desc'
+)
+
+
+def main(db_conn, **kwargs):
+    """Gets plays, in the order they were played, a page at a time.
+
+    Query parameters (all optional, every filter can be repeated):
+    - columns: columns of models.PlayByPlay to return, comma separated.
+      game_id and play_id are always returned. Defaults to DEFAULT_COLUMNS
+    - game_id, season, team, play_type, down, qtr: only return matching plays.
+      team matches the team on offense or defense
+    - limit: page size
+    - after: only return plays after this game_id,play_id. The X-Next-After
+      header of a response holds the value to pass to get its next page.
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    - stream: stream the plays instead (json and ndjson only).
+      Streamed responses have no page size limit and no X-Next-After header
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['main'])
+
+
+def _build_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query, selecting
+    only the requested columns. See api_utils.get_page_limits for its limit.
+
+    :return: query, its params, and the limit
+    :rtype: tuple of (str, dict, int | None)
+    """
+    columns = _get_columns(kwargs)
+    params = {
+        'game_id': api_utils.get_list(kwargs, 'game_id', int),
+        'team': [team.upper() for team in api_utils.get_list(kwargs, 'team')],
+        'play_type': api_utils.get_list(kwargs, 'play_type'),
+        'down': api_utils.get_list(kwargs, 'down', int, choices=(1, 2, 3, 4)),
+        'qtr': api_utils.get_list(kwargs, 'qtr', int)
+    }
+    params = {name: value for name, value in params.items() if value}
+    filters = [FILTERS[name] for name in FILTERS if name in params]
+
+    # seasons are game_id ranges, so they use the game_id index
+    seasons = api_utils.get_list(kwargs, 'season', int)
+    if seasons:
+        season_filters = []
+        for i, season in enumerate(seasons):
+            params[f'season_start_{i}'], params[f'season_end_{i}'] = models.season_game_id_range(season)
+            season_filters.append(f"(game_id >= :season_start_{i} AND game_id < :season_end_{i})")
+        filters.append(f"AND ({' OR '.join(season_filters)})")
+
+    after = api_utils.get_value(kwargs, 'after', _parse_after)
+    if after is not None:
+        params['after_game_id'], params['after_play_id'] = after
+        filters.append(FILTERS['after'])
+
+    limit, params['fetch_limit'] = api_utils.get_page_limits(kwargs, stream)
+
+    query = QUERY.format(columns=", ".join(f'"{column}"' for column in columns), filters="\n".join(filters))
+    return query, params, limit
+
+
+def _get_columns(kwargs):
+    """Gets the columns to select from the columns parameter, key columns first.
+
+    :return: column names
+    :rtype: list of str
+    """
+    return api_utils.get_columns(kwargs, COLUMNS, KEY_COLUMNS, DEFAULT_COLUMNS)
+
+
+def _parse_after(value):
+    """Parses the cursor of a page, game_id,play_id."""
+    game_id, play_id = value.split(",")
+    return int(game_id), int(play_id)
+
+
+QUERY_BUILDERS = {
+    'main': api_utils.QueryBuilder(_build_query, KEY_COLUMNS)
+}
@@ -0,0 +1,336 @@
+import re
+
+from flask import abort
+
+import api_utils
+import models
+import play_by_play
+from pipeline import (
+    config as pipeline_config,
+    player_stats,
+    players as pipeline_players
+)
+
+QUERY = """
+SELECT player_key, player_id, player_name
+FROM players
+WHERE TRUE
+{filters}
+ORDER BY player_key
+LIMIT :fetch_limit
+"""
+
+# the plays of the players, through the play_participants index on (player_key, game_id, play_id)
+PLAYS_QUERY = """
+SELECT players.player_id, players.player_name, participant.role, {columns}
+FROM players
+JOIN play_participants AS participant ON participant.player_key = players.player_key
+JOIN play_by_play AS pbp ON pbp.game_id = participant.game_id AND pbp.play_id = participant.play_id
+WHERE players.player_id = ANY(:player_id)
+{filters}
+ORDER BY participant.game_id, participant.play_id, participant.role
+LIMIT :fetch_limit
+"""
+
+# the season stat lines of players, summed from player_game_stats with its (player_key, season, type) index
+SEASON_STATS_CTE = """
+WITH season_stats AS (
+    SELECT player_key, season, type, string_agg(DISTINCT team, ',') AS teams, COUNT(*) AS games,
+           {player_stats}
+    FROM player_game_stats
+    WHERE TRUE
+    {filters}
+    GROUP BY player_key, season, type
+)
+"""
+
+SEASON_STATS_QUERY = SEASON_STATS_CTE + """
+SELECT player_key, player_id, player_name, season, type, teams, games, {columns}
+FROM season_stats
+JOIN players USING (player_key)
+ORDER BY player_key, season, type
+LIMIT :fetch_limit
+"""
+
+LEADERBOARD_QUERY = SEASON_STATS_CTE + """
+SELECT player_key, player_id, player_name, season, type, teams, games, {columns}
+FROM season_stats
+JOIN players USING (player_key)
+WHERE {volume} >= :min_plays
+ORDER BY {stat} DESC NULLS LAST, player_key
+LIMIT :fetch_limit
+"""
+
+# {rate: (expression over the season stat lines, the stat counting the plays it's over)}
+RATES = {
+    'completion_rate': ("completions::float / NULLIF(attempts, 0)", 'attempts'),
+    'yards_per_attempt': ("passing_yards::float / NULLIF(attempts, 0)", 'attempts'),
+    'passing_epa_per_play': ("passing_epa / NULLIF(attempts + sacks, 0)", 'attempts'),
+    'yards_per_carry': ("rushing_yards::float / NULLIF(carries, 0)", 'carries'),
+    'rushing_epa_per_carry': ("rushing_epa / NULLIF(carries, 0)", 'carries'),
+    'catch_rate': ("receptions::float / NULLIF(targets, 0)", 'targets'),
+    'yards_per_target': ("receiving_yards::float / NULLIF(targets, 0)", 'targets'),
+    'receiving_epa_per_target': ("receiving_epa / NULLIF(targets, 0)", 'targets')
+}
+# {stat or rate: the stat counting the plays it's over}, what the leaderboards can be ranked by
+STAT_VOLUMES = {
+    **{stat: volume for stats, volume in player_stats.STAT_CATEGORIES.values() for stat in stats},
+    **{rate: volume for rate, (_, volume) in RATES.items()}
+}
+
+SEASON_STATS_FILTERS = {
+    'player_id': "AND player_key IN (SELECT player_key FROM players WHERE player_id = ANY(:player_id))",
+    'season': "AND season = ANY(:season)",
+    'type': "AND type = ANY(:type)",
+    'team': "AND team = ANY(:team)",
+    'after': "AND (player_key, season, type) > (:after_player_key, :after_season, :after_type)"
+}
+
+FILTERS = {
+    'player_id': "AND player_id = ANY(:player_id)",
+    'name': "AND player_name ILIKE :name",
+    'after': "AND player_key > :after"
+}
+
+PLAYS_FILTERS = {
+    'role': "AND participant.role = ANY(:role)",
+    'after': "AND (participant.game_id, participant.play_id, participant.role) > "
+             "(:after_game_id, :after_play_id, :after_role)"
+}
+
+# LIKE wildcards in a name are matched literally
+LIKE_ESCAPE_PATTERN = re.compile(r'[\\%_]')
+
+# always returned by plays, they're the cursor of its pagination
+PLAYS_KEY_COLUMNS = ('game_id', 'play_id', 'role')
+
+
+def main(db_conn, **kwargs):
+    """Gets players, a page at a time.
+
+    Query parameters (all optional):
+    - player_id: only return these players, can be repeated
+    - name: only return players whose name contains this, case insensitive
+    - limit: page size
+    - after: only return players after this player_key. The X-Next-After
+      header of a response holds the value to pass to get its next page.
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    - stream: stream the players instead (json and ndjson only)
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['main'])
+
+
+def plays(db_conn, **kwargs):
+    """Gets the plays players took part in, in the order they were played, a
+    page at a time. There's one row per player per role per play, e.g. a
+    play where a player is the passer and fumbled_1 is returned twice.
+
+    Query parameters (player_id is required, filters can be repeated):
+    - player_id: the players
+    - columns: columns of models.PlayByPlay to return, see api/play_by_play
+    - role: only return plays where the players had these roles (passer,
+      receiver, solo_tackle_1...), see pipeline/players.ROLES
+    - season: only return plays of these seasons
+    - limit: page size
+    - after: only return plays after this game_id,play_id,role. The
+      X-Next-After header of a response holds the value to pass to get its next page.
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    - stream: stream the plays instead (json and ndjson only).
+      Streamed responses have no page size limit and no X-Next-After header
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['plays'])
+
+
+def season_stats(db_conn, **kwargs):
+    """Gets the season stat lines of players (passing, rushing and receiving
+    totals and rates), one row per player per season type, a page at a time.
+
+    Query parameters (all optional, filters can be repeated):
+    - player_id, season, type, team: only return matching stat lines. team
+      only counts the games a player played for it
+    - limit: page size
+    - after: only return stat lines after this player_key,season,type. The
+      X-Next-After header of a response holds the value to pass to get its next page.
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    - stream: stream the stat lines instead (json and ndjson only).
+      Streamed responses have no page size limit and no X-Next-After header
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['season_stats'])
+
+
+def leaderboard(db_conn, **kwargs):
+    """Gets the leaders of a season in a stat or rate, best first.
+
+    Query parameters (stat and season are required):
+    - stat: the stat or rate to rank by, see STAT_VOLUMES
+    - season: the season
+    - type: the season type, defaults to reg
+    - team: only count the games played for these teams, can be repeated
+    - min_plays: only rank players with at least this many plays of the
+      stat's kind (attempts, carries or targets), defaults to 1
+    - limit: number of players
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['leaderboard'])
+
+
+def _build_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query of players,
+    see api_utils.get_page_limits for its limit.
+
+    :return: query, its params, and the limit
+    :rtype: tuple of (str, dict, int | None)
+    """
+    params = {
+        'player_id': api_utils.get_list(kwargs, 'player_id'),
+        'name': api_utils.get_value(kwargs, 'name'),
+        'after': api_utils.get_value(kwargs, 'after', int)
+    }
+    params = {name: value for name, value in params.items() if value not in (None, [])}
+    if 'name' in params:
+        params['name'] = f"%{LIKE_ESCAPE_PATTERN.sub(_escape_like, params['name'])}%"
+    filters = "\n".join(FILTERS[name] for name in FILTERS if name in params)
+    limit, params['fetch_limit'] = api_utils.get_page_limits(kwargs, stream)
+    return QUERY.format(filters=filters), params, limit
+
+
+def _build_plays_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query of the plays
+    of players, selecting only the requested columns of play_by_play. See
+    api_utils.get_page_limits for its limit.
+
+    :return: query, its params, and the limit
+    :rtype: tuple of (str, dict, int | None)
+    """
+    params = {'player_id': api_utils.get_list(kwargs, 'player_id')}
+    if not params['player_id']:
+        abort(400, description="player_id is required")
+
+    role = api_utils.get_list(kwargs, 'role', choices=pipeline_players.ROLES)
+    filters = []
+    if role:
+        params['role'] = role
+        filters.append(PLAYS_FILTERS['role'])
+
+    # seasons are game_id ranges, so they use the play_participants index
+    seasons = api_utils.get_list(kwargs, 'season', int)
+    if seasons:
+        season_filters = []
+        for i, season in enumerate(seasons):
+            params[f'season_start_{i}'], params[f'season_end_{i}'] = models.season_game_id_range(season)
+            season_filters.append(
+                f"(participant.game_id >= :season_start_{i} AND participant.game_id < :season_end_{i})"
+            )
+        filters.append(f"AND ({' OR '.join(season_filters)})")
+
+    after = api_utils.get_value(kwargs, 'after', _parse_after)
+    if after is not None:
+        params['after_game_id'], params['after_play_id'], params['after_role'] = after
+        filters.append(PLAYS_FILTERS['after'])
+
+    limit, params['fetch_limit'] = api_utils.get_page_limits(kwargs, stream)
+
+    columns = api_utils.get_columns(
+        kwargs, play_by_play.COLUMNS, play_by_play.KEY_COLUMNS, play_by_play.DEFAULT_COLUMNS
+    )
+    columns = ", ".join(f'pbp."{column}"' for column in columns)
+    query = PLAYS_QUERY.format(columns=columns, filters="\n".join(filters))
+    return query, params, limit
+
+
+def _get_season_stats_params(kwargs):
+    """Gets the filters of the season stat lines from the query parameters, as params of the query."""
+    params = {
+        'player_id': api_utils.get_list(kwargs, 'player_id'),
+        'season': api_utils.get_list(kwargs, 'season', int),
+        'type': api_utils.get_list(kwargs, 'type', choices=pipeline_config.SEASON_TYPES),
+        'team': [team.upper() for team in api_utils.get_list(kwargs, 'team')]
+    }
+    return {name: value for name, value in params.items() if value}
+
+
+def _get_season_stats_columns():
+    """Gets the select list of the season stats columns, followed by their rates."""
+    return ", ".join([*player_stats.PLAYER_STATS, *(f"{rate} AS {name}" for name, (rate, _) in RATES.items())])
+
+
+def _format_season_stats_query(query, filters, **kwargs):
+    """Formats a query over the season stat lines, summing every stat of player_game_stats."""
+    return query.format(
+        player_stats=",\n           ".join(f"SUM({stat}) AS {stat}" for stat in player_stats.PLAYER_STATS),
+        filters="\n    ".join(filters),
+        columns=_get_season_stats_columns(),
+        **kwargs
+    )
+
+
+def _build_season_stats_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query of the season
+    stat lines, see api_utils.get_page_limits for its limit.
+
+    :return: query, its params, and the limit
+    :rtype: tuple of (str, dict, int | None)
+    """
+    params = _get_season_stats_params(kwargs)
+    filters = [SEASON_STATS_FILTERS[name] for name in SEASON_STATS_FILTERS if name in params]
+
+    after = api_utils.get_value(kwargs, 'after', _parse_season_stats_after)
+    if after is not None:
+        params['after_player_key'], params['after_season'], params['after_type'] = after
+        filters.append(SEASON_STATS_FILTERS['after'])
+
+    limit, params['fetch_limit'] = api_utils.get_page_limits(kwargs, stream)
+    return _format_season_stats_query(SEASON_STATS_QUERY, filters), params, limit
+
+
+def _build_leaderboard_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query of the
+    leaders of a season. It isn't paginated, the limit is the number of leaders.
+
+    :return: query, its params, and the limit (always None)
+    :rtype: tuple of (str, dict, None)
+    """
+    stat = api_utils.get_value(kwargs, 'stat', choices=tuple(STAT_VOLUMES))
+    season = api_utils.get_value(kwargs, 'season', int)
+    if stat is None or season is None:
+        abort(400, description="stat and season are required")
+
+    params = _get_season_stats_params(kwargs)
+    params['season'] = [season]
+    params['type'] = [api_utils.get_value(kwargs, 'type', choices=pipeline_config.SEASON_TYPES, default='reg')]
+    params['min_plays'] = api_utils.get_value(kwargs, 'min_plays', int, default=1)
+    params['fetch_limit'] = api_utils.get_limit(kwargs)
+    params.pop('player_id', None)
+
+    filters = [SEASON_STATS_FILTERS[name] for name in SEASON_STATS_FILTERS if name in params]
+    query = _format_season_stats_query(LEADERBOARD_QUERY, filters, stat=stat, volume=STAT_VOLUMES[stat])
+    return query, params, None
+
+
+def _parse_season_stats_after(value):
+    """Parses the cursor of a page of season stat lines, player_key,season,type."""
+    player_key, season, season_type = value.split(",")
+    return int(player_key), int(season), season_type
+
+
+def _escape_like(match):
+    """Escapes a LIKE wildcard, with LIKE's default escape character."""
+    return "\\" + match.group(0)
+
+
+def _parse_after(value):
+    """Parses the cursor of a page of plays, game_id,play_id,role."""
+    game_id, play_id, role = value.split(",")
+    return int(game_id), int(play_id), role
+
+
+QUERY_BUILDERS = {
+    'main': api_utils.QueryBuilder(_build_query, ('player_key',)),
+    'plays': api_utils.QueryBuilder(_build_plays_query, PLAYS_KEY_COLUMNS),
+    'season_stats': api_utils.QueryBuilder(_build_season_stats_query, ('player_key', 'season', 'type')),
+    'leaderboard': api_utils.QueryBuilder(_build_leaderboard_query, ('player_key',))
+}
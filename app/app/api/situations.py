@@ -0,0 +1,60 @@
+import analytics
+import api_utils
+from pipeline import (
+    config as pipeline_config,
+    encoding
+)
+
+RANGE_BOUNDS = ('min', 'max')
+
+
+def main(db_conn, **kwargs):
+    """Aggregates the plays of a situation (plays, epa and wpa per play,
+    success rate), over every season or the requested ones. Situations are
+    evaluated in memory, see analytics.py, so any combination of filters is
+    fast.
+
+    Query parameters (all optional, down/qtr/play_type/posteam/defteam/season can be repeated):
+    - down, qtr, play_type: only count plays with these values
+    - posteam, defteam: only count plays with these teams on offense/defense, e.g. NE
+    - ydstogo_min, ydstogo_max, score_differential_min, score_differential_max,
+      yardline_100_min, yardline_100_max, game_seconds_remaining_min,
+      game_seconds_remaining_max: only count plays within these bounds, inclusive.
+      score_differential is from the point of view of the team with the ball
+    - season: only count plays of these seasons. Defaults to every season
+      from START_SEASON to CURRENT_SEASON
+    - group_by: one row per season, down, qtr, play_type, posteam or defteam instead of one row
+    - format: the format of the response (json|arrow|parquet), see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given. It can't be streamed
+
+    Example, 3rd and 7+ in the 4th quarter within one score, by season:
+        /api/situations?down=3&ydstogo_min=7&qtr=4&score_differential_min=-8&score_differential_max=8&group_by=season
+    """
+    output_format, _ = api_utils.get_format(kwargs, streamable=False)
+    situation = _get_situation(kwargs)
+    group_by = api_utils.get_value(kwargs, 'group_by', choices=analytics.GROUP_BY)
+    seasons = api_utils.get_list(kwargs, 'season', int) or list(
+        range(pipeline_config.START_SEASON, pipeline_config.CURRENT_SEASON + 1)
+    )
+
+    season_arrays = [analytics.season_store.get(db_conn, season) for season in sorted(set(seasons))]
+    results = analytics.aggregate(season_arrays, situation, group_by)
+    return api_utils.make_response(results, output_format)
+
+
+def _get_situation(kwargs):
+    """Gets the situation from the query parameters, see analytics.get_mask.
+
+    :return: dict of {filter: values or (low, high)}, with only the filters that were given
+    :rtype: dict
+    """
+    situation = {
+        'down': api_utils.get_list(kwargs, 'down', int, choices=(1, 2, 3, 4)),
+        'qtr': api_utils.get_list(kwargs, 'qtr', int),
+        'play_type': api_utils.get_list(kwargs, 'play_type', choices=analytics.PLAY_TYPES)
+    }
+    for name in analytics.TEAM_FILTERS:
+        situation[name] = api_utils.get_list(kwargs, name, choices=encoding.TEAMS)
+    for name in analytics.RANGE_FILTERS:
+        situation[name] = tuple(api_utils.get_value(kwargs, f"{name}_{bound}", int) for bound in RANGE_BOUNDS)
+    return {name: values for name, values in situation.items() if any(value is not None for value in values)}
@@ -0,0 +1,144 @@
+import api_utils
+from pipeline import (
+    config as pipeline_config,
+    team_stats
+)
+
+# {rate: expression}, computed from the summed stats of team_season_stats or team_game_stats
+RATES = {
+    'epa_per_play': "epa / NULLIF(plays, 0)",
+    'success_rate': "successes::float / NULLIF(plays, 0)",
+    **{f'success_rate_down_{down}': f"successes_down_{down}::float / NULLIF(plays_down_{down}, 0)"
+       for down in range(1, 5)},
+    'def_epa_per_play': "def_epa / NULLIF(def_plays, 0)"
+}
+SEASON_RATES = {
+    'points_per_game': "points_for::float / NULLIF(games, 0)",
+    'points_allowed_per_game': "points_against::float / NULLIF(games, 0)",
+    **RATES
+}
+
+SEASON_QUERY = """
+SELECT {columns}
+FROM team_season_stats
+WHERE TRUE
+{filters}
+ORDER BY season DESC, type, team
+LIMIT :fetch_limit
+"""
+
+GAMES_QUERY = """
+SELECT {columns}
+FROM team_game_stats
+WHERE TRUE
+{filters}
+ORDER BY game_id, team
+LIMIT :fetch_limit
+"""
+
+FILTERS = {
+    'game_id': "AND game_id = ANY(:game_id)",
+    'season': "AND season = ANY(:season)",
+    'type': "AND type = ANY(:type)",
+    'week': "AND week = ANY(:week)",
+    'team': "AND team = ANY(:team)",
+    'after': "AND (game_id, team) > (:after_game_id, :after_team)"
+}
+
+
+def main(db_conn, **kwargs):
+    """Gets the stats of teams by season and season type, with their rates
+    (points per game, epa per play, success rate by down...). There's one
+    row per team per season type, so it isn't paginated.
+
+    Query parameters (all optional, season/type/team can be repeated):
+    - season, type, team: only return matching rows
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    - stream: stream the rows instead (json and ndjson only)
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['main'])
+
+
+def games(db_conn, **kwargs):
+    """Gets the stats of teams in each game, with their rates, in the order
+    the games were played, a page at a time.
+
+    Query parameters (all optional, every filter can be repeated):
+    - game_id, season, type, week, team: only return matching rows
+    - limit: page size
+    - after: only return rows after this game_id,team. The X-Next-After
+      header of a response holds the value to pass to get its next page.
+    - format: the format of the response, see api_utils.get_format.
+      Defaults to json, negotiated from the Accept header if not given
+    - stream: stream the rows instead (json and ndjson only).
+      Streamed responses have no page size limit and no X-Next-After header
+    """
+    return api_utils.run_query(db_conn, kwargs, QUERY_BUILDERS['games'])
+
+
+def _get_params(kwargs, names):
+    """Gets the filters in names from the query parameters, as params of the query."""
+    params = {
+        'game_id': api_utils.get_list(kwargs, 'game_id', int),
+        'season': api_utils.get_list(kwargs, 'season', int),
+        'type': api_utils.get_list(kwargs, 'type', choices=pipeline_config.SEASON_TYPES),
+        'week': api_utils.get_list(kwargs, 'week', int),
+        'team': [team.upper() for team in api_utils.get_list(kwargs, 'team')]
+    }
+    return {name: value for name, value in params.items() if name in names and value}
+
+
+def _get_columns(columns, rates):
+    """Gets the select list of the stats columns, followed by their rates."""
+    return ", ".join([*columns, *(f"{rate} AS {name}" for name, rate in rates.items())])
+
+
+def _build_season_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query of team_season_stats.
+
+    :return: query, its params, and the limit (always None)
+    :rtype: tuple of (str, dict, None)
+    """
+    params = _get_params(kwargs, ('season', 'type', 'team'))
+    params['fetch_limit'] = None
+    query = SEASON_QUERY.format(
+        columns=_get_columns(team_stats.TEAM_SEASON_STATS_COLUMNS, SEASON_RATES),
+        filters="\n".join(FILTERS[name] for name in FILTERS if name in params)
+    )
+    return query, params, None
+
+
+def _build_games_query(kwargs, stream=False):
+    """Compiles the query parameters into a parameterized query of
+    team_game_stats, see api_utils.get_page_limits for its limit.
+
+    :return: query, its params, and the limit
+    :rtype: tuple of (str, dict, int | None)
+    """
+    params = _get_params(kwargs, ('game_id', 'season', 'type', 'week', 'team'))
+    filters = [FILTERS[name] for name in FILTERS if name in params]
+
+    after = api_utils.get_value(kwargs, 'after', _parse_after)
+    if after is not None:
+        params['after_game_id'], params['after_team'] = after
+        filters.append(FILTERS['after'])
+
+    limit, params['fetch_limit'] = api_utils.get_page_limits(kwargs, stream)
+    query = GAMES_QUERY.format(
+        columns=_get_columns(team_stats.TEAM_GAME_STATS_COLUMNS, RATES),
+        filters="\n".join(filters)
+    )
+    return query, params, limit
+
+
+def _parse_after(value):
+    """Parses the cursor of a page, game_id,team."""
+    game_id, team = value.split(",")
+    return int(game_id), team.upper()
+
+
+QUERY_BUILDERS = {
+    'main': api_utils.QueryBuilder(_build_season_query, ('season', 'type', 'team')),
+    'games': api_utils.QueryBuilder(_build_games_query, ('game_id', 'team'))
+}
@@ -0,0 +1,402 @@
+"""
+Helpers shared by the api controllers, for parsing the query parameters that
+api_handler passes in as kwargs. Every kwarg is a list, as a parameter can be
+given more than once (e.g. ?season=2018&season=2019).
+
+Invalid parameters abort the request with a 400.
+
+Responses are json by default. Other formats are picked with ?format= or the
+Accept header (see main.api_handler):
+- ndjson, one json object per line, always streamed
+- json with ?stream=true, a json array sent in chunks
+- arrow (an Arrow IPC stream) and parquet, for dataframes, skipping the json
+  encoding and parsing on both ends
+
+Example usage:
+    seasons = api_utils.get_list(kwargs, 'season', int)
+    limit = api_utils.get_limit(kwargs)
+"""
+from collections import namedtuple
+import datetime
+import io
+import json
+
+from flask import (
+    abort,
+    Response,
+    stream_with_context
+)
+import pandas as pd
+import pyarrow as pa
+import sqlalchemy as sa
+
+import config
+
+NEXT_AFTER_HEADER = 'X-Next-After'
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+FORMATS = tuple(CONTENT_TYPES)
+STREAM_FORMATS = ('json', 'ndjson')
+# formats a whole response can be serialized to, see make_response
+RESPONSE_FORMATS = ('json', 'arrow', 'parquet')
+# what a stream of each format is wrapped in
+STREAM_START = {'json': "[", 'ndjson': ""}
+STREAM_END = {'json': "]", 'ndjson': ""}
+BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+# dates in json responses, cut to milliseconds, as df.to_json(date_format='iso') writes them
+ISO_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# how an entrypoint that runs a single paginated query builds it, see run_query.
+# Controllers list theirs in QUERY_BUILDERS, {entrypoint name: QueryBuilder},
+# which the async app (asgi.py) runs natively.
+# - build(kwargs, stream) returns the query, its params and the page size
+# - key_columns are the columns the query is ordered by, the cursor of the next page
+QueryBuilder = namedtuple('QueryBuilder', ['build', 'key_columns'])
+
+
+def get_list(kwargs, name, convert=str, choices=None):
+    """Gets every value of a query parameter.
+
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param name: name of the parameter
+    :type name: str
+    :param convert: function converting a value from str, e.g. int
+    :type convert: callable
+    :param choices: accepted values, after conversion. Anything goes if None
+    :type choices: collection | None
+    :return: converted values, empty if the parameter wasn't given
+    :rtype: list
+    """
+    values = []
+    for value in kwargs.get(name, []):
+        try:
+            value = convert(value)
+        except ValueError:
+            abort(400, description=f"Invalid value for {name}: {value}")
+
+        if choices is not None and value not in choices:
+            abort(400, description=f"Invalid value for {name}: {value}. Must be one of ({'|'.join(map(str, choices))})")
+        values.append(value)
+    return values
+
+
+def get_value(kwargs, name, convert=str, choices=None, default=None):
+    """Gets the single value of a query parameter.
+
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param name: name of the parameter
+    :type name: str
+    :param convert: function converting a value from str, e.g. int
+    :type convert: callable
+    :param choices: accepted values, after conversion. Anything goes if None
+    :type choices: collection | None
+    :param default: value returned if the parameter wasn't given
+    :return: converted value
+    """
+    values = get_list(kwargs, name, convert, choices)
+    if len(values) > 1:
+        abort(400, description=f"{name} can only be given once, got {len(values)} values")
+    return values[0] if values else default
+
+
+def get_bool(kwargs, name, default=False):
+    """Gets a true/false (or 1/0) query parameter.
+
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param name: name of the parameter
+    :type name: str
+    :param default: value returned if the parameter wasn't given
+    :type default: bool
+    :return: value of the parameter
+    :rtype: bool
+    """
+    value = get_value(kwargs, name, str.lower, choices=BOOLEANS)
+    return default if value is None else BOOLEANS[value]
+
+
+def get_columns(kwargs, columns, key_columns=(), default_columns=None):
+    """Gets the columns to select from the columns query parameter (comma
+    separated, can be repeated), key columns first.
+
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param columns: columns that can be selected
+    :type columns: collection of str
+    :param key_columns: columns that are always selected, e.g. the cursor of the pagination
+    :type key_columns: tuple of str
+    :param default_columns: columns selected if none are requested, defaults to all of them
+    :type default_columns: tuple of str | None
+    :return: column names
+    :rtype: list of str
+    """
+    requested = [column.strip() for value in kwargs.get('columns', []) for column in value.split(",")]
+    requested = [column for column in requested if column]
+    if not requested:
+        return list(default_columns or columns)
+
+    invalid_columns = [column for column in requested if column not in columns]
+    if invalid_columns:
+        abort(400, description=f"Invalid columns: {', '.join(invalid_columns)}")
+
+    return list(key_columns) + [column for column in dict.fromkeys(requested) if column not in key_columns]
+
+
+def get_format(kwargs, streamable=True):
+    """Gets the format of the response from the format parameter, and whether
+    it's streamed. ndjson is always streamed, json only with stream=true, and
+    arrow and parquet never are.
+
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param streamable: whether the entrypoint can stream its response, defaults to True.
+        If it can't, ndjson and stream=true are bad requests
+    :type streamable: bool, optional
+    :return: format (json|ndjson|arrow|parquet), and whether it's streamed
+    :rtype: tuple of (str, bool)
+    """
+    formats = FORMATS if streamable else RESPONSE_FORMATS
+    output_format = get_value(kwargs, 'format', str.lower, choices=formats, default='json')
+    stream = output_format == 'ndjson' or get_bool(kwargs, 'stream')
+    if stream and not streamable:
+        abort(400, description="This response can't be streamed")
+    if stream and output_format not in STREAM_FORMATS:
+        abort(400, description=f"Only ({'|'.join(STREAM_FORMATS)}) can be streamed, got {output_format}")
+    return output_format, stream
+
+
+def get_format_from_accept(accept_mimetypes):
+    """Gets the format matching an Accept header best, json if none do.
+
+    :param accept_mimetypes: the parsed Accept header, i.e. flask.request.accept_mimetypes
+    :type accept_mimetypes: werkzeug.datastructures.MIMEAccept
+    :return: format (json|ndjson|arrow|parquet)
+    :rtype: str
+    """
+    formats = {content_type: output_format for output_format, content_type in CONTENT_TYPES.items()}
+    return formats[accept_mimetypes.best_match(list(formats), default=CONTENT_TYPES['json'])]
+
+
+def make_response(df, output_format='json', headers=None):
+    """Serializes a dataframe in the format of the response.
+
+    :param df: results to send
+    :type df: pandas.DataFrame
+    :param output_format: format of the response (json|arrow|parquet)
+    :type output_format: str
+    :param headers: extra headers of the response
+    :type headers: dict
+    :return: body, status and headers of the response, as returned by an entrypoint
+    :rtype: tuple of (str | bytes, int, dict)
+    """
+    if output_format == 'json':
+        # dates as ISO 8601 strings, like streamed responses, see _to_json_value
+        body = df.to_json(orient="records", date_format='iso')
+
+    elif output_format == 'arrow':
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        writer = pa.RecordBatchStreamWriter(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+        body = sink.getvalue().to_pybytes()
+
+    elif output_format == 'parquet':
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        body = buffer.getvalue()
+
+    else:
+        raise ValueError(f"{output_format} not an accepted format. Must be (json|arrow|parquet)")
+
+    return body, 200, {'Content-Type': CONTENT_TYPES[output_format], **(headers or {})}
+
+
+def get_limit(kwargs, default=config.API_DEFAULT_LIMIT, max_limit=config.API_MAX_LIMIT):
+    """Gets the page size of a paginated response from the limit parameter.
+    With a default of None, the limit is optional and None means no limit.
+
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param default: page size if limit wasn't given
+    :type default: int
+    :param max_limit: largest page size allowed, None for no max
+    :type max_limit: int | None
+    :return: page size
+    :rtype: int | None
+    """
+    limit = get_value(kwargs, 'limit', int, default=default)
+    if limit is None:
+        return None
+
+    if limit < 1 or (max_limit is not None and limit > max_limit):
+        abort(400, description=f"limit must be between 1 and {max_limit or 'any'}, got {limit}")
+    return limit
+
+
+def get_page_limits(kwargs, stream=False):
+    """Gets the page size of a query, and the number of rows it fetches: one
+    past the page size, to know if there's a next page. A stream isn't paged,
+    so it has no limit unless one is given (LIMIT NULL is no limit).
+
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param stream: whether the response is streamed
+    :type stream: bool
+    :return: page size, and number of rows to fetch
+    :rtype: tuple of (int | None, int | None)
+    """
+    if stream:
+        limit = get_limit(kwargs, default=None, max_limit=None)
+        return limit, limit
+
+    limit = get_limit(kwargs)
+    return limit, limit + 1
+
+
+def get_next_after_headers(next_after):
+    """Gets the headers of a paginated response, which point to the next page
+    with the value to pass as its after parameter.
+
+    :param next_after: cursor of the next page, None if this is the last page
+    :type next_after: int | str | None
+    :return: dict of {header: value}
+    :rtype: dict
+    """
+    if next_after is None:
+        return {}
+    return {NEXT_AFTER_HEADER: str(next_after)}
+
+
+def paginate(results, limit, key_columns):
+    """Cuts the results of a query that fetched one row past the limit down
+    to the page, and gets the cursor of the next page.
+
+    :param results: results of the query
+    :type results: pandas.DataFrame
+    :param limit: page size, None if the results aren't paginated
+    :type limit: int | None
+    :param key_columns: columns the query is ordered by
+    :type key_columns: tuple of str
+    :return: the page, and the cursor of the next page (None if it's the last)
+    :rtype: tuple of (pandas.DataFrame, str | None)
+    """
+    if limit is None or len(results) <= limit:
+        return results, None
+
+    results = results.iloc[:limit]
+    return results, ",".join(str(value) for value in results[list(key_columns)].iloc[-1])
+
+
+def run_query(db_conn, kwargs, query_builder):
+    """Runs the entrypoint of a QueryBuilder: builds the query from the query
+    parameters, and streams its rows or sends the page in the response format.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Connection
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param query_builder: how to build the query
+    :type query_builder: QueryBuilder
+    :return: the response, as returned by an entrypoint
+    :rtype: tuple | flask.Response
+    """
+    output_format, stream = get_format(kwargs)
+    query, params, limit = query_builder.build(kwargs, stream)
+    if stream:
+        return stream_query(db_conn, query, params, output_format)
+
+    results = pd.read_sql(sa.text(query), db_conn, params=params)
+    results, next_after = paginate(results, limit, query_builder.key_columns)
+    return make_response(results, output_format, get_next_after_headers(next_after))
+
+
+def stream_query(db_conn, query, params, output_format='json', batch_size=config.API_STREAM_BATCH_SIZE):
+    """Streams the rows of a query as they're fetched from a server-side
+    cursor, so memory use doesn't grow with the size of the result.
+
+    Values that aren't json types (dates, times) are sent as strings.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Connection
+    :param query: parameterized query
+    :type query: str
+    :param params: params of the query
+    :type params: dict
+    :param output_format: json (an array, sent in chunks) or ndjson (one object per line)
+    :type output_format: str
+    :param batch_size: number of rows fetched from the cursor at a time
+    :type batch_size: int
+    :return: streamed response
+    :rtype: flask.Response
+    """
+    if output_format not in STREAM_FORMATS:
+        raise ValueError(f"{output_format} not an accepted format. Must be ({'|'.join(STREAM_FORMATS)})")
+
+    result = db_conn.execution_options(stream_results=True).execute(sa.text(query), params)
+    return Response(
+        stream_with_context(_generate_rows(result, output_format, batch_size)),
+        content_type=CONTENT_TYPES[output_format]
+    )
+
+
+def format_chunk(columns, rows, output_format, first=False):
+    """Formats a batch of rows of a streamed response. A json stream starts
+    with STREAM_START and ends with STREAM_END around the chunks.
+
+    :param columns: column names
+    :type columns: list of str
+    :param rows: rows of values, in the order of columns
+    :type rows: list
+    :param output_format: json or ndjson
+    :type output_format: str
+    :param first: whether it's the first chunk of the stream
+    :type first: bool
+    :return: the chunk
+    :rtype: str
+    """
+    objects = (json.dumps(dict(zip(columns, row)), default=_to_json_value) for row in rows)
+    if output_format == 'ndjson':
+        return "".join(f"{obj}\n" for obj in objects)
+
+    chunk = ",".join(objects)
+    return chunk if first else "," + chunk
+
+
+def _to_json_value(value):
+    """Serializes a value json.dumps can't. Dates and datetimes are written
+    the way make_response writes them (df.to_json with date_format='iso'), so
+    a response has the same dates whether it's streamed or not."""
+    if isinstance(value, datetime.date):
+        return pd.Timestamp(value).strftime(ISO_DATETIME_FORMAT)[:-3]
+    return str(value)
+
+
+def _generate_rows(result, output_format, batch_size):
+    """Generates the chunks of a streamed response, one per batch of rows."""
+    columns = list(result.keys())
+    first = True
+
+    try:
+        if STREAM_START[output_format]:
+            yield STREAM_START[output_format]
+
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+
+            yield format_chunk(columns, rows, output_format, first)
+            first = False
+
+        if STREAM_END[output_format]:
+            yield STREAM_END[output_format]
+    finally:
+        result.close()
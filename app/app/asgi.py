@@ -0,0 +1,228 @@
+"""
+Async serving mode of the api, an ASGI app with the same /api/<controller>/<entrypoint>
+contract as main.py, for serving many concurrent requests:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+Entrypoints listed in the QUERY_BUILDERS of their controller (see
+api_utils.QueryBuilder) run natively: their query runs on an asyncpg pool, so
+concurrent requests overlap while they wait on the db. Everything else (other
+entrypoints, /metrics...) is handed to the flask app in main.py, which runs
+in a thread pool.
+
+Both paths share the route table, the query parameters and formats, and the
+response cache of main.py.
+"""
+import logging
+import re
+import sys
+
+import asyncpg
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import (
+    PlainTextResponse,
+    Response,
+    StreamingResponse
+)
+from starlette.routing import (
+    Mount,
+    Route
+)
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import (
+    parse_accept_header,
+    parse_etags
+)
+
+import api_utils
+import cache
+import config
+import db
+import main
+
+# :name bind params, but not :: casts
+BIND_PARAM_PATTERN = re.compile(r'(?<![:\w]):(\w+)')
+
+
+def to_positional(query, params):
+    """Converts a query with :name bind params (as used with sqlalchemy.text)
+    to the $1, $2... params of asyncpg. A param used more than once keeps the
+    same number.
+
+    :param query: parameterized query
+    :type query: str
+    :param params: params of the query
+    :type params: dict
+    :raises ValueError: if a param used in the query isn't in params
+    :return: the query, and the values of its params in order
+    :rtype: tuple of (str, list)
+    """
+    names = []
+
+    def replace(match):
+        name = match.group(1)
+        if name not in params:
+            raise ValueError(f"Query param {name} has no value!")
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    query = BIND_PARAM_PATTERN.sub(replace, query)
+    return query, [params[name] for name in names]
+
+
+def get_query_builder(path):
+    """Gets the QueryBuilder of the entrypoint a path routes to.
+
+    :param path: path of controller/entrypoint
+    :type path: str
+    :return: the QueryBuilder, None if the entrypoint has none (or there's no such entrypoint)
+    :rtype: api_utils.QueryBuilder | None
+    """
+    entrypoint = main.ROUTES.get(path)
+    if entrypoint is None:
+        return None
+
+    controller = sys.modules[entrypoint.__module__]
+    return getattr(controller, 'QUERY_BUILDERS', {}).get(entrypoint.__name__)
+
+
+class ApiEndpoint:
+    """ASGI app serving /api/<path>: natively if the entrypoint has a
+    QueryBuilder, with the flask app otherwise.
+
+    :param wsgi_app: the flask app, wrapped for ASGI
+    :type wsgi_app: starlette.middleware.wsgi.WSGIMiddleware
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, scope, receive, send):
+        path = scope['path_params']['path']
+        query_builder = get_query_builder(path)
+        if query_builder is None:
+            await self.wsgi_app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        try:
+            response = await _handle(request, path, query_builder)
+        except HTTPException as e:
+            logging.info(f"Bad request to {path}: {e.description}")
+            response = PlainTextResponse(e.description, status_code=e.code)
+        await response(scope, receive, send)
+
+
+async def _handle(request, path, query_builder):
+    """Runs the query of an entrypoint, mirroring main.api_handler and api_utils.run_query."""
+    kwargs = {}
+    for name, value in request.query_params.multi_items():
+        kwargs.setdefault(name, []).append(value)
+    if 'format' not in kwargs:
+        accept_mimetypes = parse_accept_header(request.headers.get('accept'), MIMEAccept)
+        kwargs['format'] = [api_utils.get_format_from_accept(accept_mimetypes)]
+
+    output_format, stream = api_utils.get_format(kwargs)
+    query, params, limit = query_builder.build(kwargs, stream)
+    query, args = to_positional(query, params)
+    pool = request.app.state.pool
+
+    if stream:
+        return StreamingResponse(
+            _stream_rows(pool, query, args, output_format),
+            media_type=api_utils.CONTENT_TYPES[output_format]
+        )
+
+    # connections are only acquired for a data version check or a miss, hits don't touch the pool
+    if main.response_cache.data_version_expired():
+        async with pool.acquire() as conn:
+            main.response_cache.update_data_version(await conn.fetch(cache.DATA_VERSION_QUERY))
+    key = cache.make_key(path, kwargs, main.response_cache.data_version)
+
+    entry = main.response_cache.get(key)
+    if entry is None:
+        async with pool.acquire() as conn:
+            statement = await conn.prepare(query)
+            columns = [attribute.name for attribute in statement.get_attributes()]
+            rows = await statement.fetch(*args)
+        entry = await run_in_threadpool(_make_entry, rows, columns, limit, output_format, query_builder.key_columns)
+        main.response_cache.set(key, entry)
+
+    headers = dict(entry.headers)
+    headers['ETag'] = f'"{entry.etag}"'
+    if parse_etags(request.headers.get('if-none-match')).contains(entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, status_code=entry.status, headers=headers)
+
+
+def _make_entry(rows, columns, limit, output_format, key_columns):
+    """Serializes the rows of a query, as a response cache entry."""
+    results = pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+    results, next_after = api_utils.paginate(results, limit, key_columns)
+    headers = api_utils.get_next_after_headers(next_after)
+    body, status, headers = api_utils.make_response(results, output_format, headers)
+    if isinstance(body, str):
+        body = body.encode()
+    headers['Vary'] = 'Accept'
+    return cache.CacheEntry(body, status, list(headers.items()), cache.make_etag(body))
+
+
+async def _stream_rows(pool, query, args, output_format, batch_size=config.API_STREAM_BATCH_SIZE):
+    """Generates the chunks of a streamed response from a server-side cursor, one per batch of rows."""
+    async with pool.acquire() as conn, conn.transaction():
+        statement = await conn.prepare(query)
+        columns = [attribute.name for attribute in statement.get_attributes()]
+        cursor = await statement.cursor(*args)
+        first = True
+
+        if api_utils.STREAM_START[output_format]:
+            yield api_utils.STREAM_START[output_format]
+
+        while True:
+            rows = await cursor.fetch(batch_size)
+            if not rows:
+                break
+
+            yield api_utils.format_chunk(columns, rows, output_format, first)
+            first = False
+
+        if api_utils.STREAM_END[output_format]:
+            yield api_utils.STREAM_END[output_format]
+
+
+class Lifespan:
+    """Opens the asyncpg pool on startup, and closes it on shutdown.
+
+    :param app: the ASGI app, the pool is kept in its state
+    :type app: starlette.applications.Starlette
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __aenter__(self):
+        self.app.state.pool = await asyncpg.create_pool(
+            db.get_connection_string(),
+            min_size=config.PG_ASYNC_POOL_MIN_SIZE,
+            max_size=config.PG_ASYNC_POOL_MAX_SIZE,
+            max_inactive_connection_lifetime=config.PG_POOL_RECYCLE
+        )
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.app.state.pool.close()
+
+
+wsgi_app = WSGIMiddleware(main.app)
+app = Starlette(
+    routes=[
+        Route("/api/{path:path}", ApiEndpoint(wsgi_app), methods=['GET']),
+        Mount("/", app=wsgi_app)
+    ],
+    lifespan=Lifespan
+)
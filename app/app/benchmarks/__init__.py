@@ -0,0 +1,6 @@
+"""
+Benchmarks for the hot paths of the pipeline and the API.
+
+Each module is runnable on its own from the app directory, e.g.
+    python3 -m benchmarks.load_to_db --rows 180000
+"""
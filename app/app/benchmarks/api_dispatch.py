@@ -0,0 +1,51 @@
+"""
+Compares the cost of resolving an api path to its entrypoint with the route
+table against the per-request listdir/import/dir resolution it replaced. Only
+the dispatch is timed, no request is made and no database is needed.
+
+    python3 -m benchmarks.api_dispatch --repeat 100000
+"""
+import argparse
+from importlib import import_module
+import os
+import timeit
+
+import config
+import main as api
+
+
+def _legacy_resolve(path):
+    """How api_handler resolved a path before the route table, kept for comparison."""
+    path = path.split("/")
+    if len(path) == 0 or len(path) > 2:
+        return None
+
+    valid_controllers = [f[:-3] for f in os.listdir(config.API_DIR) if f.endswith(".py")]
+    controller_name = path[0]
+    if controller_name not in valid_controllers:
+        return None
+    controller = import_module(controller_name, config.API_DIR)
+
+    valid_entrypoints = [e for e in dir(controller) if not e.startswith("__") and not e.endswith("__")]
+    entrypoint_name = "main" if len(path) == 1 else path[1]
+    if entrypoint_name not in valid_entrypoints:
+        return None
+    return getattr(controller, entrypoint_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--path', default='games', help="api path to resolve, e.g. games or games/main")
+    parser.add_argument('--repeat', type=int, default=100000, help="number of resolutions to average over")
+    args = parser.parse_args()
+
+    if _legacy_resolve(args.path) is not api.ROUTES.get(args.path):
+        raise ValueError(f"{args.path} doesn't resolve to the same entrypoint with both methods")
+
+    for name, resolve in (('legacy', _legacy_resolve), ('routes', api.ROUTES.get)):
+        elapsed = timeit.timeit(lambda: resolve(args.path), number=args.repeat) / args.repeat
+        print(f"{name:>8}: {elapsed * 1e6:8.2f}us per dispatch")
+
+
+if __name__ == '__main__':
+    main()
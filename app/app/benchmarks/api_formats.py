@@ -0,0 +1,56 @@
+"""
+Compares the formats of api responses on a season of play by play data: the
+time to serialize it on the server, send it at a given bandwidth, and parse it
+back into a dataframe on the client, with the size of each response.
+
+    python3 -m benchmarks.api_formats --rows 45000 --mbps 100
+"""
+import argparse
+import io
+import json
+import logging
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+import api_utils
+from . import synthetic
+
+PARSERS = {
+    'json': lambda body: pd.DataFrame(json.loads(body)),
+    'arrow': lambda body: pa.ipc.open_stream(body).read_pandas(),
+    'parquet': lambda body: pd.read_parquet(io.BytesIO(body))
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=45000, help="number of plays in the season")
+    parser.add_argument('--mbps', type=float, default=100, help="bandwidth between the api and the client")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = synthetic.play_by_play_frame(args.rows)
+    print(f"play by play frame: {df.shape[0]} rows x {df.shape[1]} columns, {args.mbps:g}Mbps")
+
+    for output_format, parse in PARSERS.items():
+        start = time.perf_counter()
+        body, _, _ = api_utils.make_response(df, output_format)
+        serialize = time.perf_counter() - start
+
+        if isinstance(body, str):
+            body = body.encode()
+        transfer = len(body) * 8 / (args.mbps * 10**6)
+
+        start = time.perf_counter()
+        parse(body)
+        parse_time = time.perf_counter() - start
+
+        total = serialize + transfer + parse_time
+        print(f"{output_format:>8}: {len(body) / 2**20:8.1f}MiB, serialize {serialize:6.2f}s, "
+              f"transfer {transfer:6.2f}s, parse {parse_time:6.2f}s, total {total:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
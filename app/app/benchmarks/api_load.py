@@ -0,0 +1,86 @@
+"""
+Load test of the api: sends the same requests at a fixed concurrency to each
+server given, and compares their latency (p50/p99) and throughput. Start the
+servers first, e.g. the flask app and the async app on different ports:
+
+    python3 main.py  # port 5000
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 1
+
+    python3 -m benchmarks.api_load http://localhost:5000 http://localhost:8000 \\
+        --path "/api/games?season=2019" --requests 1000 --concurrency 32
+
+Pass --path more than once to mix requests, and use paths that vary (e.g.
+with different after params) to measure the queries rather than the
+response cache.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import statistics
+import time
+import urllib.error
+import urllib.request
+
+
+def _send(url):
+    """Sends a request, returning its latency in seconds, None if it failed."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+    except (urllib.error.URLError, ConnectionError):
+        return None
+    return time.perf_counter() - start
+
+
+def _percentile(values, percentile):
+    """Gets a percentile (0-100) of the values, nearest rank."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+def run_load(base_url, paths, n_requests, concurrency):
+    """Sends n_requests requests, cycling through paths, with concurrency requests in flight.
+
+    :return: dict of latency and throughput stats
+    :rtype: dict
+    """
+    urls = [base_url.rstrip("/") + path for path in itertools.islice(itertools.cycle(paths), n_requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(_send, urls))
+    elapsed = time.perf_counter() - start
+
+    succeeded = [latency for latency in latencies if latency is not None]
+    if not succeeded:
+        raise ValueError(f"Every request to {base_url} failed, is it up?")
+
+    return {
+        'errors': len(latencies) - len(succeeded),
+        'p50': _percentile(succeeded, 50),
+        'p99': _percentile(succeeded, 99),
+        'mean': statistics.mean(succeeded),
+        'rps': len(succeeded) / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base_urls', nargs='+', help="servers to compare, e.g. http://localhost:5000")
+    parser.add_argument('--path', action='append', dest='paths', help="path of a request, can be repeated")
+    parser.add_argument('--requests', type=int, default=1000, help="number of requests per server")
+    parser.add_argument('--concurrency', type=int, default=32, help="number of requests in flight at once")
+    parser.add_argument('--warmup', type=int, default=20, help="requests sent to each server before measuring")
+    args = parser.parse_args()
+    paths = args.paths or ["/api/games"]
+
+    for base_url in args.base_urls:
+        run_load(base_url, paths, args.warmup, args.concurrency)
+        stats = run_load(base_url, paths, args.requests, args.concurrency)
+        print(f"{base_url:>28}: p50 {stats['p50'] * 1000:8.1f}ms, p99 {stats['p99'] * 1000:8.1f}ms, "
+              f"{stats['rps']:8.1f} req/s, {stats['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
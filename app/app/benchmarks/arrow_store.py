@@ -0,0 +1,68 @@
+"""
+Compares opening a season of play by play data from its memory mapped arrow
+store file against reading it from parquet, for every column and for the
+few columns an analytic read needs. The arrow store is a view on the file,
+so opening it costs the same whatever its size, and the memory it takes is
+the page cache, shared by every process that opens it.
+
+    python3 -m benchmarks.arrow_store --rows 48000 --repeat 5
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import analytics
+import models
+from pipeline import (
+    etl_tools,
+    schema
+)
+from . import synthetic
+
+
+def _time(function, repeat):
+    """Median seconds of a call over repeat calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=48000, help="number of plays in the season")
+    parser.add_argument('--repeat', type=int, default=5, help="number of reads to take the median of")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = schema.apply_dtypes(synthetic.play_by_play_frame(args.rows), schema.get_dtypes(models.PlayByPlay))
+    columns = list(analytics.SITUATION_COLUMNS + analytics.METRIC_COLUMNS)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store_path = os.path.join(data_dir, "2019.arrow")
+        parquet_path = os.path.join(data_dir, "2019.parquet")
+        etl_tools.load_to_arrow_store(df, store_path)
+        etl_tools.load_to_file(df, parquet_path)
+        print(f"{len(df)} plays x {len(df.columns)} columns, "
+              f"arrow store {os.path.getsize(store_path) / 2**20:.1f}MiB, "
+              f"parquet {os.path.getsize(parquet_path) / 2**20:.1f}MiB")
+
+        reads = {
+            'arrow store, all columns': lambda: etl_tools.extract_from_arrow_store(store_path),
+            'parquet, all columns': lambda: etl_tools.extract_from_file(parquet_path),
+            'arrow store, situation columns':
+                lambda: etl_tools.extract_from_arrow_store(store_path, columns).to_pandas(),
+            'parquet, situation columns': lambda: etl_tools.extract_from_file(parquet_path, columns=columns)
+        }
+        for name, read in reads.items():
+            print(f"{name:>32}: {_time(read, args.repeat) * 1000:8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
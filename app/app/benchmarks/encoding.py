@@ -0,0 +1,68 @@
+"""
+Measures the memory a full season of play by play data takes with its teams
+as strings (as read from a csv), as schema categories (see schema.py) and as
+encoded int16 codes (see pipeline/encoding.py), and what decoding game ids
+takes compared with the game_date column it replaces.
+
+Within one season categories are the smallest, their codes are int8, but
+each frame has its own categories: concatenating seasons whose teams differ
+(OAK became LV) falls back to strings, codes stay codes.
+
+    python3 -m benchmarks.encoding --rows 48000
+"""
+import argparse
+import logging
+import time
+
+import pandas as pd
+
+import models
+from pipeline import (
+    encoding,
+    schema
+)
+from . import synthetic
+
+
+def _memory(df, columns):
+    """MiB the columns of df take, counting the strings they point to."""
+    return df[list(columns)].memory_usage(deep=True, index=False).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=48000, help="number of plays in the season")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    raw = synthetic.play_by_play_frame(args.rows)
+    typed = schema.apply_dtypes(raw, schema.get_dtypes(models.PlayByPlay))
+
+    start = time.perf_counter()
+    encoded = encoding.encode_teams(typed)
+    encode_time = time.perf_counter() - start
+
+    columns = encoding.TEAM_COLUMNS
+    print(f"{len(raw)} plays, {len(columns)} team columns, encoded in {encode_time * 1000:.1f}ms")
+    for name, df in (('strings', raw), ('categories', typed), ('int16 codes', encoded)):
+        print(f"{name:>12}: team columns {_memory(df, columns):7.2f}MiB, "
+              f"every column {_memory(df, df.columns):7.2f}MiB")
+
+    next_season = synthetic.play_by_play_frame(args.rows, season=2020, seed=1).replace('OAK', 'LV')
+    next_typed = schema.apply_dtypes(next_season, schema.get_dtypes(models.PlayByPlay))
+    concatenated = {
+        'categories': pd.concat([typed, next_typed], ignore_index=True),
+        'int16 codes': pd.concat([encoded, encoding.encode_teams(next_typed)], ignore_index=True)
+    }
+    for name, df in concatenated.items():
+        print(f"{name:>12}: team columns of 2 seasons {_memory(df, columns):7.2f}MiB")
+
+    start = time.perf_counter()
+    games = encoding.decode_game_ids(encoded['game_id'])
+    decode_time = time.perf_counter() - start
+    print(f"game ids decoded in {decode_time * 1000:.1f}ms, to {games.memory_usage(index=False).sum() / 2**20:.2f}MiB "
+          f"(game_date as strings {_memory(raw, ['game_date']):.2f}MiB)")
+
+
+if __name__ == '__main__':
+    main()
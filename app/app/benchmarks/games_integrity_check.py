@@ -0,0 +1,82 @@
+"""
+Compares games._data_integrity_check with the per-season filtering version it
+replaced, on a synthetic games frame.
+
+    python3 -m benchmarks.games_integrity_check --seasons 50
+"""
+import argparse
+import logging
+import timeit
+
+import pandas as pd
+
+from pipeline import (
+    config,
+    games
+)
+from . import synthetic
+
+
+def _legacy_data_integrity_check(df):
+    """The integrity check before it was rewritten as a single groupby pass, kept for comparison."""
+    if df is None or len(df) == 0:
+        return
+
+    if not isinstance(df, pd.DataFrame):
+        raise ValueError(f"Type of df is {type(df)}, it should be pandas.DataFrame")
+
+    seasons = df['season'].unique()
+    max_season = int(max(seasons))
+
+    expected_seasons = set(range(config.START_SEASON, max_season + 1))
+
+    if set(seasons) != expected_seasons:
+        missing_season = expected_seasons - set(seasons)
+        raise games.DataIntegrityError(f"Most recent season with data is {max_season}"
+                                       f" but there's no data for {missing_season}!")
+
+    game_ids = list(df['game_id'])
+    if len(game_ids) != len(set(game_ids)):
+        raise games.DataIntegrityError("There are duplicate game ids!")
+
+    for season in list(seasons):
+        season_types = set(df[df['season'] == season]['type'].unique())
+
+        if season != max_season and len(season_types) != 3:
+            raise games.DataIntegrityError(f"{season} is not the max season of {max_season}"
+                                           f"and only has {len(season_types)} season types")
+
+        elif len(season_types) == 1 and season_types != {'pre'}:
+            raise games.DataIntegrityError(f"There is only 1 season type for {season}: {season_types}"
+                                           f"and its not 'pre'!")
+
+        elif len(season_types) == 2 and season_types != {'pre', 'reg'}:
+            raise games.DataIntegrityError(f"There are 2 season types for {season} "
+                                           f"and they're not ['pre', 'reg']!")
+
+        elif 'reg' in df[df['season'] == season]['type'].unique():
+            reg_season_df = df[(df['season'] == season) & (df['type'] == 'reg')]
+            weeks = reg_season_df['week'].unique()
+            target_weeks = set(range(1, 18))
+            missing_weeks = target_weeks.difference(set(weeks))
+            if missing_weeks:
+                raise games.DataIntegrityError(f"{season} reg season is missing weeks {missing_weeks}!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seasons', type=int, default=50, help="number of seasons in the games frame")
+    parser.add_argument('--repeat', type=int, default=10, help="number of runs to average over")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = synthetic.games_frame(args.seasons)
+    print(f"games frame: {df.shape[0]} rows, {args.seasons} seasons")
+
+    for name, check in (('legacy', _legacy_data_integrity_check), ('groupby', games._data_integrity_check)):
+        elapsed = timeit.timeit(lambda: check(df), number=args.repeat) / args.repeat
+        print(f"{name:>8}: {elapsed * 1000:8.2f}ms per check")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Compares the insert and copy methods of etl_tools.load_to_db on a
+season-sized play by play frame. Needs the database to be up, and writes to a
+scratch copy of the play_by_play table that is dropped afterwards.
+
+    python3 -m benchmarks.load_to_db --rows 180000
+"""
+import argparse
+import time
+
+import db
+from pipeline import etl_tools
+from . import synthetic
+
+SCRATCH_TABLE = 'play_by_play_benchmark'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=180000, help="number of plays to load")
+    args = parser.parse_args()
+
+    df = synthetic.play_by_play_frame(args.rows)
+    db_conn = db.get_db_eng()
+    db_conn.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+    db_conn.execute(f"CREATE TABLE {SCRATCH_TABLE} (LIKE play_by_play INCLUDING ALL)")
+    try:
+        for method in etl_tools.LOAD_METHODS:
+            db_conn.execute(f"TRUNCATE TABLE {SCRATCH_TABLE}")
+            start = time.perf_counter()
+            etl_tools.load_to_db(db_conn, SCRATCH_TABLE, df, method=method)
+            elapsed = time.perf_counter() - start
+            print(f"{method:>8}: {elapsed:8.2f}s for {df.shape[0]} rows x {df.shape[1]} columns "
+                  f"({df.shape[0] / elapsed:,.0f} rows/s)")
+    finally:
+        db_conn.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+
+
+if __name__ == '__main__':
+    main()
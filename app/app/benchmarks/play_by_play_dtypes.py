@@ -0,0 +1,41 @@
+"""
+Compares the memory footprint and parse time of a season of play by play
+data read with inferred dtypes against the dtypes derived from
+models.PlayByPlay (see pipeline/schema.py).
+
+    python3 -m benchmarks.play_by_play_dtypes --rows 45000
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import models
+from pipeline import etl_tools
+from . import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=45000, help="number of plays in the season")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    df = synthetic.play_by_play_frame(args.rows)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for file_format in etl_tools.FILE_FORMATS:
+            path = os.path.join(data_dir, f"play_by_play.{file_format}")
+            etl_tools.load_to_file(df, path)
+
+            for name, model in (('inferred', None), ('schema', models.PlayByPlay)):
+                start = time.perf_counter()
+                season_df = etl_tools.extract_from_file(path, model=model)
+                elapsed = time.perf_counter() - start
+                memory = season_df.memory_usage(deep=True).sum() / 2 ** 20
+                print(f"{file_format:>8} {name:>8}: {memory:8.1f}MiB, read in {elapsed:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Times situational queries (see analytics.py) over every season, evaluated as
+numpy masks over the season arrays, against the same query as pandas boolean
+indexing and groupby on a dataframe of every season. No database is needed,
+the plays are synthetic with realistic ranges for the situation columns.
+
+    python3 -m benchmarks.situations --rows-per-season 48000 --repeat 20
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from pipeline import config
+
+# 3rd and 7+ in the 4th quarter within one score
+SITUATION = {'down': [3], 'ydstogo': (7, None), 'qtr': [4], 'score_differential': (-8, 8)}
+# a wide one, most of the plays match
+WIDE_SITUATION = {'play_type': ['pass', 'run'], 'yardline_100': (1, 99)}
+
+
+def situation_frame(n_rows, seed=0):
+    """Builds the situation and metric columns of a season of plays."""
+    rng = np.random.RandomState(seed)
+    down = rng.randint(1, 5, n_rows).astype(float)
+    down[rng.rand(n_rows) < 0.15] = np.nan
+    return pd.DataFrame({
+        'down': down,
+        'qtr': rng.randint(1, 5, n_rows),
+        'play_type': np.array(analytics.PLAY_TYPES, dtype=object)[rng.randint(0, len(analytics.PLAY_TYPES), n_rows)],
+        'ydstogo': rng.randint(1, 20, n_rows),
+        'score_differential': rng.randint(-30, 31, n_rows),
+        'yardline_100': rng.randint(1, 100, n_rows),
+        'game_seconds_remaining': rng.randint(0, 3601, n_rows),
+        'epa': rng.randn(n_rows),
+        'wpa': rng.randn(n_rows) / 20
+    })
+
+
+def pandas_aggregate(df, situation, group_by):
+    """The same query with pandas, kept for comparison."""
+    mask = pd.Series(True, index=df.index)
+    for name, values in situation.items():
+        if name in analytics.VALUE_FILTERS:
+            mask &= df[name].isin(values)
+        else:
+            low, high = values
+            if low is not None:
+                mask &= df[name] >= low
+            if high is not None:
+                mask &= df[name] <= high
+    plays = df[mask]
+    return plays.groupby(group_by).agg({'epa': ['size', 'mean', 'sum'], 'wpa': ['mean', 'sum']})
+
+
+def _time(function, repeat):
+    """Median seconds of a call over repeat calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows-per-season', type=int, default=48000, help="number of plays in a season")
+    parser.add_argument('--repeat', type=int, default=20, help="number of queries to take the median of")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    seasons = list(range(config.START_SEASON, config.CURRENT_SEASON + 1))
+    frames = {season: situation_frame(args.rows_per_season, seed=season) for season in seasons}
+    season_arrays = [analytics.to_arrays(frames[season], season) for season in seasons]
+    df = pd.concat([frame.assign(season=season) for season, frame in frames.items()], ignore_index=True)
+
+    n_bytes = sum(array.nbytes for arrays in season_arrays for array in arrays.columns.values())
+    print(f"{len(seasons)} seasons, {len(df)} plays, season arrays {n_bytes / 2**20:.1f}MiB, "
+          f"dataframe {df.memory_usage(deep=True).sum() / 2**20:.1f}MiB")
+
+    for name, situation in (('situation', SITUATION), ('wide', WIDE_SITUATION)):
+        for group_by in (None, 'season'):
+            arrays_time = _time(lambda: analytics.aggregate(season_arrays, situation, group_by), args.repeat)
+            pandas_time = _time(lambda: pandas_aggregate(df, situation, group_by or (lambda _: 0)), args.repeat)
+            print(f"{name:>10} by {str(group_by):>6}: arrays {arrays_time * 1000:7.2f}ms, "
+                  f"pandas {pandas_time * 1000:7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Builds synthetic data shaped like the tables in models.py, so benchmarks can
+run on realistically sized frames without scraping anything.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    Date,
+    Float,
+    Integer,
+    String,
+    Text,
+    Time
+)
+
+import models
+from pipeline import config
+
+TEAMS = (
+    'ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET', 'GB', 'HOU', 'IND', 'JAX', 'KC',
+    'LA', 'LAC', 'MIA', 'MIN', 'NE', 'NO', 'NYG', 'NYJ', 'OAK', 'PHI', 'PIT', 'SEA', 'SF', 'TB', 'TEN', 'WAS'
+)
+PLAYS_PER_GAME = 175
+WEEKS_PER_SEASON_TYPE = {'pre': range(1, 5), 'reg': range(1, 18), 'post': range(18, 22)}
+GAMES_PER_WEEK = 16
+
+
+def play_by_play_frame(n_rows, season=2019, seed=0):
+    """Builds a dataframe with every play_by_play column, the way pd.read_csv
+    would return it: ints with nulls as float64, strings as object.
+
+    :param n_rows: number of plays
+    :type n_rows: int
+    :param season: season the game ids and dates fall in, defaults to 2019
+    :type season: int, optional
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: synthetic play by play data
+    :rtype: pandas.DataFrame
+    """
+    rng = np.random.RandomState(seed)
+    n_games = max(n_rows // PLAYS_PER_GAME, 1)
+    game_dates = pd.date_range(f"{season}-09-05", periods=n_games, freq='D')
+    game_ids = np.array([int(d.strftime('%Y%m%d')) * 100 for d in game_dates])
+
+    game_index = np.arange(n_rows) * n_games // n_rows
+    data = {}
+    for column in models.PlayByPlay.__table__.columns:
+        name, column_type = column.name, column.type
+        if name == 'game_id':
+            values = game_ids[game_index]
+        elif name == 'play_id':
+            values = np.arange(n_rows) % PLAYS_PER_GAME + 1
+        elif name == 'game_date':
+            values = game_dates[game_index].strftime('%Y-%m-%d')
+        elif isinstance(column_type, Integer):
+            values = rng.randint(0, 100, n_rows).astype(float)
+            values[rng.rand(n_rows) < 0.1] = np.nan
+        elif isinstance(column_type, Float):
+            values = rng.randn(n_rows)
+        elif isinstance(column_type, (Date, Time)):
+            minutes, seconds = rng.randint(0, 15, n_rows), rng.randint(0, 60, n_rows)
+            values = np.array([f"{m:02d}:{s:02d}" for m, s in zip(minutes, seconds)])
+        elif isinstance(column_type, String) and column_type.length == 16:
+            values = np.array(TEAMS, dtype=object)[rng.randint(0, len(TEAMS), n_rows)]
+        elif isinstance(column_type, (String, Text)):
+            values = np.array([f"{name}_{i}" for i in rng.randint(0, 2000, n_rows)], dtype=object)
+            values[rng.rand(n_rows) < 0.5] = None
+        else:
+            raise TypeError(f"No synthetic data for column {name} of type {column_type}")
+        data[name] = values
+
+    return pd.DataFrame(data)
+
+
+def games_frame(n_seasons, start_season=config.START_SEASON):
+    """Builds a complete games dataframe for n_seasons seasons, in the shape of the games table.
+
+    :param n_seasons: number of seasons
+    :type n_seasons: int
+    :param start_season: first season, defaults to config.START_SEASON
+    :type start_season: int, optional
+    :return: synthetic games data
+    :rtype: pandas.DataFrame
+    """
+    rows = []
+    for season in range(start_season, start_season + n_seasons):
+        for type_order, season_type in enumerate(config.SEASON_TYPES):
+            for week in WEEKS_PER_SEASON_TYPE[season_type]:
+                for game in range(GAMES_PER_WEEK):
+                    game_id = (season * 1000 + type_order * 100 + week) * 100 + game
+                    rows.append((
+                        season_type, game_id, TEAMS[2 * game], TEAMS[2 * game + 1], week, season, 'POST',
+                        f"http://www.nfl.com/liveupdate/game-center/{game_id}/{game_id}_gtd.json", 21.0, 17.0
+                    ))
+
+    columns = [column.name for column in models.Game.__table__.columns]
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,184 @@
+"""
+In-process cache of api responses. The data only changes when the pipeline
+runs, so responses are cached per process, keyed on the request path and its
+query parameters, and dropped when either:
+- they're older than API_CACHE_TTL
+- the pipeline bumps the version of the data (the data_versions table), which
+  is checked at most every API_DATA_VERSION_TTL seconds
+- the cache is full, least recently used first
+
+Every cached response has an ETag, so clients can revalidate with
+If-None-Match and get a 304 instead of the body.
+
+Example usage:
+    key = cache.make_key(path, kwargs, response_cache.get_data_version(db_conn))
+    entry = response_cache.get(key)
+"""
+from collections import (
+    namedtuple,
+    OrderedDict
+)
+import hashlib
+import threading
+import time
+
+import config
+
+DATA_VERSION_QUERY = "SELECT table_name, version FROM data_versions ORDER BY table_name"
+
+CacheEntry = namedtuple('CacheEntry', ['body', 'status', 'headers', 'etag'])
+
+
+def make_key(path, kwargs, data_version):
+    """Makes the cache key of a request. Parameters are sorted by name, so
+    their order in the url doesn't matter, but repeated values keep theirs.
+
+    :param path: path of controller/entrypoint
+    :type path: str
+    :param kwargs: query parameters, as passed to the entrypoint
+    :type kwargs: dict of {name: list of str}
+    :param data_version: version of the data, see ResponseCache.get_data_version
+    :type data_version: tuple
+    :return: cache key
+    :rtype: tuple
+    """
+    return path, tuple(sorted((name, tuple(values)) for name, values in kwargs.items())), data_version
+
+
+def make_etag(body):
+    """Makes the ETag of a response body.
+
+    :param body: response body
+    :type body: bytes
+    :return: ETag, without quotes
+    :rtype: str
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """LRU cache of responses with a TTL, safe to share between threads.
+
+    :param max_entries: number of responses kept, the least recently used are evicted first
+    :type max_entries: int
+    :param ttl: seconds a response is served for
+    :type ttl: float
+    :param data_version_ttl: seconds between checks of the data version
+    :type data_version_ttl: float
+    :param tables: only these tables' versions make up the data version, defaults to None for every table
+    :type tables: tuple of str, optional
+    """
+
+    def __init__(self, max_entries=config.API_CACHE_MAX_ENTRIES, ttl=config.API_CACHE_TTL,
+                 data_version_ttl=config.API_DATA_VERSION_TTL, tables=None):
+        if not isinstance(max_entries, int) or max_entries < 1:
+            raise ValueError(f"max_entries must be a positive int, got {max_entries}")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.data_version_ttl = data_version_ttl
+        self.tables = tables
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._data_version_checked_at = None
+        self._stats = {'hits_total': 0, 'misses_total': 0, 'evictions_total': 0, 'invalidations_total': 0}
+
+    def get(self, key):
+        """Gets the response cached for key.
+
+        :param key: cache key, see make_key
+        :type key: tuple
+        :return: the cached response, None if there's none or it expired
+        :rtype: CacheEntry | None
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl:
+                del self._entries[key]
+                item = None
+
+            if item is None:
+                self._stats['misses_total'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits_total'] += 1
+            return item[1]
+
+    def set(self, key, entry):
+        """Caches a response, evicting the least recently used if the cache is full.
+
+        :param key: cache key, see make_key
+        :type key: tuple
+        :param entry: response to cache
+        :type entry: CacheEntry
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions_total'] += 1
+
+    def clear(self):
+        """Drops every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_data_version(self, db_conn):
+        """Gets the version of the data, from the data_versions table. The
+        cache is cleared whenever it changes.
+
+        The table is queried at most every data_version_ttl seconds, in between
+        the last version read is returned.
+
+        :param db_conn: sqlalchemy database connection
+        :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+        :return: tuple of (table_name, version) pairs
+        :rtype: tuple
+        """
+        if not self.data_version_expired():
+            return self.data_version
+        return self.update_data_version(db_conn.execute(DATA_VERSION_QUERY))
+
+    @property
+    def data_version(self):
+        """The last version of the data read, None if it hasn't been read yet."""
+        return self._data_version
+
+    def data_version_expired(self):
+        """Whether it's time to query the data_versions table again.
+
+        :rtype: bool
+        """
+        checked_at = self._data_version_checked_at
+        return checked_at is None or time.monotonic() - checked_at >= self.data_version_ttl
+
+    def update_data_version(self, rows):
+        """Updates the version of the data with the rows of DATA_VERSION_QUERY,
+        clearing the cache if it changed.
+
+        :param rows: rows of (table_name, version)
+        :type rows: iterable
+        :return: tuple of (table_name, version) pairs, of the cache's tables
+        :rtype: tuple
+        """
+        data_version = tuple(tuple(row) for row in rows if self.tables is None or row[0] in self.tables)
+        with self._lock:
+            if self._data_version is not None and data_version != self._data_version:
+                self._entries.clear()
+                self._stats['invalidations_total'] += 1
+            self._data_version = data_version
+            self._data_version_checked_at = time.monotonic()
+        return data_version
+
+    def get_metrics(self):
+        """Gets the hit/miss counters and the size of the cache.
+
+        :return: dict of {metric name: value}
+        :rtype: dict
+        """
+        with self._lock:
+            return {'entries': len(self._entries), **self._stats}
@@ -9,3 +9,30 @@ PG_USERNAME = 'postgres'
 PG_PASSWORD = 'password'
 PG_HOST = 'postgres'
 DB_NAME = 'nfl'
+
+# Connection pool shared by the API's requests, see db.get_pooled_db_eng
+PG_POOL_SIZE = 10
+PG_POOL_MAX_OVERFLOW = 10  # connections opened beyond the pool size under load, closed when returned
+PG_POOL_TIMEOUT = 30  # seconds to wait for a connection before failing the request
+PG_POOL_RECYCLE = 1800  # seconds before a connection is replaced
+PG_POOL_PRE_PING = True  # test connections on checkout, so dropped ones are replaced transparently
+
+# Pagination of api responses, see api_utils.get_limit
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+
+# In-process cache of api responses, see cache.py
+API_CACHE_MAX_ENTRIES = 256
+API_CACHE_TTL = 300  # seconds a cached response is served for
+API_DATA_VERSION_TTL = 5  # seconds between checks of the data_versions table
+
+# Rows fetched at a time from the server-side cursor of a streamed response, see api_utils.stream_query
+API_STREAM_BATCH_SIZE = 1000
+
+# Pool of the async app (asgi.py), sized like the sync one
+PG_ASYNC_POOL_MIN_SIZE = 2
+PG_ASYNC_POOL_MAX_SIZE = PG_POOL_SIZE + PG_POOL_MAX_OVERFLOW
+
+# Per-process cache of the season arrays of situational queries, see analytics.SeasonStore
+ANALYTICS_MAX_SEASONS = 32
+ANALYTICS_SEASON_TTL = 86400  # seconds a season is kept for, they're also dropped when the data version changes
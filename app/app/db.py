@@ -1,7 +1,21 @@
+import threading
+import time
+
 import sqlalchemy as sa
 
 import config
 
+# process-wide engine for the API, created on first use so each (forked) worker process gets its own pool
+_pooled_engine = None
+_pooled_engine_lock = threading.Lock()
+
+_checkout_stats = {
+    'checkouts_total': 0,
+    'checkout_wait_seconds_total': 0.0,
+    'checkout_wait_seconds_max': 0.0
+}
+_checkout_stats_lock = threading.Lock()
+
 
 def get_db_eng():
     """Connect to a db with the given connection string
@@ -16,11 +30,71 @@ def get_db_eng():
     :return: sqlalchemy database engine
     :rtype: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
     """
-    connection_string = _get_connection_string()
+    connection_string = get_connection_string()
     return sa.create_engine(connection_string)
 
 
-def _get_connection_string():
+def get_pooled_db_eng():
+    """Gets the engine shared by the whole process, creating it on first use.
+
+    Its pool is configured with the PG_POOL_* variables in config.py.
+
+    :return: sqlalchemy database engine
+    :rtype: sqlalchemy.engine.base.Engine
+    """
+    global _pooled_engine
+
+    if _pooled_engine is None:
+        with _pooled_engine_lock:
+            if _pooled_engine is None:
+                _pooled_engine = sa.create_engine(
+                    get_connection_string(),
+                    pool_size=config.PG_POOL_SIZE,
+                    max_overflow=config.PG_POOL_MAX_OVERFLOW,
+                    pool_timeout=config.PG_POOL_TIMEOUT,
+                    pool_recycle=config.PG_POOL_RECYCLE,
+                    pool_pre_ping=config.PG_POOL_PRE_PING
+                )
+    return _pooled_engine
+
+
+def connect():
+    """Checks out a connection from the shared engine's pool, recording how
+    long the checkout waited. Closing the connection returns it to the pool.
+
+    :return: sqlalchemy database connection
+    :rtype: sqlalchemy.engine.base.Connection
+    """
+    start = time.perf_counter()
+    db_conn = get_pooled_db_eng().connect()
+    wait_seconds = time.perf_counter() - start
+
+    with _checkout_stats_lock:
+        _checkout_stats['checkouts_total'] += 1
+        _checkout_stats['checkout_wait_seconds_total'] += wait_seconds
+        _checkout_stats['checkout_wait_seconds_max'] = max(_checkout_stats['checkout_wait_seconds_max'], wait_seconds)
+    return db_conn
+
+
+def get_pool_metrics():
+    """Gets the state of the shared engine's pool, and the checkout stats.
+
+    :return: dict of {metric name: value}
+    :rtype: dict
+    """
+    pool = get_pooled_db_eng().pool
+    metrics = {
+        'pool_size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow()
+    }
+    with _checkout_stats_lock:
+        metrics.update(_checkout_stats)
+    return metrics
+
+
+def get_connection_string():
     """Formats a connection string using the configuration variables."""
     username = config.PG_USERNAME
     password = config.PG_PASSWORD
@@ -1,68 +1,181 @@
-from importlib import import_module
+from importlib import (
+    import_module,
+    reload
+)
+import inspect
 import logging
 import os
+import signal
 import sys
+from types import MappingProxyType
 
 from flask import (
     abort,
     Flask,
     g,
     jsonify,
-    request
+    request,
+    Response
 )
 
+import analytics
+import api_utils
+import cache
 import db
 import config
 
 sys.path.insert(0, config.API_DIR)
 logging.basicConfig(level=logging.INFO, format='{%(filename)s:%(lineno)d} %(levelname)s - %(message)s')
 app = Flask(__name__)
+response_cache = cache.ResponseCache()
+
+
+METRICS_PREFIX = 'data_nfl_'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
 
 
 def get_db():
-    """Get global connection to the db."""
+    """Get a connection to the db for this request, checked out from the shared pool."""
     if 'db' not in g:
-        g.db = db.get_db_eng()
+        g.db = db.connect()
     return g.db
 
 
+@app.teardown_appcontext
+def close_db(exception):
+    """Return the request's connection to the pool."""
+    db_conn = g.pop('db', None)
+    if db_conn is not None:
+        db_conn.close()
+
+
+def format_metrics(metrics, prefix=METRICS_PREFIX):
+    """Formats metrics in the prometheus text format. Metrics ending in
+    _total are counters, the rest are gauges.
+
+    :param metrics: dict of {metric name: value}
+    :type metrics: dict
+    :param prefix: prefix added to every metric name
+    :type prefix: str
+    :return: the metrics, one per line with their type
+    :rtype: str
+    """
+    lines = []
+    for name, value in metrics.items():
+        name = prefix + name
+        metric_type = 'counter' if name.endswith('_total') else 'gauge'
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
 @app.route("/")
 def hello_world():
     logging.info("calling hello world..")
     return jsonify("hello world!")
 
 
+@app.route("/metrics")
+def metrics():
+    """Exposes the state of the db connection pool and of the response cache for prometheus to scrape."""
+    pool_metrics = format_metrics(db.get_pool_metrics())
+    cache_metrics = format_metrics(response_cache.get_metrics(), prefix=f"{METRICS_PREFIX}response_cache_")
+    season_metrics = format_metrics(analytics.season_store.get_metrics(), prefix=f"{METRICS_PREFIX}season_store_")
+    return Response(pool_metrics + cache_metrics + season_metrics, content_type=METRICS_CONTENT_TYPE)
+
+
+def build_routes(api_dir=config.API_DIR, reload_controllers=False):
+    """Builds the route table of the api: every public function of every
+    controller (*.py module in api/), keyed by 'controller/entrypoint'. The
+    main entrypoint of a controller is also keyed by just 'controller'.
+
+    Modules and functions starting with '_' are private, and aren't routed.
+
+    :param api_dir: directory of the controllers
+    :type api_dir: str
+    :param reload_controllers: whether to reload controllers that were already imported
+    :type reload_controllers: bool
+    :return: read-only dict of {path: entrypoint}
+    :rtype: types.MappingProxyType
+    """
+    routes = {}
+    for file_name in sorted(os.listdir(api_dir)):
+        if not file_name.endswith(".py") or file_name.startswith("_"):
+            continue
+
+        controller_name = file_name[:-3]
+        controller = import_module(controller_name)
+        if reload_controllers:
+            controller = reload(controller)
+
+        for entrypoint_name, entrypoint in inspect.getmembers(controller, inspect.isfunction):
+            if entrypoint_name.startswith("_") or entrypoint.__module__ != controller.__name__:
+                continue
+            routes[f"{controller_name}/{entrypoint_name}"] = entrypoint
+            if entrypoint_name == "main":
+                routes[controller_name] = entrypoint
+
+    return MappingProxyType(routes)
+
+
+ROUTES = build_routes()
+
+
+def reload_routes(signum=None, frame=None):
+    """Rebuilds the route table, reloading the controllers. Hooked up to
+    SIGHUP when running the debug server."""
+    global ROUTES
+    ROUTES = build_routes(reload_controllers=True)
+    logging.info(f"Reloaded {len(ROUTES)} api routes.")
+
+
 @app.route("/api/<path:path>", methods=['GET'])
 def api_handler(path):
     """Routes the request to the proper controller (*.py module in api/) and
     entrypoint (function to call within that module).
 
-    :param controller_name: path of controller/entrypoint
-    :type controller_name: str (containing '/'s)
-    """
-    path = path.split("/")
-    if len(path) == 0 or len(path) > 2:
-        logging.info(f"Invalid path received: {path}")
-        abort(404)
+    The format of the response is the format parameter if given, otherwise
+    it's negotiated from the Accept header and passed on as the format kwarg.
 
-    valid_controllers = [f[:-3] for f in os.listdir(config.API_DIR) if f.endswith(".py")]
-    controller_name = path[0]
-    if controller_name not in valid_controllers:
-        logging.info(f"Invalid attempt to access controller {controller_name}.")
-        abort(404)
-    controller = import_module(controller_name, config.API_DIR)
+    Responses are served from the response cache when they can be, and are
+    conditional: a request whose If-None-Match matches the ETag gets a 304.
+    A database connection is only checked out when the data version is due
+    a check or the response isn't cached, so cache hits don't touch the pool.
 
-    valid_entrypoints = [e for e in dir(controller) if not e.startswith("__") and not e.endswith("__")]
-    entrypoint_name = "main" if len(path) == 1 else path[1]
-    if entrypoint_name not in valid_entrypoints:
-        logging.info(f"Invalid attempt to access entrypoint {entrypoint_name} for controller {controller_name}.")
+    :param path: path of controller/entrypoint
+    :type path: str (containing '/'s)
+    """
+    entrypoint = ROUTES.get(path)
+    if entrypoint is None:
+        logging.info(f"Invalid attempt to access {path}.")
         abort(404)
-    entrypoint = getattr(controller, entrypoint_name)
 
-    db_conn = get_db()
     kwargs = {k: v for k, v in request.args.lists()}
-    return entrypoint(db_conn, **kwargs)
+    if 'format' not in kwargs:
+        kwargs['format'] = [api_utils.get_format_from_accept(request.accept_mimetypes)]
+    if response_cache.data_version_expired():
+        data_version = response_cache.get_data_version(get_db())
+    else:
+        data_version = response_cache.data_version
+    key = cache.make_key(path, kwargs, data_version)
+
+    entry = response_cache.get(key)
+    if entry is None:
+        response = app.make_response(entrypoint(get_db(), **kwargs))
+        response.vary.add('Accept')
+        if response.status_code != 200 or response.is_streamed:
+            return response
+
+        body = response.get_data()
+        headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+        entry = cache.CacheEntry(body, response.status_code, headers, cache.make_etag(body))
+        response_cache.set(key, entry)
+
+    response = Response(entry.body, status=entry.status, headers=entry.headers)
+    response.set_etag(entry.etag)
+    return response.make_conditional(request)
 
 
 if __name__ == '__main__':
+    signal.signal(signal.SIGHUP, reload_routes)
     app.run(debug=True, host='0.0.0.0')
@@ -6,12 +6,15 @@ using the make auto-revision target.
 from sqlalchemy import (
     Column,
     Date,
+    DateTime,
     Float,
+    Index,
     Integer,
     String,
     Text,
     Time
 )
+from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -19,6 +22,10 @@ Base = declarative_base()
 
 class Game(Base):
     __tablename__ = 'games'
+    __table_args__ = (
+        # covers the aggregate queries of the games integrity check
+        Index('ix_games_season_type_week', 'season', 'type', 'week'),
+    )
 
     type = Column(String(16), autoincrement=False, nullable=False)
     game_id = Column(Integer, autoincrement=False, nullable=False, primary_key=True)
@@ -36,7 +43,18 @@ class Game(Base):
 
 
 class PlayByPlay(Base):
+    """Partitioned by season, on the game_id ranges of season_game_id_range.
+    The partition of a season is play_by_play_<season>, see
+    pipeline/etl_tools.create_partition."""
     __tablename__ = 'play_by_play'
+    __table_args__ = (
+        # the primary key leads with play_id, these cover the filters and the pagination of api/play_by_play
+        Index('ix_play_by_play_game_id_play_id', 'game_id', 'play_id'),
+        Index('ix_play_by_play_posteam_game_id', 'posteam', 'game_id'),
+        Index('ix_play_by_play_defteam_game_id', 'defteam', 'game_id'),
+        Index('ix_play_by_play_play_type_game_id', 'play_type', 'game_id'),
+        {'postgresql_partition_by': 'RANGE (game_id)'}
+    )
 
     play_id = Column(Integer, nullable=False, primary_key=True)
     game_id = Column(Integer, nullable=False, primary_key=True)
@@ -294,3 +312,173 @@ class PlayByPlay(Base):
     defensive_two_point_conv = Column(Integer)
     defensive_extra_point_attempt = Column(Integer)
     defensive_extra_point_conv = Column(Integer)
+
+
+def season_game_id_range(season):
+    """Gets the range of the game ids of a season. Game ids start with the
+    date of the game (e.g. 2019090800), and a season's games are played
+    between March of its year and February of the next.
+
+    :param season: season, e.g. 2019
+    :type season: int
+    :return: first game id of the season, and first game id after it
+    :rtype: tuple of (int, int)
+    """
+    return season * 10**6 + 30100, (season + 1) * 10**6 + 30100
+
+
+def game_id_season(game_id):
+    """Gets the season of a game id, the inverse of season_game_id_range.
+
+    :param game_id: game id, e.g. 2019090800
+    :type game_id: int
+    :return: season, e.g. 2019
+    :rtype: int
+    """
+    return (int(game_id) - 30100) // 10**6
+
+
+class TeamGameStats(Base):
+    """A team's stats in a game, aggregated from its plays (pass and run
+    plays only) by pipeline/team_stats.py. Plays with the team on offense
+    make up plays to def_plays, the rest are with it on defense."""
+    __tablename__ = 'team_game_stats'
+    __table_args__ = (
+        Index('ix_team_game_stats_season_type_team', 'season', 'type', 'team'),
+    )
+
+    game_id = Column(Integer, autoincrement=False, nullable=False, primary_key=True)
+    team = Column(String(16), autoincrement=False, nullable=False, primary_key=True)
+    season = Column(Integer, autoincrement=False, nullable=False)
+    type = Column(String(16), autoincrement=False, nullable=False)
+    week = Column(Integer, autoincrement=False, nullable=False)
+    opponent = Column(String(16), autoincrement=False, nullable=False)
+    is_home = Column(Integer, autoincrement=False, nullable=False)
+    points_for = Column(Integer, autoincrement=False, nullable=True)
+    points_against = Column(Integer, autoincrement=False, nullable=True)
+    plays = Column(Integer, autoincrement=False, nullable=False)
+    pass_attempts = Column(Integer, autoincrement=False, nullable=False)
+    rush_attempts = Column(Integer, autoincrement=False, nullable=False)
+    yards_gained = Column(Integer, autoincrement=False, nullable=False)
+    epa = Column(Float, nullable=False)
+    successes = Column(Integer, autoincrement=False, nullable=False)
+    turnovers = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_1 = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_2 = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_3 = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_4 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_1 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_2 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_3 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_4 = Column(Integer, autoincrement=False, nullable=False)
+    def_plays = Column(Integer, autoincrement=False, nullable=False)
+    def_yards_allowed = Column(Integer, autoincrement=False, nullable=False)
+    def_epa = Column(Float, nullable=False)
+
+
+class TeamSeasonStats(Base):
+    """A team's stats in a season type, the sums of its TeamGameStats."""
+    __tablename__ = 'team_season_stats'
+
+    season = Column(Integer, autoincrement=False, nullable=False, primary_key=True)
+    type = Column(String(16), autoincrement=False, nullable=False, primary_key=True)
+    team = Column(String(16), autoincrement=False, nullable=False, primary_key=True)
+    games = Column(Integer, autoincrement=False, nullable=False)
+    wins = Column(Integer, autoincrement=False, nullable=False)
+    losses = Column(Integer, autoincrement=False, nullable=False)
+    ties = Column(Integer, autoincrement=False, nullable=False)
+    points_for = Column(Integer, autoincrement=False, nullable=False)
+    points_against = Column(Integer, autoincrement=False, nullable=False)
+    plays = Column(Integer, autoincrement=False, nullable=False)
+    pass_attempts = Column(Integer, autoincrement=False, nullable=False)
+    rush_attempts = Column(Integer, autoincrement=False, nullable=False)
+    yards_gained = Column(Integer, autoincrement=False, nullable=False)
+    epa = Column(Float, nullable=False)
+    successes = Column(Integer, autoincrement=False, nullable=False)
+    turnovers = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_1 = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_2 = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_3 = Column(Integer, autoincrement=False, nullable=False)
+    plays_down_4 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_1 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_2 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_3 = Column(Integer, autoincrement=False, nullable=False)
+    successes_down_4 = Column(Integer, autoincrement=False, nullable=False)
+    def_plays = Column(Integer, autoincrement=False, nullable=False)
+    def_yards_allowed = Column(Integer, autoincrement=False, nullable=False)
+    def_epa = Column(Float, nullable=False)
+
+
+class Player(Base):
+    """A player, with the name they last appeared under in play_by_play.
+    player_id is the id nflscrapR gives them, player_key a compact surrogate
+    key for the tables that reference them. Populated by pipeline/players.py."""
+    __tablename__ = 'players'
+
+    player_key = Column(Integer, nullable=False, primary_key=True)
+    player_id = Column(String(64), autoincrement=False, nullable=False, unique=True)
+    player_name = Column(String(64), autoincrement=False, nullable=True)
+
+
+class PlayParticipant(Base):
+    """A player's part in a play, one row per *_player_id column of
+    PlayByPlay that's set. role is the column without its _player_id
+    suffix (passer, receiver, solo_tackle_1...)."""
+    __tablename__ = 'play_participants'
+    __table_args__ = (
+        # covers the plays of a player, in the order they were played
+        Index('ix_play_participants_player_key_game_id_play_id', 'player_key', 'game_id', 'play_id'),
+    )
+
+    game_id = Column(Integer, autoincrement=False, nullable=False, primary_key=True)
+    play_id = Column(Integer, autoincrement=False, nullable=False, primary_key=True)
+    role = Column(String(64), autoincrement=False, nullable=False, primary_key=True)
+    player_key = Column(Integer, autoincrement=False, nullable=False)
+
+
+class PlayerGameStats(Base):
+    """A player's passing, rushing and receiving stats in a game, aggregated
+    from the plays they took part in by pipeline/player_stats.py. Season
+    stat lines are sums of these."""
+    __tablename__ = 'player_game_stats'
+    __table_args__ = (
+        # cover the season stat lines of a player, and the leaderboards of a season
+        Index('ix_player_game_stats_player_key_season_type', 'player_key', 'season', 'type'),
+        Index('ix_player_game_stats_season_type', 'season', 'type'),
+    )
+
+    game_id = Column(Integer, autoincrement=False, nullable=False, primary_key=True)
+    player_key = Column(Integer, autoincrement=False, nullable=False, primary_key=True)
+    season = Column(Integer, autoincrement=False, nullable=False)
+    type = Column(String(16), autoincrement=False, nullable=False)
+    week = Column(Integer, autoincrement=False, nullable=False)
+    team = Column(String(16), autoincrement=False, nullable=True)
+    attempts = Column(Integer, autoincrement=False, nullable=False)
+    completions = Column(Integer, autoincrement=False, nullable=False)
+    passing_yards = Column(Integer, autoincrement=False, nullable=False)
+    passing_air_yards = Column(Integer, autoincrement=False, nullable=False)
+    passing_tds = Column(Integer, autoincrement=False, nullable=False)
+    interceptions = Column(Integer, autoincrement=False, nullable=False)
+    sacks = Column(Integer, autoincrement=False, nullable=False)
+    passing_epa = Column(Float, nullable=False)
+    carries = Column(Integer, autoincrement=False, nullable=False)
+    rushing_yards = Column(Integer, autoincrement=False, nullable=False)
+    rushing_tds = Column(Integer, autoincrement=False, nullable=False)
+    rushing_epa = Column(Float, nullable=False)
+    targets = Column(Integer, autoincrement=False, nullable=False)
+    receptions = Column(Integer, autoincrement=False, nullable=False)
+    receiving_yards = Column(Integer, autoincrement=False, nullable=False)
+    receiving_air_yards = Column(Integer, autoincrement=False, nullable=False)
+    yards_after_catch = Column(Integer, autoincrement=False, nullable=False)
+    receiving_tds = Column(Integer, autoincrement=False, nullable=False)
+    receiving_epa = Column(Float, nullable=False)
+
+
+class DataVersion(Base):
+    """Version of the data in a table, bumped by the pipeline every time it
+    loads new rows. The api's response cache is invalidated when it changes."""
+    __tablename__ = 'data_versions'
+
+    table_name = Column(String(64), autoincrement=False, nullable=False, primary_key=True)
+    version = Column(Integer, autoincrement=False, nullable=False)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -4,20 +4,26 @@ suppressMessages(library("bitops"))
 suppressMessages(library("nflscrapR"))
 suppressMessages(library("optparse"))
 
+# works both when run with Rscript and when sourced by worker.r, as both live in this directory
+script_arg <- grep("^--file=", commandArgs(trailingOnly=FALSE), value=TRUE)[1]
+source(file.path(dirname(normalizePath(sub("^--file=", "", script_arg))), "utils.r"))
 
-main <- function() {
+
+main <- function(cli_args=commandArgs(trailingOnly=TRUE)) {
     # Argument parsing
     option_list <- list(
         make_option(c("-y", "--year"), type="character", default=2019, 
             help="season year", metavar="character"),
         make_option(c("-t", "--type"), type="character", default="reg", 
             help="week of games", metavar="character"),
+        make_option(c("-w", "--weeks"), type="character", default=NULL, 
+            help="comma separated weeks, defaults to all weeks", metavar="character"),
         make_option(c("-f", "--file"), type="character", default=NULL, 
-            help="file to write data to", metavar="character")
+            help="file to write data to, as csv, parquet or feather", metavar="character")
     ) 
 
     opt_parser <- OptionParser(option_list=option_list);
-    args <- parse_args(opt_parser);
+    args <- parse_args(opt_parser, args=cli_args);
 
     if (is.null(args$year)) {
         stop("year argument not supplied.")
@@ -33,14 +39,19 @@ main <- function() {
 
     year <- args$year
     game_type <- args$type  
-    csv_name <- args$file
+    output_path <- args$file
+    weeks <- NULL
+    if (!is.null(args$weeks)) {
+        weeks <- as.numeric(strsplit(args$weeks, ",", fixed=TRUE)[[1]])
+    }
 
     # Extract and dump data
-    games <- scrape_game_ids(year, type=game_type)
-    write.table(games, sep=",", file=csv_name, col.names=TRUE, row.names=FALSE, append=FALSE)
+    games <- scrape_game_ids(year, type=game_type, weeks=weeks)
+    write_output(games, output_path)
 }
 
-if(!interactive()) {
+# only run when called with Rscript, not when sourced by worker.r
+if(!interactive() && sys.nframe() == 0L) {
     print("Running games script...")
     main()
     print("Ran games script.")
@@ -4,36 +4,55 @@ suppressMessages(library("bitops"))
 suppressMessages(library("nflscrapR"))
 suppressMessages(library("optparse"))
 
+# works both when run with Rscript and when sourced by worker.r, as both live in this directory
+script_arg <- grep("^--file=", commandArgs(trailingOnly=FALSE), value=TRUE)[1]
+source(file.path(dirname(normalizePath(sub("^--file=", "", script_arg))), "utils.r"))
 
-main <- function() {
+
+main <- function(cli_args=commandArgs(trailingOnly=TRUE)) {
     # Argument parsing
     option_list <- list(
-        make_option(c("-y", "--game"), type="character", 
-            help="game id", metavar="character"),
+        make_option(c("-y", "--game"), type="character", default=NULL, 
+            help="comma separated game ids", metavar="character"),
+        make_option(c("-s", "--year"), type="character", default=NULL, 
+            help="season year, used when no game ids are given", metavar="character"),
+        make_option(c("-t", "--type"), type="character", default="reg", 
+            help="season type, used with --year", metavar="character"),
+        make_option(c("-w", "--weeks"), type="character", default=NULL, 
+            help="comma separated weeks, used with --year", metavar="character"),
         make_option(c("-f", "--file"), type="character", default=NULL, 
-            help="file to write data to", metavar="character")
+            help="file to write data to, as csv, parquet or feather", metavar="character")
     ) 
 
     opt_parser <- OptionParser(option_list=option_list);
-    args <- parse_args(opt_parser);
+    args <- parse_args(opt_parser, args=cli_args);
 
-    if (is.null(args$game)) {
-        stop("game id not given.")
+    if (is.null(args$game) && is.null(args$year)) {
+        stop("game id or year not given.")
     }
 
     if (is.null(args$file)) {
         stop("file name argument not supplied.")
     }
 
-    game_id <- args$game
-    csv_name <- args$file
-
-    # Extract and dump data
-    play_by_play <- scrape_json_play_by_play(game_id)
-    write.table(play_by_play, sep=",", file=csv_name, col.names=TRUE, row.names=FALSE, append=FALSE)
+    output_path <- args$file
+
+    # Extract and dump data - all games go into one file
+    if (!is.null(args$game)) {
+        game_ids <- strsplit(args$game, ",", fixed=TRUE)[[1]]
+        play_by_play <- dplyr::bind_rows(lapply(game_ids, scrape_json_play_by_play))
+    } else {
+        weeks <- NULL
+        if (!is.null(args$weeks)) {
+            weeks <- as.numeric(strsplit(args$weeks, ",", fixed=TRUE)[[1]])
+        }
+        play_by_play <- scrape_season_play_by_play(args$year, type=args$type, weeks=weeks)
+    }
+    write_output(play_by_play, output_path)
 }
 
-if(!interactive()) {
+# only run when called with Rscript, not when sourced by worker.r
+if(!interactive() && sys.nframe() == 0L) {
     print("Running play_by_play script...")
     main()
     print("Ran play_by_play script.")
@@ -0,0 +1,14 @@
+# Helpers shared by the nflscrapr job scripts.
+suppressMessages(library("arrow"))
+
+
+write_output <- function(df, path) {
+    # the extension of the path gives the format, matching etl_tools on the python side
+    if (grepl("\\.parquet$", path)) {
+        write_parquet(df, path)
+    } else if (grepl("\\.feather$", path)) {
+        write_feather(df, path)
+    } else {
+        write.table(df, sep=",", file=path, col.names=TRUE, row.names=FALSE, append=FALSE)
+    }
+}
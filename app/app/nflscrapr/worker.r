@@ -0,0 +1,65 @@
+# Long-lived worker that runs nflscrapr jobs without paying for R startup and
+# package loading on every job. Started and fed by the python nflscrapr module.
+#
+# Protocol - one request per line on stdin, fields separated by tabs:
+#     <job>\t<arg>\t<arg>...    e.g. games\t--year=2019\t--type=reg\t--file=/app/data/games_dump.csv
+# Each request is answered by a single status line on stdout:
+#     __NFLSCRAPR_WORKER__ OK
+#     __NFLSCRAPR_WORKER__ ERROR <message>
+# Anything else written to stdout is output of the job itself.
+suppressMessages(library("optparse"))
+
+SENTINEL <- "__NFLSCRAPR_WORKER__"
+JOBS <- c("games", "play_by_play")
+
+
+respond <- function(status) {
+    cat(SENTINEL, " ", status, "\n", sep="")
+    flush(stdout())
+}
+
+
+get_script_dir <- function() {
+    file_arg <- grep("^--file=", commandArgs(trailingOnly=FALSE), value=TRUE)[1]
+    dirname(normalizePath(sub("^--file=", "", file_arg)))
+}
+
+
+load_jobs <- function(script_dir) {
+    # each job script defines its own main(), so source them into separate environments
+    jobs <- list()
+    for (job in JOBS) {
+        job_env <- new.env()
+        sys.source(file.path(script_dir, paste0(job, ".r")), envir=job_env)
+        jobs[[job]] <- job_env$main
+    }
+    jobs
+}
+
+
+main <- function() {
+    jobs <- load_jobs(get_script_dir())
+    con <- file("stdin")
+    open(con)
+    respond("READY")
+
+    while (length(line <- readLines(con, n=1)) > 0) {
+        fields <- strsplit(line, "\t", fixed=TRUE)[[1]]
+        job <- fields[1]
+        status <- tryCatch({
+            if (is.null(jobs[[job]])) {
+                stop(paste(job, "job doesn't exist."))
+            }
+            jobs[[job]](fields[-1])
+            "OK"
+        }, error=function(e) {
+            paste("ERROR", gsub("\n", " ", conditionMessage(e)))
+        })
+        respond(status)
+    }
+    close(con)
+}
+
+if(!interactive()) {
+    main()
+}
@@ -3,7 +3,11 @@ import logging
 
 from . import (
     games,
-    play_by_play
+    nflscrapr,
+    play_by_play,
+    player_stats,
+    players,
+    team_stats
 )
 
 logging.basicConfig(level=logging.INFO, format='{%(filename)s:%(lineno)d} %(levelname)s - %(message)s')
@@ -13,8 +17,14 @@ def main():
     start_time = datetime.now()
     logging.info(f"Starting pipeline at {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
-    games.run()
-    play_by_play.run()
+    try:
+        games.run()
+        play_by_play.run()
+        players.run()
+        player_stats.run()
+        team_stats.run()
+    finally:
+        nflscrapr.shutdown_workers()
 
     logging.info(f"Pipeline finished in {datetime.now() - start_time}")
 
@@ -12,10 +12,29 @@ SEASON_TYPES_ORDER = {game_type: order for order, game_type in enumerate(SEASON_
 DATA_DIR = os.path.join(root_dir, "data")
 NFLSCRAPR_JOBS_PATH = os.path.join(root_dir, "nflscrapr")
 
-GAMES_DUMP_CSV_NAME = 'games_dump.csv'
-GAMES_DUMP_CSV_PATH = os.path.join(DATA_DIR, GAMES_DUMP_CSV_NAME)
+GAMES_REFRESH_MODE = 'incremental'  # (incremental|full) see pipeline/games.py
+GAMES_CHECK_ENGINE = 'sql'  # (sql|pandas) run the games integrity check in the db, or on the whole table in pandas
+
+# format of the files nflscrapr jobs write their output to (csv|parquet|feather)
+NFLSCRAPR_DUMP_FORMAT = 'parquet'
+
+GAMES_DUMP_NAME = f'games_dump.{NFLSCRAPR_DUMP_FORMAT}'
+GAMES_DUMP_PATH = os.path.join(DATA_DIR, GAMES_DUMP_NAME)
 GAMES_CSV_PATH = os.path.join(DATA_DIR, "games.csv")
 
-PLAY_BY_PLAY_DUMP_CSV_NAME = 'play_by_play_dump.csv'
-PLAY_BY_PLAY_DUMP_CSV_PATH = os.path.join(DATA_DIR, PLAY_BY_PLAY_DUMP_CSV_NAME)
+PLAY_BY_PLAY_DUMP_NAME = f'play_by_play_dump.{NFLSCRAPR_DUMP_FORMAT}'
+PLAY_BY_PLAY_DUMP_PATH = os.path.join(DATA_DIR, PLAY_BY_PLAY_DUMP_NAME)
 PLAY_BY_PLAY_CSV_PATH = os.path.join(DATA_DIR, "play_by_play.csv")
+PLAY_BY_PLAY_DUMP_TEMPLATE = os.path.join(DATA_DIR, f"play_by_play_dump_{{}}.{NFLSCRAPR_DUMP_FORMAT}")
+# memory mapped copy of each season of play_by_play for analytics reads, see etl_tools.extract_from_arrow_store
+PLAY_BY_PLAY_STORE_TEMPLATE = os.path.join(DATA_DIR, "play_by_play", "{}.arrow")
+
+# Play by play backfill settings
+PLAY_BY_PLAY_EXECUTOR = 'thread'  # (thread|process) pool used to run nflscrapr jobs concurrently
+PLAY_BY_PLAY_WORKERS = os.cpu_count() or 1
+PLAY_BY_PLAY_BATCH_SIZE = 32  # number of games extracted by a single nflscrapr job
+PLAY_BY_PLAY_BACKFILL_LIMIT = None  # max number of games to backfill per run, None for every missing game
+
+# Run nflscrapr jobs on long-lived R workers instead of one Rscript process per job
+NFLSCRAPR_PERSISTENT_WORKER = True
+NFLSCRAPR_WORKER_SHUTDOWN_TIMEOUT = 10  # seconds
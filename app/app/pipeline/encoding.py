@@ -0,0 +1,136 @@
+"""
+Compact encodings of the values that repeat on every play, for data held in
+memory or in the columnar store rather than in the database:
+
+- teams (home_team, posteam, td_team, penalty_team...) become int16 codes
+  from one code table, TEAMS, so they're the same in every season and every
+  dataframe, and can be compared and concatenated without decoding. Nulls
+  are NULL_CODE, so there's no null mask either
+- game ids decode to the season, date and number of the game, with vectorized
+  integer arithmetic and no string parsing. The week isn't in the game id
+
+The team columns of a season take ~10MiB as strings, ~2MiB as codes, and stay
+~2MiB a season when seasons are concatenated, see benchmarks/encoding.py.
+
+Example usage:
+    from . import encoding
+
+    df = encoding.encode_teams(df)
+    games = encoding.decode_game_ids(df['game_id'])
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    String,
+    Text
+)
+
+import models
+
+# the code of a team is its index, so teams are only ever appended
+TEAMS = (
+    'ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET', 'GB', 'HOU', 'IND', 'JAC', 'JAX',
+    'KC', 'LA', 'LAC', 'MIA', 'MIN', 'NE', 'NO', 'NYG', 'NYJ', 'OAK', 'PHI', 'PIT', 'SD', 'SEA', 'SF', 'STL', 'TB',
+    'TEN', 'WAS', 'LV',
+    # not a team, the side_of_field of the 50 yard line
+    'MID'
+)
+TEAM_CODES = {team: code for code, team in enumerate(TEAMS)}
+TEAM_DTYPE = 'int16'
+NULL_CODE = -1
+
+# short string columns of play_by_play holding a team, e.g. posteam, side_of_field, fumbled_1_team
+_STRING_COLUMNS = [
+    column.name for column in models.PlayByPlay.__table__.columns
+    if isinstance(column.type, String) and not isinstance(column.type, Text)
+]
+TEAM_COLUMNS = tuple(column for column in _STRING_COLUMNS if column.endswith('team') or column == 'side_of_field')
+
+
+def encode_team_values(values):
+    """Encodes teams to their codes. Values that aren't in TEAMS are logged
+    and encoded as nulls, so a new abbreviation doesn't stop the pipeline or
+    the api, add it to TEAMS to keep it.
+
+    :param values: team abbreviations, None/NaN for nulls
+    :type values: array-like
+    :return: codes, NULL_CODE for nulls and unknown teams
+    :rtype: numpy.ndarray of int16
+    """
+    # codes of the values' own categories, mapped to team codes, the last one for nulls (-1)
+    categorical = pd.Categorical(values)
+    unknown_teams = sorted(set(categorical.categories) - set(TEAM_CODES))
+    if unknown_teams:
+        logging.warning(f"Teams {unknown_teams} not in the team code table, encoding them as nulls.")
+    lookup = np.array(
+        [TEAM_CODES.get(team, NULL_CODE) for team in categorical.categories] + [NULL_CODE], dtype=TEAM_DTYPE
+    )
+    return lookup[categorical.codes]
+
+
+def encode_teams(df, columns=TEAM_COLUMNS):
+    """Replaces the teams in columns of df with their codes, see encode_team_values.
+    Columns that aren't in df, or are already encoded, are left as they are.
+
+    :param df: dataframe to encode
+    :type df: pandas.DataFrame
+    :param columns: team columns, defaults to TEAM_COLUMNS
+    :type columns: tuple of str, optional
+    :return: the encoded dataframe
+    :rtype: pandas.DataFrame
+    """
+    columns = [column for column in columns if column in df.columns and not _is_encoded(df[column])]
+    if not columns:
+        return df
+    return df.assign(**{column: encode_team_values(df[column]) for column in columns})
+
+
+def decode_teams(df, columns=TEAM_COLUMNS):
+    """Replaces the codes in columns of df with their teams, as categories
+    of TEAMS. Columns that aren't in df, or aren't encoded, are left as they are.
+
+    :param df: dataframe to decode
+    :type df: pandas.DataFrame
+    :param columns: team columns, defaults to TEAM_COLUMNS
+    :type columns: tuple of str, optional
+    :return: the decoded dataframe
+    :rtype: pandas.DataFrame
+    """
+    columns = [column for column in columns if column in df.columns and _is_encoded(df[column])]
+    if not columns:
+        return df
+    return df.assign(**{
+        column: pd.Categorical.from_codes(df[column].values, categories=TEAMS) for column in columns
+    })
+
+
+def decode_game_ids(game_ids):
+    """Decodes game ids (e.g. 2019090800: the first game of 2019-09-08) into
+    the season, date and number of their games. The week isn't in the game
+    id, it's in the games table.
+
+    :param game_ids: game ids
+    :type game_ids: array-like of int
+    :return: dataframe of season (int16), game_date (datetime64) and game_number (int8)
+    :rtype: pandas.DataFrame
+    """
+    game_ids = np.asarray(game_ids, dtype='int64')
+    dates = game_ids // 100
+    game_dates = pd.to_datetime(pd.DataFrame({
+        'year': dates // 10000,
+        'month': dates // 100 % 100,
+        'day': dates % 100
+    }))
+    return pd.DataFrame({
+        # see models.game_id_season
+        'season': ((game_ids - 30100) // 10**6).astype('int16'),
+        'game_date': game_dates.values,
+        'game_number': (game_ids % 100).astype('int8')
+    })
+
+
+def _is_encoded(series):
+    """Whether a column already holds team codes."""
+    return pd.api.types.is_integer_dtype(series.dtype)
@@ -1,17 +1,43 @@
 """
 A collection of functions to help with standard ETL operations, with
-both csv's and databases.
-
-TODO:
-- make the load_to_db(if_exist='replace') functionality an atomic rewrite,
-  rather than a drop and create style.
+files (csv, parquet and feather) and databases.
 """
+from contextlib import contextmanager
+import io
 import logging
 import os
+import re
 
 import pandas as pd
+import pyarrow as pa
 import sqlalchemy
 
+import models
+from . import schema
+
+LOAD_METHODS = ("insert", "copy")
+COPY_CHUNKSIZE = 10000  # rows rendered to csv at a time when streaming a COPY
+STAGING_SUFFIX = '__staging'
+FILE_FORMATS = ("csv", "parquet", "feather")
+PARTITION_TEMPLATE = "{table_name}_{season}"
+
+# views and foreign keys that depend on a table, which DROP TABLE would fail on
+DEPENDENTS_QUERY = """
+SELECT DISTINCT CAST(rewrite.ev_class AS regclass)::text
+FROM pg_depend AS depend
+JOIN pg_rewrite AS rewrite ON rewrite.oid = depend.objid
+WHERE depend.refobjid = CAST(:table_name AS regclass) AND rewrite.ev_class <> depend.refobjid
+UNION
+SELECT CAST(conrelid AS regclass)::text
+FROM pg_constraint
+WHERE confrelid = CAST(:table_name AS regclass) AND contype = 'f'
+"""
+GRANTS_QUERY = """
+SELECT grantee, privilege_type
+FROM information_schema.role_table_grants
+WHERE table_schema = current_schema() AND table_name = :table_name
+"""
+
 
 def extract_from_csv(csv_path):
     """Loads csv into dataframe.
@@ -21,26 +47,97 @@ def extract_from_csv(csv_path):
     :return: dataframe if file exists, else None
     :rtype: pandas.DataFrame
     """
-    if not os.path.exists(csv_path):
-        raise ValueError(f"Path {csv_path} doesn't exist!")
-
     if not csv_path.endswith(".csv"):
         raise ValueError(f"File {csv_path} is not a .csv file!")
 
-    logging.info(f'Loading csv data from {csv_path}...')
-    return pd.read_csv(csv_path)
+    return extract_from_file(csv_path)
+
+
+def extract_from_file(path, columns=None, dtype=None, model=None):
+    """Loads a csv, parquet or feather file into a dataframe.
+
+    :param path: path to file to load, its extension gives the format
+    :type path: str
+    :param columns: only load these columns, defaults to None for all columns
+    :type columns: list, optional
+    :param dtype: dtypes of (some of) the columns, defaults to None to keep the file's or inferred types
+    :type dtype: dict, optional
+    :param model: SQLAlchemy model to take the dtypes from (see schema.py), dtype takes precedence over it
+    :type model: sqlalchemy.ext.declarative.api.DeclarativeMeta, optional
+    :return: dataframe if file exists, else None
+    :rtype: pandas.DataFrame
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Path {path} doesn't exist!")
+
+    file_format = _get_file_format(path)
+    logging.info(f'Loading {file_format} data from {path}...')
+    dtype = _get_dtypes(dtype, model)
 
+    if file_format == 'csv':
+        # parse straight into the dtypes, except for dates which read_csv doesn't take as a dtype
+        csv_dtype = {column: column_dtype for column, column_dtype in dtype.items()
+                     if column_dtype != schema.DATETIME_DTYPE}
+        df = pd.read_csv(path, usecols=columns, dtype=csv_dtype or None)
+        dtype = {column: column_dtype for column, column_dtype in dtype.items() if column not in csv_dtype}
+    elif file_format == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_feather(path, columns=columns)
 
-def extract_from_db(db_conn, query):
+    if dtype:
+        df = schema.apply_dtypes(df, dtype)
+    return df
+
+
+def extract_from_arrow_store(path, columns=None):
+    """Opens an Arrow IPC file written by load_to_arrow_store, memory mapped.
+
+    Nothing is copied or parsed: the columns are views on the file, paged in
+    from the OS page cache as they're read. Processes that open the same file
+    share one copy of it in memory.
+
+    :param path: path to the file
+    :type path: str
+    :param columns: only return these columns, defaults to None for all columns
+    :type columns: list, optional
+    :raises ValueError: if the file doesn't exist, or a column isn't in it
+    :return: the columns, call .to_pandas() for a dataframe (which copies them)
+    :rtype: pyarrow.Table
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Path {path} doesn't exist!")
+
+    # the table keeps the map open, it's closed when the table is garbage collected
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if columns is None:
+        return table
+
+    missing_columns = [column for column in columns if column not in table.schema.names]
+    if missing_columns:
+        raise ValueError(f"Columns {missing_columns} not in {path}!")
+    return pa.Table.from_arrays([table.column(column) for column in columns], names=list(columns))
+
+
+def extract_from_db(db_conn, query, dtype=None, model=None):
     """Extracts data from a database
 
     :param db_conn: sqlalchemy database connection
     :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
     :param query: query to run on database to extract data
     :type query: str
+    :param dtype: dtypes of (some of) the columns, defaults to None to keep the inferred types
+    :type dtype: dict, optional
+    :param model: SQLAlchemy model to take the dtypes from (see schema.py), dtype takes precedence over it
+    :type model: sqlalchemy.ext.declarative.api.DeclarativeMeta, optional
     """
     _check_db_conn(db_conn)
-    return pd.read_sql(query, db_conn)
+    df = pd.read_sql(query, db_conn)
+
+    dtype = _get_dtypes(dtype, model)
+    if dtype:
+        df = schema.apply_dtypes(df, dtype)
+    return df
 
 
 def load_to_csv(df, csv_path, append=False, sort_by=None, sort_order='asc'):
@@ -57,16 +154,35 @@ def load_to_csv(df, csv_path, append=False, sort_by=None, sort_order='asc'):
     :param sort_order: sort ascending or descending, defaults to 'asc'
     :type sort_order: str, optional
     """
+    if not csv_path.endswith(".csv"):
+        raise ValueError(f"File {csv_path} is not a .csv file!")
+
+    load_to_file(df, csv_path, append=append, sort_by=sort_by, sort_order=sort_order)
+
+
+def load_to_file(df, path, append=False, sort_by=None, sort_order='asc'):
+    """Loads dataframe to a csv, parquet or feather file.
+
+    :param df: dataframe to load to a file
+    :type df: pandas.DataFrame
+    :param path: path to file, its extension gives the format
+    :type path: str
+    :param append: append to existing data, defaults to False
+    :type append: bool, optional
+    :param sort_by: column to sort by, defaults to None
+    :type sort_by: str, optional
+    :param sort_order: sort ascending or descending, defaults to 'asc'
+    :type sort_order: str, optional
+    """
     if not isinstance(df, pd.DataFrame):
         raise TypeError(f"Type of df is {type(df)}, it should be pandas.DataFrame")
 
-    if not csv_path.endswith(".csv"):
-        raise ValueError(f"File {csv_path} is not a .csv file!")
+    file_format = _get_file_format(path)
 
     if append:
-        if not os.path.exists(csv_path):
-            raise ValueError(f"File {csv_path} doesn't exist, cannot append!")
-        existing_data = extract_from_csv(csv_path)
+        if not os.path.exists(path):
+            raise ValueError(f"File {path} doesn't exist, cannot append!")
+        existing_data = extract_from_file(path)
         df = pd.concat([existing_data, df])
 
     if sort_by:
@@ -75,13 +191,60 @@ def load_to_csv(df, csv_path, append=False, sort_by=None, sort_order='asc'):
         ascending = True if sort_order == 'asc' else False
         df = df.sort_values(by=sort_by, ascending=ascending)
 
-    df.to_csv(csv_path, index=False)
+    if file_format == 'csv':
+        df.to_csv(path, index=False)
+    elif file_format == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        # feather needs a default index
+        df.reset_index(drop=True).to_feather(path)
 
 
-def load_to_db(db_conn, table_name, df, if_exists="append"):
+def load_to_arrow_store(df, path):
+    """Writes a dataframe to an uncompressed Arrow IPC file, to be memory
+    mapped by extract_from_arrow_store.
+
+    The file is written next to path then renamed over it, so readers never
+    see a partial file, and readers that mapped the previous file keep
+    reading it until they open path again.
+
+    Nullable int columns (see schema.py) are written as arrow ints with a
+    null mask. They read back as ints, or as floats if they have nulls, call
+    schema.apply_dtypes on the dataframe to get the nullable ints back.
+
+    :param df: dataframe to write
+    :type df: pandas.DataFrame
+    :param path: path to the file
+    :type path: str
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError(f"Type of df is {type(df)}, it should be pandas.DataFrame")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_arrays([_to_arrow_array(df[column]) for column in df.columns], names=list(df.columns))
+    temp_path = f"{path}.tmp"
+    with pa.OSFile(temp_path, 'wb') as sink:
+        writer = pa.RecordBatchFileWriter(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+    os.replace(temp_path, path)
+    logging.info(f"Wrote {len(df)} rows to {path}.")
+
+
+def load_to_db(db_conn, table_name, df, if_exists="append", method="insert", season=None):
     """Writes the data in df to table_name.
 
-    Currently, the replace function is NOT atomic. Added to TODO.
+    With if_exists="replace", the data is loaded into a staging table that is
+    swapped in for table_name in one transaction, see _replace_table.
+
+    With a season, table_name must be partitioned by season (see
+    create_partition), and only the partition of the season is written to,
+    creating it if needed. With if_exists="replace" only that partition is
+    swapped, see _replace_partition. Every row of df must be of the season.
+
+    With method="copy", the dataframe is streamed to the table with postgres'
+    COPY FROM STDIN, rather than with pandas' INSERT statements. The table
+    must already exist.
 
     :param db_conn: sqlalchemy database connection
     :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
@@ -89,17 +252,257 @@ def load_to_db(db_conn, table_name, df, if_exists="append"):
     :type table_name: str
     :param df: dataframe containing data to write to db
     :type df: pandas.DataFrame
+    :param if_exists: what to do if the table exists (fail|replace|append), defaults to "append"
+    :type if_exists: str, optional
+    :param method: how to write the rows (insert|copy), defaults to "insert"
+    :type method: str, optional
+    :param season: season of the partition to write to, defaults to None (the whole table)
+    :type season: int, optional
     """
     if if_exists not in ("fail", "replace", "append"):
         raise ValueError(f"{if_exists} not an accepted value for if_exists. Must be (fail|replace|append)")
+
+    if method not in LOAD_METHODS:
+        raise ValueError(f"{method} not an accepted value for method. Must be ({'|'.join(LOAD_METHODS)})")
     _check_db_conn(db_conn)
 
-    # manually overwrite this so pandas doesn't dynamically recreate the schema
+    if season is not None:
+        partition = create_partition(db_conn, table_name, season)
+        if if_exists == "replace":
+            _replace_partition(db_conn, table_name, season, df, method)
+            return
+        table_name = partition
+
+    # load into a copy of the existing table so pandas doesn't dynamically recreate the schema
     if if_exists == "replace":
-        db_conn.execute(f"TRUNCATE TABLE {table_name};")
-        if_exists = "append"
+        _replace_table(db_conn, table_name, df, method)
+        return
+
+    if method == "copy":
+        _copy_to_db(db_conn, table_name, df, if_exists)
+    else:
+        df.to_sql(table_name, db_conn, if_exists=if_exists, index=False)
+
+
+def upsert_to_db(db_conn, table_name, df, conflict_columns, method="copy"):
+    """Inserts the rows in df into table_name, updating the existing rows that
+    conflict on conflict_columns. Rows that haven't changed are left untouched.
+
+    The rows are loaded into a temporary table first, then merged with a
+    single INSERT ... ON CONFLICT statement, in one transaction.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of table to write to
+    :type table_name: str
+    :param df: dataframe containing data to write to db
+    :type df: pandas.DataFrame
+    :param conflict_columns: columns of a unique constraint of table_name, e.g. its primary key
+    :type conflict_columns: list or tuple
+    :param method: how to write the rows to the temporary table (insert|copy), defaults to "copy"
+    :type method: str, optional
+    :return: number of rows inserted or updated
+    :rtype: int
+    """
+    if method not in LOAD_METHODS:
+        raise ValueError(f"{method} not an accepted value for method. Must be ({'|'.join(LOAD_METHODS)})")
+
+    missing_columns = set(conflict_columns) - set(df.columns)
+    if missing_columns:
+        raise ValueError(f"Conflict columns {missing_columns} not in df!")
+    _check_db_conn(db_conn)
+
+    temp_table = f"{table_name}__upsert"
+    columns = ", ".join(f'"{column}"' for column in df.columns)
+    update_columns = [f'"{column}"' for column in df.columns if column not in conflict_columns]
+    conflict_target = ", ".join(f'"{column}"' for column in conflict_columns)
+
+    if update_columns:
+        existing_values = ", ".join(f"{table_name}.{column}" for column in update_columns)
+        new_values = ", ".join(f"EXCLUDED.{column}" for column in update_columns)
+        on_conflict = (f"DO UPDATE SET ({', '.join(update_columns)}) = ROW({new_values}) "
+                       f"WHERE ROW({existing_values}) IS DISTINCT FROM ROW({new_values})")
+    else:
+        on_conflict = "DO NOTHING"
+
+    with _connect(db_conn) as conn, conn.begin():
+        conn.execute(f"CREATE TEMP TABLE {temp_table} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP")
+        load_to_db(conn, temp_table, df, method=method)
+        result = conn.execute(
+            f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {temp_table} "
+            f"ON CONFLICT ({conflict_target}) {on_conflict}"
+        )
+        return result.rowcount
+
+
+def get_upsert_updates(columns, conflict_columns):
+    """Gets the SET clause of an INSERT ... ON CONFLICT DO UPDATE, which
+    overwrites every column but the conflict columns.
+
+    :param columns: columns of the insert
+    :type columns: list or tuple
+    :param conflict_columns: columns of the conflict target
+    :type conflict_columns: list or tuple
+    :return: SET clause, without SET
+    :rtype: str
+    """
+    update_columns = [column for column in columns if column not in conflict_columns]
+    return (f"({', '.join(update_columns)}) = "
+            f"ROW({', '.join(f'EXCLUDED.{column}' for column in update_columns)})")
+
+
+def get_partition_name(table_name, season):
+    """Gets the name of the partition of a season of table_name.
+
+    :param table_name: name of the partitioned table
+    :type table_name: str
+    :param season: season, e.g. 2019
+    :type season: int
+    :return: name of the partition
+    :rtype: str
+    """
+    if not isinstance(season, int):
+        raise ValueError(f"season must be an int, got {season}")
+    return PARTITION_TEMPLATE.format(table_name=table_name, season=season)
+
+
+def create_partition(db_conn, table_name, season):
+    """Creates the partition of a season of table_name, if it doesn't exist.
+
+    Partitioned tables are range partitioned by season on their game_id,
+    see models.season_game_id_range.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of the partitioned table
+    :type table_name: str
+    :param season: season, e.g. 2019
+    :type season: int
+    :return: name of the partition
+    :rtype: str
+    """
+    partition = get_partition_name(table_name, season)
+    db_conn.execute(f"CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table_name} "
+                    f"FOR VALUES {_get_partition_bounds(season)}")
+    return partition
+
+
+def attach_partition(db_conn, table_name, season, partition=None):
+    """Attaches a table as the partition of a season of table_name.
+
+    The table must have the columns of table_name. Postgres scans it to check
+    its rows are in the season, unless it has a CHECK constraint that proves it.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of the partitioned table
+    :type table_name: str
+    :param season: season, e.g. 2019
+    :type season: int
+    :param partition: name of the table to attach, defaults to the name of the season's partition
+    :type partition: str, optional
+    """
+    partition = partition or get_partition_name(table_name, season)
+    db_conn.execute(f"ALTER TABLE {table_name} ATTACH PARTITION {partition} "
+                    f"FOR VALUES {_get_partition_bounds(season)}")
 
-    df.to_sql(table_name, db_conn, if_exists=if_exists, index=False)
+
+def detach_partition(db_conn, table_name, season):
+    """Detaches the partition of a season from table_name. It's left as a
+    standalone table, with the same name.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of the partitioned table
+    :type table_name: str
+    :param season: season, e.g. 2019
+    :type season: int
+    :return: name of the detached table
+    :rtype: str
+    """
+    partition = get_partition_name(table_name, season)
+    db_conn.execute(f"ALTER TABLE {table_name} DETACH PARTITION {partition}")
+    return partition
+
+
+def truncate_partition(db_conn, table_name, season):
+    """Deletes every row of a season of table_name, without touching the other seasons.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of the partitioned table
+    :type table_name: str
+    :param season: season, e.g. 2019
+    :type season: int
+    """
+    db_conn.execute(f"TRUNCATE TABLE {get_partition_name(table_name, season)}")
+
+
+def bump_data_version(db_conn, table_name):
+    """Bumps the version of the data in table_name in the data_versions table,
+    which tells the api that responses it cached for that data are stale.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of the table that was loaded
+    :type table_name: str
+    :return: the new version
+    :rtype: int
+    """
+    _check_db_conn(db_conn)
+    result = db_conn.execute(
+        sqlalchemy.text(
+            "INSERT INTO data_versions (table_name, version) VALUES (:table_name, 1) "
+            "ON CONFLICT (table_name) DO UPDATE "
+            "SET version = data_versions.version + 1, updated_at = now() "
+            "RETURNING version"
+        ),
+        table_name=table_name
+    )
+    version = result.scalar()
+    logging.info(f"Bumped data version of {table_name} to {version}.")
+    return version
+
+
+def _get_dtypes(dtype, model):
+    """Merges the dtypes given explicitly with the ones derived from the model.
+
+    :param dtype: dtypes of (some of) the columns
+    :type dtype: dict
+    :param model: SQLAlchemy model to take the dtypes from
+    :type model: sqlalchemy.ext.declarative.api.DeclarativeMeta
+    :return: dict of {column name: dtype}, empty if neither were given
+    :rtype: dict
+    """
+    dtypes = dict(schema.get_dtypes(model)) if model is not None else {}
+    dtypes.update(dtype or {})
+    return dtypes
+
+
+def _get_file_format(path):
+    """Gets the format of a file from its extension.
+
+    :param path: path to file
+    :type path: str
+    :raises ValueError: if the extension isn't one of FILE_FORMATS
+    :return: the file format
+    :rtype: str
+    """
+    file_format = os.path.splitext(path)[1][1:]
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"File {path} is not one of the supported formats ({'|'.join(FILE_FORMATS)})!")
+    return file_format
+
+
+def _to_arrow_array(series):
+    """Converts a column to an arrow array. Nullable int columns are converted
+    from their values and null mask, pyarrow can't convert them by itself on
+    older pandas."""
+    if pd.api.types.is_extension_array_dtype(series.dtype) and pd.api.types.is_integer_dtype(series.dtype):
+        mask = series.isna().values
+        values = series.fillna(0).astype(series.dtype.numpy_dtype).values
+        return pa.array(values, mask=mask, type=pa.from_numpy_dtype(values.dtype))
+    return pa.Array.from_pandas(series)
 
 
 def _check_db_conn(db_conn):
@@ -110,3 +513,271 @@ def _check_db_conn(db_conn):
     """
     if not isinstance(db_conn, (sqlalchemy.engine.base.Engine, sqlalchemy.engine.base.Connection)):
         raise TypeError(f"Given database connection is not type sqlalchemy.engine.base.(Engine | Connection).")
+
+
+@contextmanager
+def _connect(db_conn):
+    """Yields a connection for db_conn, opening (and closing) one if db_conn is an engine.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    """
+    if isinstance(db_conn, sqlalchemy.engine.base.Engine):
+        with db_conn.connect() as conn:
+            yield conn
+    else:
+        yield db_conn
+
+
+def _get_partition_bounds(season):
+    """Gets the FOR VALUES clause of the partition of a season."""
+    start, end = models.season_game_id_range(season)
+    return f"FROM ({start}) TO ({end})"
+
+
+def _is_partitioned(conn, table_name):
+    """Whether table_name is a partitioned table."""
+    return conn.execute(sqlalchemy.text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = CAST(:table_name AS regclass)"
+    ), table_name=table_name).scalar()
+
+
+def _replace_table(db_conn, table_name, df, method):
+    """Replaces the data in table_name with df, atomically.
+
+    - loads df into a staging table, see _load_staging_table
+    - in one transaction, drops table_name and renames the staging table and
+      its indexes to take its place
+
+    Readers keep seeing the old data until the swap commits, and are only
+    blocked for the duration of the swap itself.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of table to replace
+    :type table_name: str
+    :param df: dataframe containing data to write to db
+    :type df: pandas.DataFrame
+    :param method: how to write the rows (insert|copy)
+    :type method: str
+    """
+    with _connect(db_conn) as conn:
+        if _is_partitioned(conn, table_name):
+            raise ValueError(f"{table_name} is partitioned, replace it a season at a time.")
+
+        staging_table, constraint_names, index_names = _load_staging_table(conn, table_name, df, method)
+
+        logging.info(f"Swapping {staging_table} in for {table_name}...")
+        with conn.begin():
+            conn.execute(f"DROP TABLE {table_name}")
+            _rename_staging_table(conn, table_name, constraint_names, index_names)
+
+
+def _replace_partition(db_conn, table_name, season, df, method):
+    """Replaces the data in the partition of a season of table_name with df,
+    atomically, like _replace_table does for a whole table.
+
+    The staging table gets a CHECK constraint matching the partition bounds,
+    and copies of the partition's indexes, so attaching it in place of the
+    partition needs no scan and no index build. The load and the index
+    builds happen before the swap, without locking table_name. The swap
+    itself (DETACH PARTITION) takes an ACCESS EXCLUSIVE lock on table_name,
+    so every season is blocked for the duration of its transaction, which
+    only renames and attaches.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of the partitioned table
+    :type table_name: str
+    :param season: season of the partition to replace
+    :type season: int
+    :param df: dataframe containing data to write to db
+    :type df: pandas.DataFrame
+    :param method: how to write the rows (insert|copy)
+    :type method: str
+    """
+    partition = get_partition_name(table_name, season)
+    start, end = models.season_game_id_range(season)
+    bounds_constraint = f"{partition}_bounds"
+
+    with _connect(db_conn) as conn:
+        staging_table, constraint_names, index_names = _load_staging_table(conn, partition, df, method)
+        conn.execute(f"ALTER TABLE {staging_table} ADD CONSTRAINT {bounds_constraint} "
+                     f"CHECK (game_id IS NOT NULL AND game_id >= {start} AND game_id < {end})")
+
+        logging.info(f"Swapping {staging_table} in for partition {partition} of {table_name}...")
+        with conn.begin():
+            detach_partition(conn, table_name, season)
+            conn.execute(f"DROP TABLE {partition}")
+            _rename_staging_table(conn, partition, constraint_names, index_names)
+            attach_partition(conn, table_name, season)
+            conn.execute(f"ALTER TABLE {partition} DROP CONSTRAINT {bounds_constraint}")
+
+
+def _load_staging_table(conn, table_name, df, method):
+    """Loads df into a new staging table with the columns, constraints,
+    indexes and grants of table_name, to be swapped in for it.
+
+    - creates a staging table with the columns of table_name, and bulk loads
+      df into it with no index to maintain
+    - builds the constraints and indexes of table_name on it, each in one pass
+      over the loaded rows
+    - grants it the privileges granted on table_name, which the swap drops
+
+    The staging table is a regular, logged table: an UNLOGGED one would skip
+    WAL for the load, but making it durable before the swap (SET LOGGED)
+    rewrites it whole and writes it all to WAL anyway, which costs more than
+    logging the load.
+
+    Views and foreign keys that depend on table_name would stop the swap's
+    DROP TABLE (or be dropped with it), so tables with any are refused before
+    anything is loaded.
+
+    :param conn: sqlalchemy database connection
+    :type conn: sqlalchemy.engine.base.Connection
+    :param table_name: name of table to stage
+    :type table_name: str
+    :param df: dataframe containing data to write to db
+    :type df: pandas.DataFrame
+    :param method: how to write the rows (insert|copy)
+    :type method: str
+    :raises ValueError: if views or foreign keys depend on table_name
+    :return: tuple of (staging table name, constraint names, names of indexes not backing a constraint)
+    :rtype: tuple
+    """
+    dependents = [row[0] for row in conn.execute(sqlalchemy.text(DEPENDENTS_QUERY), table_name=table_name)]
+    if dependents:
+        raise ValueError(f"{table_name} can't be replaced, {', '.join(sorted(dependents))} depend on it.")
+
+    staging_table = f"{table_name}{STAGING_SUFFIX}"
+
+    logging.info(f"Loading {len(df)} rows into staging table {staging_table}...")
+    conn.execute(f"DROP TABLE IF EXISTS {staging_table}")
+    conn.execute(f"CREATE TABLE {staging_table} (LIKE {table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    load_to_db(conn, staging_table, df, if_exists="append", method=method)
+    constraint_names, index_names = _copy_indexes(conn, table_name, staging_table)
+    _copy_grants(conn, table_name, staging_table)
+    return staging_table, constraint_names, index_names
+
+
+def _rename_staging_table(conn, table_name, constraint_names, index_names):
+    """Renames a staging table, its constraints and its indexes to the names of the table it replaces."""
+    conn.execute(f"ALTER TABLE {table_name}{STAGING_SUFFIX} RENAME TO {table_name}")
+    for constraint_name in constraint_names:
+        conn.execute(f"ALTER TABLE {table_name} "
+                     f"RENAME CONSTRAINT {constraint_name}{STAGING_SUFFIX} TO {constraint_name}")
+    for index_name in index_names:
+        conn.execute(f"ALTER INDEX {index_name}{STAGING_SUFFIX} RENAME TO {index_name}")
+
+
+def _copy_indexes(conn, table_name, staging_table):
+    """Builds the constraints and indexes of table_name on staging_table.
+
+    The copies are named after the originals, with STAGING_SUFFIX appended.
+
+    :param conn: sqlalchemy database connection
+    :type conn: sqlalchemy.engine.base.Connection
+    :param table_name: name of table to copy the indexes from
+    :type table_name: str
+    :param staging_table: name of table to build the indexes on
+    :type staging_table: str
+    :return: tuple of (constraint names, names of indexes not backing a constraint)
+    :rtype: tuple
+    """
+    constraints = conn.execute(sqlalchemy.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = CAST(:table_name AS regclass) AND contype IN ('p', 'u', 'f', 'x')"
+    ), table_name=table_name).fetchall()
+    for name, definition in constraints:
+        conn.execute(f"ALTER TABLE {staging_table} ADD CONSTRAINT {name}{STAGING_SUFFIX} {definition}")
+
+    constraint_names = [name for name, _ in constraints]
+    indexes = conn.execute(sqlalchemy.text(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = :table_name"
+    ), table_name=table_name).fetchall()
+    index_names = [name for name, _ in indexes if name not in constraint_names]
+    for name, definition in indexes:
+        if name in index_names:
+            conn.execute(_staging_index_definition(definition, name, table_name, staging_table))
+
+    return constraint_names, index_names
+
+
+def _copy_grants(conn, table_name, staging_table):
+    """Grants staging_table the privileges granted on table_name."""
+    grants = conn.execute(sqlalchemy.text(GRANTS_QUERY), table_name=table_name).fetchall()
+    for grantee, privilege in grants:
+        grantee = grantee if grantee == 'PUBLIC' else f'"{grantee}"'
+        conn.execute(f"GRANT {privilege} ON {staging_table} TO {grantee}")
+
+
+def _staging_index_definition(definition, index_name, table_name, staging_table):
+    """Rewrites a CREATE INDEX statement from pg_indexes to build the index on staging_table.
+
+    :param definition: the index definition, as found in pg_indexes.indexdef
+    :type definition: str
+    :param index_name: name of the index
+    :type index_name: str
+    :param table_name: name of table the index is on
+    :type table_name: str
+    :param staging_table: name of table to build the index on
+    :type staging_table: str
+    :return: the CREATE INDEX statement for staging_table
+    :rtype: str
+    """
+    pattern = rf"INDEX {re.escape(index_name)} (ON (ONLY )?(\S+\.)?){re.escape(table_name)} "
+    return re.sub(pattern, rf"INDEX {index_name}{STAGING_SUFFIX} \1{staging_table} ", definition, count=1)
+
+
+def _copy_to_db(db_conn, table_name, df, if_exists):
+    """Streams the data in df to table_name with COPY FROM STDIN, in one transaction.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param table_name: name of table to write to
+    :type table_name: str
+    :param df: dataframe containing data to write to db
+    :type df: pandas.DataFrame
+    :param if_exists: what to do if the table exists (fail|append)
+    :type if_exists: str
+    """
+    columns = ", ".join(f'"{column}"' for column in df.columns)
+    copy_statement = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    with _connect(db_conn) as conn:
+        if if_exists == "fail" and conn.dialect.has_table(conn, table_name):
+            raise ValueError(f"Table {table_name} already exists.")
+
+        with conn.begin():
+            with conn.connection.cursor() as cursor:
+                cursor.copy_expert(copy_statement, _CsvStream(df, COPY_CHUNKSIZE))
+
+
+class _CsvStream:
+    """Read-only file-like object that renders a dataframe as csv, one chunk of rows at a time.
+
+    Lets COPY consume a large dataframe without holding the whole csv in memory.
+    Float columns that only hold whole numbers (ints with nulls, as pandas reads
+    them) are written as ints, since postgres won't COPY '1.0' into an integer column.
+    """
+
+    def __init__(self, df, chunksize):
+        float_columns = df.select_dtypes(include='float').columns
+        self._int_dtypes = {
+            column: 'Int64' for column in float_columns
+            if (df[column].dropna() % 1 == 0).all()
+        }
+        self._chunks = (df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize))
+        self._current = io.StringIO()
+
+    def read(self, size=-1):
+        data = self._current.read(size)
+        while size < 0 or len(data) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            chunk = chunk.astype(self._int_dtypes)
+            self._current = io.StringIO(chunk.to_csv(index=False, header=False))
+            data += self._current.read(size - len(data) if size >= 0 else -1)
+        return data
@@ -1,10 +1,12 @@
 """
 LOGIC:
 - find the latest season in the data with incomplete games (state_of_game != POST)
-- drop this data and reload it
+- full refresh: drop this data and reload it
+- incremental refresh (default): re-extract only the weeks with incomplete games, plus
+  the season types that have no data yet, and upsert them
 
 NOTE:
-- nflscrapr API takes weeks as a vector, so we just load one season at a time
+- nflscrapr API takes weeks as a vector, so we load one season type (or some weeks of it) at a time
 
 """
 import logging
@@ -12,6 +14,7 @@ import logging
 import pandas as pd
 
 import db
+import models
 from . import (
     config,
     etl_tools,
@@ -46,8 +49,55 @@ def _data_integrity_check(df):
         raise ValueError(f"Type of df is {type(df)}, it should be pandas.DataFrame")
 
     logging.info(f"Checking integrity of games dataframe with shape {df.shape}...")
+    _check_games_summary(*_summarize_games(df))
+    logging.info("Integrity check passed.")
+
+
+def _summarize_games(df):
+    """Summarizes the games data into what the integrity check needs, in one
+    pass over each of the columns involved.
 
-    seasons = df['season'].unique()
+    :param df: dataframe of games
+    :type df: pandas.DataFrame
+    :return: tuple of (season types per season, number of duplicate game ids, missing reg weeks per season)
+    :rtype: tuple
+    """
+    # season x type crosstab of game counts
+    season_type_counts = df.groupby(['season', 'type'], observed=True).size().unstack(fill_value=0)
+    has_season_type = dict(zip(season_type_counts.index, season_type_counts.values > 0))
+    season_types = {
+        season: set(season_type_counts.columns[has_season_type[season]])
+        for season in pd.unique(df['season'])
+    }
+
+    n_duplicate_game_ids = int(df['game_id'].duplicated().sum())
+
+    # season x week pivot of reg season game counts
+    reg_season_df = df[df['type'] == 'reg']
+    reg_week_counts = reg_season_df.groupby(['season', 'week'], observed=True).size().unstack(fill_value=0)
+    reg_week_counts = reg_week_counts.reindex(columns=range(1, 18), fill_value=0)
+    weeks = reg_week_counts.columns
+    missing_reg_weeks = {
+        season: {int(week) for week in weeks[is_missing]}
+        for season, is_missing in zip(reg_week_counts.index, reg_week_counts.values == 0)
+        if is_missing.any()
+    }
+
+    return season_types, n_duplicate_game_ids, missing_reg_weeks
+
+
+def _check_games_summary(season_types, n_duplicate_game_ids, missing_reg_weeks):
+    """Runs the integrity check conditions on a summary of the games data.
+
+    :param season_types: season types with data, for each season with data
+    :type season_types: dict of {int: set}
+    :param n_duplicate_game_ids: number of game ids that appear more than once
+    :type n_duplicate_game_ids: int
+    :param missing_reg_weeks: missing weeks, for each season with reg season data missing weeks
+    :type missing_reg_weeks: dict of {int: set}
+    :raises DataIntegrityError: if one of the conditions isn't met
+    """
+    seasons = list(season_types)
     max_season = int(max(seasons))
 
     expected_seasons = set(range(config.START_SEASON, max_season + 1))
@@ -57,35 +107,104 @@ def _data_integrity_check(df):
         raise DataIntegrityError(f"Most recent season with data is {max_season}"
                                  f" but there's no data for {missing_season}!")
 
-    game_ids = list(df['game_id'])
-    if len(game_ids) != len(set(game_ids)):
+    if n_duplicate_game_ids > 0:
         raise DataIntegrityError("There are duplicate game ids!")
 
-    for season in list(seasons):
-        season_types = set(df[df['season'] == season]['type'].unique())
+    for season in seasons:
+        season_types_for_season = season_types[season]
 
-        if season != max_season and len(season_types) != 3:
+        if season != max_season and len(season_types_for_season) != 3:
             raise DataIntegrityError(f"{season} is not the max season of {max_season}"
-                                     f"and only has {len(season_types)} season types")
+                                     f"and only has {len(season_types_for_season)} season types")
 
-        elif len(season_types) == 1 and season_types != {'pre'}:
-            raise DataIntegrityError(f"There is only 1 season type for {seasons}: {season_types}"
+        elif len(season_types_for_season) == 1 and season_types_for_season != {'pre'}:
+            raise DataIntegrityError(f"There is only 1 season type for {season}: {season_types_for_season}"
                                      f"and its not 'pre'!")
 
-        elif len(season_types) == 2 and season_types != {'pre', 'reg'}:
+        elif len(season_types_for_season) == 2 and season_types_for_season != {'pre', 'reg'}:
             raise DataIntegrityError(f"There are 2 season types for {season} and they're not ['pre', 'reg']!")
 
-        elif 'reg' in df[df['season'] == season]['type'].unique():
-            reg_season_df = df[(df['season'] == season) & (df['type'] == 'reg')]
-            weeks = reg_season_df['week'].unique()
-            target_weeks = set(range(1, 18))
-            missing_weeks = target_weeks.difference(set(weeks))
-            if missing_weeks:
-                raise DataIntegrityError(f"{season} reg season is missing weeks {missing_weeks}!")
+        elif 'reg' in season_types_for_season and season in missing_reg_weeks:
+            raise DataIntegrityError(f"{season} reg season is missing weeks {missing_reg_weeks[season]}!")
+
 
+def _data_integrity_check_db(db_conn):
+    """Same check as _data_integrity_check, run against the games table with
+    aggregate queries, so only a few rows per season leave the database.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :raises DataIntegrityError: if one of the conditions isn't met
+    """
+    season_types, n_duplicate_game_ids, missing_reg_weeks = _summarize_games_table(db_conn)
+    if not season_types:
+        logging.info("Games table is empty! No games data recorded.")
+        return
+
+    logging.info(f"Checking integrity of games table with {len(season_types)} seasons...")
+    _check_games_summary(season_types, n_duplicate_game_ids, missing_reg_weeks)
     logging.info("Integrity check passed.")
 
 
+def _summarize_games_table(db_conn):
+    """Summarizes the games table the same way _summarize_games does a dataframe.
+
+    Only seasons with missing reg weeks come back from the missing weeks query.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :return: tuple of (season types per season, number of duplicate game ids, missing reg weeks per season)
+    :rtype: tuple
+    """
+    season_types_query = """
+        SELECT season, array_agg(DISTINCT type) AS types
+        FROM games
+        GROUP BY season
+        ORDER BY season
+    """
+    season_types = {season: set(types) for season, types in db_conn.execute(season_types_query)}
+
+    duplicates_query = "SELECT count(*) - count(DISTINCT game_id) FROM games"
+    n_duplicate_game_ids = db_conn.execute(duplicates_query).scalar()
+
+    missing_reg_weeks_query = """
+        SELECT reg_seasons.season, array_agg(target_weeks.week ORDER BY target_weeks.week) AS weeks
+        FROM (SELECT DISTINCT season FROM games WHERE type = 'reg') AS reg_seasons
+        CROSS JOIN generate_series(1, 17) AS target_weeks(week)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM games
+            WHERE games.season = reg_seasons.season AND games.type = 'reg' AND games.week = target_weeks.week
+        )
+        GROUP BY reg_seasons.season
+    """
+    missing_reg_weeks = {season: set(weeks) for season, weeks in db_conn.execute(missing_reg_weeks_query)}
+
+    return season_types, n_duplicate_game_ids, missing_reg_weeks
+
+
+def _get_latest_season_and_type_db(db_conn):
+    """Same as _get_latest_season_and_type, run against the games table.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :return: tuple of (latest_season, latest_season_type)
+    :rtype: tuple
+    """
+    query = """
+        SELECT season, array_agg(DISTINCT type) AS types
+        FROM games
+        WHERE state_of_game = 'POST'
+            AND season = (SELECT max(season) FROM games WHERE state_of_game = 'POST')
+        GROUP BY season
+    """
+    row = db_conn.execute(query).first()
+    if row is None:
+        return (None, None)
+
+    latest_season, season_types = row
+    return latest_season, _get_latest_season_type(list(season_types))
+
+
 def _get_latest_season_and_type(df):
     """Gets the latest season and season type in the games data
 
@@ -187,22 +306,56 @@ def _get_seasons_grid(start_season, start_season_type):
     return grid
 
 
-def _extract_games_data(season, season_type):
+def _get_refresh_batches(df, start_season, start_season_type):
+    """Finds what needs to be re-extracted for an incremental refresh, starting
+    at the given season and season type.
+
+    Season types with no data at all are extracted in full, and season types
+    with data are only extracted for the weeks that have incomplete games.
+
+    :param df: dataframe of games
+    :type df: pandas.DataFrame
+    :param start_season: year of season to start at
+    :type start_season: int
+    :param start_season_type: type of season to start at (pre, reg, post)
+    :type start_season_type: str
+    :return: list of (season, season type, weeks) tuples, weeks is None for all weeks
+    :rtype: list of tuples
+    """
+    existing_batches = set(df[['season', 'type']].drop_duplicates().itertuples(index=False, name=None))
+    incomplete_games = df[df['state_of_game'] != 'POST']
+    incomplete_weeks = incomplete_games.groupby(['season', 'type'], observed=True)['week'].unique()
+
+    batches = []
+    for season, season_type in _get_seasons_grid(start_season, start_season_type):
+        if (season, season_type) not in existing_batches:
+            batches.append((season, season_type, None))
+        elif (season, season_type) in incomplete_weeks.index:
+            weeks = sorted(int(week) for week in incomplete_weeks[(season, season_type)])
+            batches.append((season, season_type, weeks))
+
+    return batches
+
+
+def _extract_games_data(season, season_type, weeks=None):
     """Runs the nflscrapr R script for the given season and type
 
     :param season: year of season
     :type season: int
     :param season_type: type of season (pre, reg, post)
     :type season_type: str
+    :param weeks: weeks to extract, defaults to None for all weeks
+    :type weeks: list of int, optional
     :return: the output of the call to nflscrapr as a dataframe
     :rtype: pandas.DataFrame
     """
     nflscrapr.run(
         'games',
         season=season,
-        season_type=season_type
+        season_type=season_type,
+        weeks=weeks
     )
-    nflscrapr_output = etl_tools.extract_from_csv(config.GAMES_DUMP_CSV_PATH)
+    nflscrapr_output = etl_tools.extract_from_file(config.GAMES_DUMP_PATH, model=models.Game)
     return nflscrapr_output
 
 
@@ -211,16 +364,54 @@ def run():
     Runs the workflow for extracting and loading games data.
     - Finds the starting point for extracting new data
     - Extracts new data using the nflscrapr module
-    - Loads to database
+    - Loads to database, either replacing the latest season type or upserting changed weeks
     """
     games_db_conn = db.get_db_eng()
-    games_query = "SELECT * FROM GAMES"
-    games_data = etl_tools.extract_from_db(games_db_conn, games_query)
-    _data_integrity_check(games_data)
 
-    latest_season, latest_season_type = _get_latest_season_and_type(games_data)
+    if config.GAMES_CHECK_ENGINE not in ('pandas', 'sql'):
+        raise ValueError(f"{config.GAMES_CHECK_ENGINE} not an accepted check engine. Must be (pandas|sql)")
+
+    if config.GAMES_CHECK_ENGINE == 'sql':
+        _data_integrity_check_db(games_db_conn)
+        latest_season, latest_season_type = _get_latest_season_and_type_db(games_db_conn)
+        # one row per week and state, all the incremental refresh needs
+        games_query = "SELECT DISTINCT season, type, week, state_of_game FROM games"
+        games_data = etl_tools.extract_from_db(games_db_conn, games_query, model=models.Game)
+
+    else:
+        games_query = "SELECT * FROM GAMES"
+        games_data = etl_tools.extract_from_db(games_db_conn, games_query, model=models.Game)
+        _data_integrity_check(games_data)
+        latest_season, latest_season_type = _get_latest_season_and_type(games_data)
+
     logging.info(f"Latest season and type in current data: {(latest_season, latest_season_type)}")
 
+    if config.GAMES_REFRESH_MODE not in ('full', 'incremental'):
+        raise ValueError(f"{config.GAMES_REFRESH_MODE} not an accepted refresh mode. Must be (full|incremental)")
+
+    if config.GAMES_REFRESH_MODE == 'incremental':
+        n_rows = _run_incremental(games_db_conn, games_data, latest_season, latest_season_type)
+    else:
+        n_rows = _run_full(games_db_conn, latest_season, latest_season_type)
+
+    if n_rows:
+        etl_tools.bump_data_version(games_db_conn, 'games')
+
+    logging.info("Pipeline completed.")
+
+
+def _run_full(games_db_conn, latest_season, latest_season_type):
+    """Drops the latest season type and reloads everything from there.
+
+    :param games_db_conn: sqlalchemy database connection
+    :type games_db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param latest_season: latest season with completed games, None if there are none
+    :type latest_season: int
+    :param latest_season_type: type of the latest season with completed games
+    :type latest_season_type: str
+    :return: number of rows loaded
+    :rtype: int
+    """
     if latest_season is None:
         batch_start_season, batch_start_type = config.START_SEASON, config.SEASON_TYPES[0]
 
@@ -230,6 +421,7 @@ def run():
 
     logging.info(f"Starting batch at {(batch_start_season, batch_start_type)}...")
 
+    n_rows = 0
     batches = _get_seasons_grid(batch_start_season, batch_start_type)
     for batch in batches:
         season, season_type = batch
@@ -240,6 +432,44 @@ def run():
             games_db_conn,
             'games',
             batch_data,
+            method="copy",
         )
+        n_rows += batch_data.shape[0]
+    return n_rows
+
+
+def _run_incremental(games_db_conn, games_data, latest_season, latest_season_type):
+    """Re-extracts the weeks with incomplete games and the season types with
+    no data, and upserts them on game_id.
+
+    :param games_db_conn: sqlalchemy database connection
+    :type games_db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param games_data: games currently in the database
+    :type games_data: pandas.DataFrame
+    :param latest_season: latest season with completed games, None if there are none
+    :type latest_season: int
+    :param latest_season_type: type of the latest season with completed games
+    :type latest_season_type: str
+    :return: number of rows inserted or updated
+    :rtype: int
+    """
+    if latest_season is None:
+        latest_season, latest_season_type = config.START_SEASON, config.SEASON_TYPES[0]
 
-    logging.info("Pipeline completed.")
+    batches = _get_refresh_batches(games_data, latest_season, latest_season_type)
+    logging.info(f"Refreshing {len(batches)} batches starting at {(latest_season, latest_season_type)}...")
+
+    total_rows = 0
+    for season, season_type, weeks in batches:
+        logging.info(f"Starting new batch: extracting data for {season}-{season_type}, "
+                     f"weeks {weeks if weeks else 'all'}...")
+        batch_data = _extract_games_data(season, season_type, weeks)
+        n_rows = etl_tools.upsert_to_db(
+            games_db_conn,
+            'games',
+            batch_data,
+            conflict_columns=('game_id',),
+        )
+        logging.info(f"Data extracted. Upserted {n_rows} of {batch_data.shape[0]} rows.")
+        total_rows += n_rows
+    return total_rows
@@ -2,21 +2,101 @@
 Python wrapper for the nflscrapr R package.
 This module is used to run jobs from the nflscrapr directory in the root of this project.
 
+Jobs are sent to a long-lived R worker (nflscrapr/worker.r) so the R startup and
+package loading is only paid once per thread, rather than once per job. If the
+worker can't be used, the job falls back to a one-shot Rscript subprocess.
+
 Example usage:
     from . import nflscrapr
 
     job_name = 'games'
     nflscrapr.run(job_name, **kwargs)
 """
+import atexit
 import logging
+import os
 import subprocess
 import sys
+import threading
 
 from . import config
 
+WORKER_SENTINEL = '__NFLSCRAPR_WORKER__'
+
+# one worker per thread, so concurrent jobs never share a worker
+_local = threading.local()
+_workers = []
+_workers_lock = threading.Lock()
+_worker_unavailable = False  # set when a worker fails to start, so jobs stop retrying it
+
+
+class RWorkerError(Exception):
+    pass
+
+
+class RWorker:
+    """A warm Rscript process that runs nflscrapr jobs sent over stdin."""
+
+    def __init__(self):
+        command = ['Rscript', f"{config.NFLSCRAPR_JOBS_PATH}/worker.r"]
+        logging.info(f"Starting R worker with command {command}...")
+        try:
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                bufsize=1
+            )
+        except OSError as e:
+            raise RWorkerError(f"Couldn't start R worker: {e}")
+
+        status, output = self._read_response()
+        if status != 'READY':
+            raise RWorkerError(f"R worker failed to start with output:\n{output}")
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, command):
+        """Runs the job for the command on the worker.
+
+        :param command: the Rscript command built for the job, see _get_command
+        :type command: list
+        :raises RWorkerError: if the worker died or can't be reached
+        :return: tuple of (status, output) where status is 'OK' or 'ERROR <message>'
+        :rtype: tuple
+        """
+        job = os.path.splitext(os.path.basename(command[1]))[0]
+        request = "\t".join([job] + command[2:])
+        try:
+            self.process.stdin.write(f"{request}\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise RWorkerError(f"Couldn't send job to R worker: {e}")
+        return self._read_response()
+
+    def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=config.NFLSCRAPR_WORKER_SHUTDOWN_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def _read_response(self):
+        output = []
+        for line in self.process.stdout:
+            if line.startswith(WORKER_SENTINEL):
+                return line[len(WORKER_SENTINEL):].strip(), "".join(output)
+            output.append(line)
+        raise RWorkerError(f"R worker exited with code {self.process.wait()} and output:\n{''.join(output)}")
+
 
 def run(job, **kwargs):
-    """Runs the nflscrapr job as a subprocess.
+    """Runs the nflscrapr job, on the R worker if enabled, else as a subprocess.
 
     :param season: year of season
     :type season: int
@@ -24,6 +104,46 @@ def run(job, **kwargs):
     :type season_type: str
     """
     command = _get_command(job, **kwargs)
+    if config.NFLSCRAPR_PERSISTENT_WORKER and not _worker_unavailable:
+        try:
+            _run_on_worker(command)
+            return
+        except RWorkerError as e:
+            logging.warning(f"R worker unavailable, falling back to a subprocess: {e}")
+            _discard_worker()
+
+    _run_subprocess(command)
+
+
+def shutdown_workers():
+    """Stops every R worker started by this process."""
+    with _workers_lock:
+        while _workers:
+            _workers.pop().close()
+
+
+def _run_on_worker(command):
+    """Runs the command on this thread's R worker.
+
+    :param command: the Rscript command built for the job
+    :type command: list
+    :raises RWorkerError: if the worker died or can't be reached
+    """
+    worker = _get_worker()
+    logging.info(f"Running job on R worker with command {command}...")
+    status, output = worker.run(command)
+    if status != 'OK':
+        logging.info(f"{status}\n{output}")
+        sys.exit(1)
+    logging.info(f"Command ran successfully with output:\n{output}")
+
+
+def _run_subprocess(command):
+    """Runs the command as a one-shot Rscript subprocess.
+
+    :param command: the Rscript command built for the job
+    :type command: list
+    """
     try:
         logging.info(f"Running R subprocess with command {command}...")
         output = subprocess.check_output(command).decode()
@@ -33,6 +153,43 @@ def run(job, **kwargs):
         sys.exit(1)
 
 
+def _get_worker():
+    """Gets the R worker for the current thread, starting one if needed.
+
+    :return: the R worker
+    :rtype: RWorker
+    """
+    global _worker_unavailable
+
+    worker = getattr(_local, 'worker', None)
+    if worker is None or not worker.alive:
+        try:
+            worker = RWorker()
+        except RWorkerError:
+            _worker_unavailable = True
+            raise
+        _local.worker = worker
+        with _workers_lock:
+            _workers.append(worker)
+    return worker
+
+
+def _discard_worker():
+    """Stops and forgets the current thread's R worker, if it has one."""
+    worker = getattr(_local, 'worker', None)
+    if worker is None:
+        return
+
+    _local.worker = None
+    with _workers_lock:
+        if worker in _workers:
+            _workers.remove(worker)
+    worker.close()
+
+
+atexit.register(shutdown_workers)
+
+
 def _get_command(job, **kwargs):
     """Gets the command to execute the given job.
 
@@ -56,6 +213,8 @@ def _get_command(job, **kwargs):
 def _games_command(**kwargs):
     """Formats the command to run the games nflscrapr job.
 
+    An optional 'weeks' kwarg limits the job to those weeks of the season type.
+
     :return: the bash command to run
     :rtype: list
     """
@@ -70,24 +229,49 @@ def _games_command(**kwargs):
         f"{config.NFLSCRAPR_JOBS_PATH}/games.r",
         f"--year={kwargs.get('season')}",
         f"--type={kwargs.get('season_type')}",
-        f"--file={config.GAMES_DUMP_CSV_PATH}"
+        f"--file={config.GAMES_DUMP_PATH}"
     ]
+    if kwargs.get('weeks'):
+        command.append(f"--weeks={','.join(str(week) for week in kwargs.get('weeks'))}")
     return command
 
 
 def _play_by_play_command(**kwargs):
     """Formats the command to run the play_by_play nflscrapr job.
 
+    The job extracts either the given games ('game_id' or an iterable of
+    'game_ids'), or a whole 'season', optionally narrowed down with
+    'season_type' and 'weeks'. Every game ends up in one output file.
+
+    An optional 'file' kwarg overrides the default dump path, so that
+    concurrent jobs don't write over each other's output.
+
     :return: the bash command to run
     :rtype: list
     """
-    if "game_id" not in kwargs:
-        raise ValueError("'game_id' arg missing from kwargs!")
-
     command = [
         'Rscript',
-        f"{config.NFLSCRAPR_JOBS_PATH}/play_by_play.r",
-        f"--game={kwargs.get('game_id')}",
-        f"--file={config.PLAY_BY_PLAY_DUMP_CSV_PATH}"
+        f"{config.NFLSCRAPR_JOBS_PATH}/play_by_play.r"
     ]
+
+    if "game_ids" in kwargs:
+        game_ids = list(kwargs.get('game_ids'))
+        if len(game_ids) == 0:
+            raise ValueError("'game_ids' arg is empty!")
+        command.append(f"--game={','.join(str(game_id) for game_id in game_ids)}")
+
+    elif "game_id" in kwargs:
+        command.append(f"--game={kwargs.get('game_id')}")
+
+    elif "season" in kwargs:
+        command.append(f"--year={kwargs.get('season')}")
+        if "season_type" in kwargs:
+            command.append(f"--type={kwargs.get('season_type')}")
+        if "weeks" in kwargs:
+            command.append(f"--weeks={','.join(str(week) for week in kwargs.get('weeks'))}")
+
+    else:
+        raise ValueError("'game_id', 'game_ids' or 'season' arg missing from kwargs!")
+
+    command.append(f"--file={kwargs.get('file', config.PLAY_BY_PLAY_DUMP_PATH)}")
     return command
@@ -1,58 +1,254 @@
+"""
+LOGIC:
+- find the games that are finished (state_of_game = POST) but have no play by play data
+- split those games into batches, and extract each batch with one nflscrapr job
+- run the jobs concurrently with a pool, and load each batch as its job finishes, one load at a time
+
+NOTE:
+- each job writes to its own dump file, so jobs never clobber each other's output
+- play_by_play is partitioned by season, each batch is loaded into the partitions of its seasons
+- reload_season re-extracts a whole season, swaps it in for its partition without touching the others' data,
+  then recomputes the tables derived from it (team stats, players, player stats) for the season's games
+- the seasons that were loaded are then exported to their arrow store file (PLAY_BY_PLAY_STORE_TEMPLATE),
+  before the data version is bumped, so readers that see the new version read the new files
+- teams are stored as their int16 codes in the arrow store files, see encoding.py, the database keeps the strings
+"""
+from concurrent.futures import (
+    as_completed,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
 import logging
+import os
+
+import pandas as pd
 
 import db
+import models
 from . import (
     config,
+    encoding,
     etl_tools,
-    nflscrapr
+    nflscrapr,
+    player_stats,
+    players,
+    team_stats
 )
 
 TEST_GAME_IDS = (2017090700, 2017091007, 2017091008)
 
+# play_by_play and the tables derived from it, whose data versions reload_season bumps
+RELOADED_TABLES = (
+    'play_by_play', 'team_game_stats', 'team_season_stats', 'players', 'play_participants', 'player_game_stats'
+)
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor
+}
+
 
 def _extract_games_game_ids(db_conn):
     query = "SELECT game_id FROM games WHERE state_of_game = 'POST'"
-    return etl_tools.extract_from_db(db_conn, query)
+    return etl_tools.extract_from_db(db_conn, query, model=models.Game)
+
+
+def _extract_season_game_ids(db_conn, season):
+    start, end = models.season_game_id_range(season)
+    query = f"SELECT game_id FROM games WHERE state_of_game = 'POST' AND game_id >= {start} AND game_id < {end}"
+    return etl_tools.extract_from_db(db_conn, query, model=models.Game)
 
 
 def _extract_play_by_play_game_ids(db_conn):
     query = "SELECT DISTINCT game_id FROM play_by_play"
-    return etl_tools.extract_from_db(db_conn, query)
+    return etl_tools.extract_from_db(db_conn, query, model=models.PlayByPlay)
+
 
+def _extract_play_by_play(game_ids):
+    """Runs the nflscrapr play by play R script for a batch of game_ids
 
-def _extract_play_by_play(game_id):
-    """Runs the nflscrapr play by play R script for the game_id
+    The job writes to a dump file specific to the batch, which is removed
+    once it has been read.
 
-    :param game_id: id of the game
-    :type game_id: int
+    :param game_ids: ids of the games
+    :type game_ids: list of int
     :return: the output of the call to nflscrapr as a dataframe
     :rtype: pandas.DataFrame
     """
+    dump_path = config.PLAY_BY_PLAY_DUMP_TEMPLATE.format(game_ids[0])
     nflscrapr.run(
         'play_by_play',
-        game_id=game_id,
+        game_ids=game_ids,
+        file=dump_path
     )
-    nflscrapr_output = etl_tools.extract_from_csv(config.PLAY_BY_PLAY_DUMP_CSV_PATH)
+    nflscrapr_output = etl_tools.extract_from_file(dump_path, model=models.PlayByPlay)
+    os.remove(dump_path)
     return nflscrapr_output
 
 
+def _get_batches(game_ids, batch_size):
+    """Splits the game ids into batches of at most batch_size.
+
+    :param game_ids: ids of the games
+    :type game_ids: list of int
+    :param batch_size: max number of games per batch
+    :type batch_size: int
+    :raises ValueError: if batch_size isn't a positive int
+    :return: list of batches of game ids
+    :rtype: list of lists
+    """
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise ValueError(f"batch_size must be a positive int, got {batch_size}")
+
+    return [game_ids[i:i + batch_size] for i in range(0, len(game_ids), batch_size)]
+
+
+def export_season(db_conn, season):
+    """Writes a season of play_by_play to its arrow store file, replacing the
+    previous one, see etl_tools.load_to_arrow_store. Teams are written as
+    their codes, see encoding.encode_teams.
+
+    :param db_conn: sqlalchemy database connection
+    :type db_conn: sqlalchemy.engine.base.Engine | sqlalchemy.engine.base.Connection
+    :param season: season, e.g. 2019
+    :type season: int
+    """
+    partition = etl_tools.get_partition_name('play_by_play', season)
+    query = f"SELECT * FROM {partition} ORDER BY game_id, play_id"
+    play_by_play_data = etl_tools.extract_from_db(db_conn, query, model=models.PlayByPlay)
+    play_by_play_data = encoding.encode_teams(play_by_play_data)
+    etl_tools.load_to_arrow_store(play_by_play_data, config.PLAY_BY_PLAY_STORE_TEMPLATE.format(season))
+
+
+def _split_by_season(play_by_play_data):
+    """Splits play by play data into the rows of each season, see encoding.decode_game_ids.
+
+    :param play_by_play_data: play by play data
+    :type play_by_play_data: pandas.DataFrame
+    :return: dict of {season: rows of the season}
+    :rtype: dict
+    """
+    seasons = encoding.decode_game_ids(play_by_play_data['game_id'])['season']
+    return {int(season): rows for season, rows in play_by_play_data.groupby(seasons.values)}
+
+
+def _extract_batches(batches):
+    """Extracts the play by play data of the batches of games concurrently,
+    yielding each batch and its data as its job finishes.
+
+    :param batches: batches of game ids, see _get_batches
+    :type batches: list of lists
+    """
+    with _get_executor(config.PLAY_BY_PLAY_EXECUTOR, config.PLAY_BY_PLAY_WORKERS) as executor:
+        futures = {executor.submit(_extract_play_by_play, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _get_executor(executor_type, max_workers):
+    """Creates the pool used to run the nflscrapr jobs.
+
+    :param executor_type: type of pool (thread|process)
+    :type executor_type: str
+    :param max_workers: number of jobs to run at once
+    :type max_workers: int
+    :raises ValueError: if executor_type or max_workers isn't valid
+    :return: the pool
+    :rtype: concurrent.futures.Executor
+    """
+    if executor_type not in EXECUTORS:
+        raise ValueError(f"{executor_type} not an accepted executor type. Must be ({'|'.join(EXECUTORS)})")
+
+    if not isinstance(max_workers, int) or max_workers < 1:
+        raise ValueError(f"max_workers must be a positive int, got {max_workers}")
+
+    return EXECUTORS[executor_type](max_workers=max_workers)
+
+
 def run():
+    """
+    Runs the workflow for extracting and loading play by play data.
+    - Finds the finished games without play by play data
+    - Extracts their data in batches, concurrently, using the nflscrapr module
+    - Loads each batch to the database as its extraction finishes
+    - Exports the seasons that were loaded to their arrow store files
+    - Bumps the data version of play_by_play if anything was loaded
+    """
     db_conn = db.get_db_eng()
 
     all_played_game_ids = _extract_games_game_ids(db_conn)
     existing_game_ids = _extract_play_by_play_game_ids(db_conn)
-    missing_game_ids = set(all_played_game_ids['game_id']) - set(existing_game_ids['game_id'])
-
-    logging.info(f"Grabbing play by play data for {len(missing_game_ids)} games...")
-
-    backfill_limit = 10
-    for i, game_id in enumerate(missing_game_ids, start=1):
-        if i > backfill_limit: break
-        logging.info(f"{i}/{backfill_limit}: Extracting play by play data for game_id={game_id}...")
-        play_by_play_data = _extract_play_by_play(game_id)
-        logging.info(f"Data extracted. Loading {len(play_by_play_data)} rows...")
-        etl_tools.load_to_db(
-            db_conn,
-            'play_by_play',
-            play_by_play_data,
-        )
+    missing_game_ids = sorted(set(all_played_game_ids['game_id']) - set(existing_game_ids['game_id']))
+
+    if config.PLAY_BY_PLAY_BACKFILL_LIMIT is not None:
+        missing_game_ids = missing_game_ids[:config.PLAY_BY_PLAY_BACKFILL_LIMIT]
+
+    batches = _get_batches(missing_game_ids, config.PLAY_BY_PLAY_BATCH_SIZE)
+    logging.info(f"Grabbing play by play data for {len(missing_game_ids)} games in {len(batches)} batches with "
+                 f"{config.PLAY_BY_PLAY_WORKERS} {config.PLAY_BY_PLAY_EXECUTOR} workers...")
+
+    # loads happen here as jobs finish, so only one writer hits the db at a time
+    loaded_seasons = set()
+    for i, (batch, play_by_play_data) in enumerate(_extract_batches(batches), start=1):
+        logging.info(f"{i}/{len(batches)}: Extracted play by play data for {len(batch)} games "
+                     f"({batch[0]}..{batch[-1]}). Loading {len(play_by_play_data)} rows...")
+        for season, season_data in _split_by_season(play_by_play_data).items():
+            etl_tools.load_to_db(
+                db_conn,
+                'play_by_play',
+                season_data,
+                method="copy",
+                season=season
+            )
+            loaded_seasons.add(season)
+
+    for season in sorted(loaded_seasons):
+        export_season(db_conn, season)
+
+    if batches:
+        etl_tools.bump_data_version(db_conn, 'play_by_play')
+
+
+def reload_season(season):
+    """
+    Re-extracts the play by play data of every finished game of a season, and
+    replaces the season's partition of play_by_play with it, atomically. The
+    extraction and the load don't lock play_by_play, the swap locks all of it
+    for one short transaction, see etl_tools._replace_partition.
+
+    The tables derived from play_by_play are then recomputed for the games of
+    the season, replacing their participants and player stats, since the
+    stages' own runs only pick up games they don't have yet.
+
+    :param season: season, e.g. 2019
+    :type season: int
+    """
+    db_conn = db.get_db_eng()
+
+    game_ids = sorted(_extract_season_game_ids(db_conn, season)['game_id'])
+    if not game_ids:
+        logging.info(f"No finished games in {season}, nothing to reload.")
+        return
+
+    batches = _get_batches(game_ids, config.PLAY_BY_PLAY_BATCH_SIZE)
+    logging.info(f"Reloading play by play data for {len(game_ids)} games of {season} in {len(batches)} batches...")
+    play_by_play_data = pd.concat([data for _, data in _extract_batches(batches)], ignore_index=True)
+
+    logging.info(f"Replacing partition of {season} with {len(play_by_play_data)} rows...")
+    etl_tools.load_to_db(
+        db_conn,
+        'play_by_play',
+        play_by_play_data,
+        if_exists="replace",
+        method="copy",
+        season=season
+    )
+    export_season(db_conn, season)
+
+    logging.info(f"Recomputing team stats, players and player stats for the {len(game_ids)} games of {season}...")
+    team_stats.refresh(db_conn, game_ids)
+    players.refresh(db_conn, game_ids, replace=True)
+    player_stats.refresh(db_conn, game_ids, replace=True)
+
+    for table_name in RELOADED_TABLES:
+        etl_tools.bump_data_version(db_conn, table_name)
@@ -0,0 +1,129 @@
+"""
+LOGIC:
+- find the games with play participants that have no player stats yet
+- aggregate the plays of the passers, rushers and receivers of those games into one row per player per game
+  (player_game_stats), with an upsert
+
+NOTE:
+- everything runs as SQL in the database, only the game ids come back to python
+- season stat lines and leaderboards are sums over player_game_stats, see api/players.py
+- depends on pipeline/players.py, which must have run for the games first
+"""
+import logging
+
+import sqlalchemy as sa
+
+import db
+from . import etl_tools
+
+# {column of player_game_stats: aggregate over the plays of a player in a game}, by the role it's counted for
+PASSING_STATS = {
+    'attempts': "COUNT(*) FILTER (WHERE role = 'passer' AND pass_attempt = 1 AND sack = 0)",
+    'completions': "COUNT(*) FILTER (WHERE role = 'passer' AND complete_pass = 1)",
+    'passing_yards': "SUM(yards_gained) FILTER (WHERE role = 'passer' AND complete_pass = 1)",
+    'passing_air_yards': "SUM(air_yards) FILTER (WHERE role = 'passer' AND pass_attempt = 1 AND sack = 0)",
+    'passing_tds': "COUNT(*) FILTER (WHERE role = 'passer' AND pass_touchdown = 1)",
+    'interceptions': "COUNT(*) FILTER (WHERE role = 'passer' AND interception = 1)",
+    'sacks': "COUNT(*) FILTER (WHERE role = 'passer' AND sack = 1)",
+    'passing_epa': "SUM(epa) FILTER (WHERE role = 'passer')"
+}
+RUSHING_STATS = {
+    'carries': "COUNT(*) FILTER (WHERE role = 'rusher' AND rush_attempt = 1)",
+    'rushing_yards': "SUM(yards_gained) FILTER (WHERE role = 'rusher' AND rush_attempt = 1)",
+    'rushing_tds': "COUNT(*) FILTER (WHERE role = 'rusher' AND rush_touchdown = 1)",
+    'rushing_epa': "SUM(epa) FILTER (WHERE role = 'rusher' AND rush_attempt = 1)"
+}
+RECEIVING_STATS = {
+    'targets': "COUNT(*) FILTER (WHERE role = 'receiver' AND pass_attempt = 1)",
+    'receptions': "COUNT(*) FILTER (WHERE role = 'receiver' AND complete_pass = 1)",
+    'receiving_yards': "SUM(yards_gained) FILTER (WHERE role = 'receiver' AND complete_pass = 1)",
+    'receiving_air_yards': "SUM(air_yards) FILTER (WHERE role = 'receiver' AND pass_attempt = 1)",
+    'yards_after_catch': "SUM(yards_after_catch) FILTER (WHERE role = 'receiver' AND complete_pass = 1)",
+    'receiving_tds': "COUNT(*) FILTER (WHERE role = 'receiver' AND pass_touchdown = 1)",
+    'receiving_epa': "SUM(epa) FILTER (WHERE role = 'receiver')"
+}
+# {category: (its stats, the stat counting the plays of a player in it)}
+STAT_CATEGORIES = {
+    'passing': (PASSING_STATS, 'attempts'),
+    'rushing': (RUSHING_STATS, 'carries'),
+    'receiving': (RECEIVING_STATS, 'targets')
+}
+PLAYER_STATS = {**PASSING_STATS, **RUSHING_STATS, **RECEIVING_STATS}
+ROLES = ('passer', 'rusher', 'receiver')
+
+# one row per player per game, for the players with a role in ROLES
+PLAYER_GAME_STATS_QUERY = """
+INSERT INTO player_game_stats ({columns})
+SELECT participant.game_id, participant.player_key, games.season, games.type, games.week,
+       MAX(pbp.posteam) AS team, {player_stats}
+FROM play_participants AS participant
+JOIN play_by_play AS pbp ON pbp.game_id = participant.game_id AND pbp.play_id = participant.play_id
+JOIN games ON games.game_id = participant.game_id
+WHERE participant.game_id = ANY(:game_ids) AND pbp.game_id = ANY(:game_ids) AND participant.role IN ({roles})
+GROUP BY participant.game_id, participant.player_key, games.season, games.type, games.week
+ON CONFLICT (game_id, player_key) DO UPDATE SET {updates}
+"""
+
+DELETE_PLAYER_GAME_STATS_QUERY = "DELETE FROM player_game_stats WHERE game_id = ANY(:game_ids)"
+
+PLAYER_GAME_STATS_COLUMNS = ('game_id', 'player_key', 'season', 'type', 'week', 'team', *PLAYER_STATS)
+
+
+def _get_player_game_stats_query():
+    """Formats the upsert of player_game_stats."""
+    return PLAYER_GAME_STATS_QUERY.format(
+        columns=", ".join(PLAYER_GAME_STATS_COLUMNS),
+        # players without a play of a kind (e.g. no completions) have no sum for it
+        player_stats=", ".join(f"COALESCE({stat}, 0) AS {column}" for column, stat in PLAYER_STATS.items()),
+        roles=", ".join(f"'{role}'" for role in ROLES),
+        updates=etl_tools.get_upsert_updates(PLAYER_GAME_STATS_COLUMNS, ('game_id', 'player_key'))
+    )
+
+
+def _extract_missing_game_ids(db_conn):
+    """Gets the ids of the games with play participants but no player stats."""
+    query = ("SELECT DISTINCT game_id FROM play_participants "
+             "EXCEPT SELECT DISTINCT game_id FROM player_game_stats "
+             "ORDER BY game_id")
+    return [row[0] for row in db_conn.execute(query)]
+
+
+def refresh(db_eng, game_ids, replace=False):
+    """Recomputes the player stats of the games, in one transaction.
+
+    :param db_eng: sqlalchemy database engine
+    :type db_eng: sqlalchemy.engine.base.Engine
+    :param game_ids: ids of the games
+    :type game_ids: list of int
+    :param replace: delete the player stats of the games first, so players that no longer
+        have a play in them lose theirs, defaults to False
+    :type replace: bool, optional
+    :return: number of player game rows upserted
+    :rtype: int
+    """
+    game_ids = [int(game_id) for game_id in game_ids]
+    with db_eng.begin() as conn:
+        if replace:
+            conn.execute(sa.text(DELETE_PLAYER_GAME_STATS_QUERY), game_ids=game_ids)
+        return conn.execute(sa.text(_get_player_game_stats_query()), game_ids=game_ids).rowcount
+
+
+def run():
+    """
+    Runs the workflow for refreshing the player stats.
+    - Finds the games with play participants but no player stats
+    - Aggregates the stats of their passers, rushers and receivers
+    - Bumps the data version of player_game_stats if anything changed
+    """
+    db_conn = db.get_db_eng()
+
+    game_ids = _extract_missing_game_ids(db_conn)
+    if not game_ids:
+        logging.info("Player stats are up to date.")
+        return
+
+    logging.info(f"Refreshing player stats for {len(game_ids)} games ({game_ids[0]}..{game_ids[-1]})...")
+    n_rows = refresh(db_conn, game_ids)
+    logging.info(f"Upserted {n_rows} player game rows.")
+
+    etl_tools.bump_data_version(db_conn, 'player_game_stats')
@@ -0,0 +1,131 @@
+"""
+LOGIC:
+- find the games with play by play data that have no play participants yet
+- unpivot the *_player_id/*_player_name columns of their plays into one row per player per role per play
+- upsert the players in them (players), keeping the name they last appeared under
+- upsert the play participants (play_participants), referencing players by player_key
+
+NOTE:
+- everything runs as SQL in the database, only the game ids come back to python
+- the roles are derived from the columns of models.PlayByPlay, so new player columns are picked up automatically
+"""
+import logging
+
+import sqlalchemy as sa
+
+import db
+import models
+from . import etl_tools
+
+PLAYER_ID_SUFFIX = '_player_id'
+PLAYER_NAME_SUFFIX = '_player_name'
+
+# every *_player_id column of play_by_play that has a matching *_player_name column, without its suffix
+_COLUMNS = [column.name for column in models.PlayByPlay.__table__.columns]
+ROLES = tuple(
+    column[:-len(PLAYER_ID_SUFFIX)] for column in _COLUMNS
+    if column.endswith(PLAYER_ID_SUFFIX) and column.replace(PLAYER_ID_SUFFIX, PLAYER_NAME_SUFFIX) in _COLUMNS
+)
+
+# one row per role of every play of the games, with the player in that role (if any)
+PARTICIPANTS_CTE = """
+participants AS (
+    SELECT pbp.game_id, pbp.play_id, participant.role, participant.player_id, participant.player_name
+    FROM play_by_play AS pbp
+    CROSS JOIN LATERAL (VALUES {roles}) AS participant (role, player_id, player_name)
+    WHERE pbp.game_id = ANY(:game_ids) AND participant.player_id IS NOT NULL
+)
+"""
+
+# the name of a player is the one in their latest play
+PLAYERS_QUERY = """
+INSERT INTO players (player_id, player_name)
+WITH {participants}
+SELECT DISTINCT ON (player_id) player_id, player_name
+FROM participants
+ORDER BY player_id, game_id DESC, play_id DESC
+ON CONFLICT (player_id) DO UPDATE SET player_name = EXCLUDED.player_name
+WHERE players.player_name IS DISTINCT FROM EXCLUDED.player_name
+"""
+
+PLAY_PARTICIPANTS_QUERY = """
+INSERT INTO play_participants (game_id, play_id, role, player_key)
+WITH {participants}
+SELECT participants.game_id, participants.play_id, participants.role, players.player_key
+FROM participants
+JOIN players ON players.player_id = participants.player_id
+ON CONFLICT (game_id, play_id, role) DO UPDATE SET player_key = EXCLUDED.player_key
+"""
+
+DELETE_PLAY_PARTICIPANTS_QUERY = "DELETE FROM play_participants WHERE game_id = ANY(:game_ids)"
+
+
+def _get_participants_cte():
+    """Formats the CTE unpivoting the player columns of play_by_play, one VALUES row per role."""
+    roles = ", ".join(
+        f"('{role}', pbp.{role}{PLAYER_ID_SUFFIX}, pbp.{role}{PLAYER_NAME_SUFFIX})" for role in ROLES
+    )
+    return PARTICIPANTS_CTE.format(roles=roles).strip()
+
+
+def _get_players_query():
+    """Formats the upsert of players."""
+    return PLAYERS_QUERY.format(participants=_get_participants_cte())
+
+
+def _get_play_participants_query():
+    """Formats the upsert of play_participants."""
+    return PLAY_PARTICIPANTS_QUERY.format(participants=_get_participants_cte())
+
+
+def _extract_missing_game_ids(db_conn):
+    """Gets the ids of the games with play by play data but no play participants."""
+    query = ("SELECT DISTINCT game_id FROM play_by_play "
+             "EXCEPT SELECT DISTINCT game_id FROM play_participants "
+             "ORDER BY game_id")
+    return [row[0] for row in db_conn.execute(query)]
+
+
+def refresh(db_eng, game_ids, replace=False):
+    """Upserts the players of the games, and the participants of their plays,
+    in one transaction.
+
+    :param db_eng: sqlalchemy database engine
+    :type db_eng: sqlalchemy.engine.base.Engine
+    :param game_ids: ids of the games
+    :type game_ids: list of int
+    :param replace: delete the participants of the games first, so plays that no longer exist
+        lose theirs (e.g. after play_by_play.reload_season), defaults to False
+    :type replace: bool, optional
+    :return: number of player rows and play participant rows upserted
+    :rtype: tuple of (int, int)
+    """
+    game_ids = [int(game_id) for game_id in game_ids]
+    with db_eng.begin() as conn:
+        if replace:
+            conn.execute(sa.text(DELETE_PLAY_PARTICIPANTS_QUERY), game_ids=game_ids)
+        n_player_rows = conn.execute(sa.text(_get_players_query()), game_ids=game_ids).rowcount
+        n_participant_rows = conn.execute(sa.text(_get_play_participants_query()), game_ids=game_ids).rowcount
+    return n_player_rows, n_participant_rows
+
+
+def run():
+    """
+    Runs the workflow for refreshing the players and play participants.
+    - Finds the games with play by play data but no play participants
+    - Upserts the players in their plays, then who took part in each play
+    - Bumps the data versions of both tables if anything changed
+    """
+    db_conn = db.get_db_eng()
+
+    game_ids = _extract_missing_game_ids(db_conn)
+    if not game_ids:
+        logging.info("Players are up to date.")
+        return
+
+    logging.info(f"Refreshing players for {len(game_ids)} games ({game_ids[0]}..{game_ids[-1]})...")
+    n_player_rows, n_participant_rows = refresh(db_conn, game_ids)
+    logging.info(f"Upserted {n_player_rows} players and {n_participant_rows} play participants.")
+
+    etl_tools.bump_data_version(db_conn, 'players')
+    etl_tools.bump_data_version(db_conn, 'play_participants')
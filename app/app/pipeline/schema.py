@@ -0,0 +1,130 @@
+"""
+Pandas dtypes derived from the SQLAlchemy models in models.py, so data read
+from files or the database has the same compact types whatever the source,
+instead of whatever pandas infers for that particular file or query.
+
+- Integer columns become nullable ints, sized by what the column holds:
+  Int8 for the known small columns (INT8_COLUMNS: flags, downs, quarters, timeouts, weeks...),
+  Int16 for yards, seconds, scores, aggregated counts and the like, and Int32 for
+  everything else (game ids, player keys, per player counts, versions...), so a
+  column nobody sized can't overflow
+- short String(16) columns (teams, sides, locations...) become categories
+- Float columns are float64
+- Date and DateTime columns become datetime64
+- longer String, Text and Time columns are left as strings, so have no dtype
+
+Example usage:
+    from . import schema
+
+    dtypes = schema.get_dtypes(models.PlayByPlay)
+    df = schema.apply_dtypes(df, dtypes)
+"""
+from functools import lru_cache
+import re
+
+import pandas as pd
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    String,
+    Text,
+    Time
+)
+
+CATEGORY_MAX_LENGTH = 16
+DATETIME_DTYPE = 'datetime64[ns]'
+
+INT_FALLBACK_DTYPE = 'Int32'
+
+# integer columns known to hold small values
+INT8_COLUMNS = frozenset((
+    # game clock and situation
+    'qtr', 'down', 'drive', 'week', 'is_home', 'goal_to_go', 'quarter_end', 'sp',
+    'home_timeouts_remaining', 'away_timeouts_remaining', 'posteam_timeouts_remaining', 'defteam_timeouts_remaining',
+    'timeout', 'no_huddle', 'shotgun', 'qb_dropback', 'qb_kneel', 'qb_spike', 'qb_scramble', 'qb_hit',
+    # 0/1 flags of play_by_play
+    'pass_attempt', 'rush_attempt', 'complete_pass', 'incomplete_pass', 'interception', 'sack', 'touchdown',
+    'pass_touchdown', 'rush_touchdown', 'return_touchdown', 'safety', 'penalty', 'tackled_for_loss',
+    'first_down_pass', 'first_down_rush', 'first_down_penalty', 'third_down_converted', 'third_down_failed',
+    'fourth_down_converted', 'fourth_down_failed', 'extra_point_attempt', 'two_point_attempt',
+    'field_goal_attempt', 'kickoff_attempt', 'punt_attempt', 'defensive_extra_point_attempt',
+    'defensive_extra_point_conv', 'defensive_two_point_attempt', 'defensive_two_point_conv', 'touchback',
+    'kickoff_downed', 'kickoff_fair_catch', 'kickoff_in_endzone', 'kickoff_inside_twenty', 'kickoff_out_of_bounds',
+    'own_kickoff_recovery', 'own_kickoff_recovery_td', 'punt_blocked', 'punt_downed', 'punt_fair_catch',
+    'punt_in_endzone', 'punt_inside_twenty', 'punt_out_of_bounds', 'fumble', 'fumble_forced', 'fumble_not_forced',
+    'fumble_lost', 'fumble_out_of_bounds', 'lateral_reception', 'lateral_rush', 'lateral_return',
+    'lateral_recovery', 'solo_tackle', 'assist_tackle', 'replay_or_challenge'
+))
+
+# first match wins, integer columns not in INT8_COLUMNS that match none of these are INT_FALLBACK_DTYPE
+INT_DTYPE_PATTERNS = (
+    (re.compile(r'^game_id$|^player_key$'), 'Int32'),
+    (re.compile(r'^play_id$|^season$|yard|yds|seconds|score|distance'), 'Int16'),
+    # counts summed over games and seasons, see models.TeamGameStats
+    (re.compile(r'points|plays|attempts|successes|turnovers|^games$|^wins$|^losses$|^ties$'), 'Int16'),
+)
+
+
+@lru_cache(maxsize=None)
+def get_dtypes(model):
+    """Gets the pandas dtype of every column of the model.
+
+    :param model: SQLAlchemy model, e.g. models.PlayByPlay
+    :type model: sqlalchemy.ext.declarative.api.DeclarativeMeta
+    :raises TypeError: if a column has a type with no dtype mapping
+    :return: dict of {column name: dtype}, for the columns that have one
+    :rtype: dict
+    """
+    dtypes = {column.name: _get_dtype(column) for column in model.__table__.columns}
+    return {column: dtype for column, dtype in dtypes.items() if dtype is not None}
+
+
+def apply_dtypes(df, dtypes):
+    """Casts the columns of df that are in dtypes to their dtype. Other
+    columns are left as they are.
+
+    :param df: dataframe to cast
+    :type df: pandas.DataFrame
+    :param dtypes: dict of {column name: dtype}, see get_dtypes
+    :type dtypes: dict
+    :return: the cast dataframe
+    :rtype: pandas.DataFrame
+    """
+    dtypes = {column: dtype for column, dtype in dtypes.items() if column in df.columns}
+    datetime_columns = [column for column, dtype in dtypes.items() if dtype == DATETIME_DTYPE]
+
+    df = df.astype({column: dtype for column, dtype in dtypes.items() if column not in datetime_columns})
+    for column in datetime_columns:
+        df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def _get_dtype(column):
+    """Gets the dtype for a column, None if it's left as it's read."""
+    column_type = column.type
+
+    if isinstance(column_type, Integer):
+        if column.name in INT8_COLUMNS:
+            return 'Int8'
+        for pattern, dtype in INT_DTYPE_PATTERNS:
+            if pattern.search(column.name):
+                return dtype
+        return INT_FALLBACK_DTYPE
+
+    if isinstance(column_type, Float):
+        return 'float64'
+
+    if isinstance(column_type, String) and not isinstance(column_type, Text):
+        if column_type.length is not None and column_type.length <= CATEGORY_MAX_LENGTH:
+            return 'category'
+        return None
+
+    if isinstance(column_type, (Text, Time)):
+        return None
+
+    if isinstance(column_type, (Date, DateTime)):
+        return DATETIME_DTYPE
+
+    raise TypeError(f"Column {column.name} has type {column_type}, which has no dtype mapping.")
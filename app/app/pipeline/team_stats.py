@@ -0,0 +1,164 @@
+"""
+LOGIC:
+- find the games with play by play data that have no team stats yet
+- aggregate the plays of those games into one row per team per game (team_game_stats), with an upsert
+- re-sum the seasons of the teams in those games (team_season_stats), with an upsert
+
+NOTE:
+- everything runs as SQL in the database, only the game ids come back to python
+- stats are over pass and run plays only, so they're per snap (no kickoffs, punts, penalties...)
+"""
+import logging
+
+import sqlalchemy as sa
+
+import db
+from . import etl_tools
+
+PLAY_TYPES = ('pass', 'run')
+
+# {column of team_game_stats: aggregate over the plays of a team in a game}
+OFFENSE_STATS = {
+    'plays': "COUNT(*)",
+    'pass_attempts': "SUM(pass_attempt)",
+    'rush_attempts': "SUM(rush_attempt)",
+    'yards_gained': "SUM(yards_gained)",
+    'epa': "SUM(epa)",
+    'successes': "COUNT(*) FILTER (WHERE epa > 0)",
+    'turnovers': "SUM(COALESCE(interception, 0) + COALESCE(fumble_lost, 0))",
+    **{f'plays_down_{down}': f"COUNT(*) FILTER (WHERE down = {down})" for down in range(1, 5)},
+    **{f'successes_down_{down}': f"COUNT(*) FILTER (WHERE down = {down} AND epa > 0)" for down in range(1, 5)}
+}
+DEFENSE_STATS = {
+    'def_plays': "COUNT(*)",
+    'def_yards_allowed': "SUM(yards_gained)",
+    'def_epa': "SUM(epa)"
+}
+PLAY_STATS = (*OFFENSE_STATS, *DEFENSE_STATS)
+
+# one row per team per game, the plays of a team are the ones where it's posteam (offense) or defteam (defense)
+TEAM_GAME_STATS_QUERY = """
+INSERT INTO team_game_stats ({columns})
+WITH teams AS (
+    SELECT game_id, season, type, week, home_team AS team, away_team AS opponent, 1 AS is_home,
+           home_score AS points_for, away_score AS points_against
+    FROM games
+    WHERE game_id = ANY(:game_ids)
+    UNION ALL
+    SELECT game_id, season, type, week, away_team, home_team, 0, away_score, home_score
+    FROM games
+    WHERE game_id = ANY(:game_ids)
+),
+offense AS (
+    SELECT game_id, posteam AS team, {offense_stats}
+    FROM play_by_play
+    WHERE game_id = ANY(:game_ids) AND play_type IN ({play_types})
+    GROUP BY game_id, posteam
+),
+defense AS (
+    SELECT game_id, defteam AS team, {defense_stats}
+    FROM play_by_play
+    WHERE game_id = ANY(:game_ids) AND play_type IN ({play_types})
+    GROUP BY game_id, defteam
+)
+SELECT game_id, team, season, type, week, opponent, is_home, points_for, points_against, {play_stats}
+FROM teams
+LEFT JOIN offense USING (game_id, team)
+LEFT JOIN defense USING (game_id, team)
+ON CONFLICT (game_id, team) DO UPDATE SET {updates}
+"""
+
+# re-sums every season (and type) of the teams in the games
+TEAM_SEASON_STATS_QUERY = """
+INSERT INTO team_season_stats ({columns})
+SELECT season, type, team,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE points_for > points_against),
+       COUNT(*) FILTER (WHERE points_for < points_against),
+       COUNT(*) FILTER (WHERE points_for = points_against),
+       COALESCE(SUM(points_for), 0), COALESCE(SUM(points_against), 0),
+       {play_stats}
+FROM team_game_stats
+WHERE (season, type, team) IN (
+    SELECT DISTINCT season, type, team FROM team_game_stats WHERE game_id = ANY(:game_ids)
+)
+GROUP BY season, type, team
+ON CONFLICT (season, type, team) DO UPDATE SET {updates}
+"""
+
+TEAM_GAME_STATS_COLUMNS = (
+    'game_id', 'team', 'season', 'type', 'week', 'opponent', 'is_home', 'points_for', 'points_against', *PLAY_STATS
+)
+TEAM_SEASON_STATS_COLUMNS = (
+    'season', 'type', 'team', 'games', 'wins', 'losses', 'ties', 'points_for', 'points_against', *PLAY_STATS
+)
+
+
+def _get_team_game_stats_query():
+    """Formats the upsert of team_game_stats."""
+    return TEAM_GAME_STATS_QUERY.format(
+        columns=", ".join(TEAM_GAME_STATS_COLUMNS),
+        offense_stats=", ".join(f"{stat} AS {column}" for column, stat in OFFENSE_STATS.items()),
+        defense_stats=", ".join(f"{stat} AS {column}" for column, stat in DEFENSE_STATS.items()),
+        play_types=", ".join(f"'{play_type}'" for play_type in PLAY_TYPES),
+        # teams without a play of a kind (e.g. no run plays) have no row in offense or defense
+        play_stats=", ".join(f"COALESCE({column}, 0)" for column in PLAY_STATS),
+        updates=etl_tools.get_upsert_updates(TEAM_GAME_STATS_COLUMNS, ('game_id', 'team'))
+    )
+
+
+def _get_team_season_stats_query():
+    """Formats the upsert of team_season_stats."""
+    return TEAM_SEASON_STATS_QUERY.format(
+        columns=", ".join(TEAM_SEASON_STATS_COLUMNS),
+        play_stats=", ".join(f"SUM({column})" for column in PLAY_STATS),
+        updates=etl_tools.get_upsert_updates(TEAM_SEASON_STATS_COLUMNS, ('season', 'type', 'team'))
+    )
+
+
+def _extract_missing_game_ids(db_conn):
+    """Gets the ids of the games with play by play data but no team stats."""
+    query = ("SELECT DISTINCT game_id FROM play_by_play "
+             "EXCEPT SELECT game_id FROM team_game_stats "
+             "ORDER BY game_id")
+    return [row[0] for row in db_conn.execute(query)]
+
+
+def refresh(db_eng, game_ids):
+    """Recomputes the team stats of the games, and the season stats of their
+    teams, in one transaction.
+
+    :param db_eng: sqlalchemy database engine
+    :type db_eng: sqlalchemy.engine.base.Engine
+    :param game_ids: ids of the games
+    :type game_ids: list of int
+    :return: number of team game rows and team season rows upserted
+    :rtype: tuple of (int, int)
+    """
+    game_ids = [int(game_id) for game_id in game_ids]
+    with db_eng.begin() as conn:
+        n_game_rows = conn.execute(sa.text(_get_team_game_stats_query()), game_ids=game_ids).rowcount
+        n_season_rows = conn.execute(sa.text(_get_team_season_stats_query()), game_ids=game_ids).rowcount
+    return n_game_rows, n_season_rows
+
+
+def run():
+    """
+    Runs the workflow for refreshing the team stats.
+    - Finds the games with play by play data but no team stats
+    - Aggregates their team stats, and re-sums the seasons of their teams
+    - Bumps the data versions of the team stats tables if anything changed
+    """
+    db_conn = db.get_db_eng()
+
+    game_ids = _extract_missing_game_ids(db_conn)
+    if not game_ids:
+        logging.info("Team stats are up to date.")
+        return
+
+    logging.info(f"Refreshing team stats for {len(game_ids)} games ({game_ids[0]}..{game_ids[-1]})...")
+    n_game_rows, n_season_rows = refresh(db_conn, game_ids)
+    logging.info(f"Upserted {n_game_rows} team game rows and {n_season_rows} team season rows.")
+
+    etl_tools.bump_data_version(db_conn, 'team_game_stats')
+    etl_tools.bump_data_version(db_conn, 'team_season_stats')
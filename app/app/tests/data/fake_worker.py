@@ -0,0 +1,32 @@
+"""
+Stands in for nflscrapr/worker.r in tests, speaking the same protocol: one
+tab separated request per line on stdin, answered by a sentinel status line.
+
+- a --year=0 arg fails the job, a --year=-1 arg kills the worker
+- started with --no-start, the worker exits before it's ready
+"""
+import sys
+
+SENTINEL = '__NFLSCRAPR_WORKER__'
+
+
+def respond(status):
+    print(f"{SENTINEL} {status}", flush=True)
+
+
+def main():
+    if '--no-start' in sys.argv:
+        print("Error in library(nflscrapR): there is no package called 'nflscrapR'", flush=True)
+        sys.exit(1)
+
+    respond("READY")
+    for line in sys.stdin:
+        job, *args = line.rstrip('\n').split('\t')
+        print(f"running {job} with {' '.join(args)}", flush=True)
+        if '--year=-1' in args:
+            sys.exit(3)
+        respond("ERROR no games found" if '--year=0' in args else "OK")
+
+
+if __name__ == '__main__':
+    main()
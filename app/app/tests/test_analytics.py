@@ -0,0 +1,158 @@
+# flake8: noqa
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from werkzeug.exceptions import BadRequest
+
+import analytics
+import main  # puts api/ on the path
+import situations as api_situations
+from pipeline import (
+    config as pipeline_config,
+    encoding,
+    etl_tools
+)
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+def get_season_arrays(season):
+    df = pd.DataFrame({
+        'down': [3, 3, 3, 1, None],
+        'qtr': [4, 4, 2, 4, 4],
+        'play_type': ['pass', 'run', 'pass', 'pass', 'kickoff'],
+        'posteam': ['NE', 'NE', 'KC', 'KC', None],
+        'defteam': ['KC', 'KC', 'NE', 'NE', None],
+        'ydstogo': [8, 10, 9, 10, None],
+        'score_differential': [-3, 12, 0, -3, -3],
+        'yardline_100': [40, 60, 30, 75, 35],
+        'game_seconds_remaining': [300, 200, 2000, 500, 900],
+        'epa': [1.5, -0.5, 2.0, 0.2, None],
+        'wpa': [0.05, -0.01, 0.02, 0.01, 0.0]
+    })
+    return analytics.to_arrays(df, season)
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def test_get_mask(self):
+        """Test that a situation's value and range filters are and-ed, and nulls match no filter."""
+        arrays = get_season_arrays(2019)
+        self.assertEqual(arrays.columns['play_type'].tolist(), [0, 1, 0, 0, 4])
+
+        situation = {'down': [3], 'ydstogo': (7, None), 'qtr': [4], 'score_differential': (-8, 8)}
+        self.assertEqual(analytics.get_mask(arrays, situation).tolist(), [True, False, False, False, False])
+        self.assertEqual(analytics.get_mask(arrays, {'play_type': ['kickoff', 'blah']}).sum(), 1)
+        self.assertEqual(analytics.get_mask(arrays, {'ydstogo': (None, 9)}).tolist(), [True, False, True, False, False])
+        self.assertTrue(analytics.get_mask(arrays, {}).all())
+        self.assertEqual(analytics.get_mask(arrays, {'posteam': ['NE', 'blah'], 'down': [3]}).tolist(),
+                         [True, True, False, False, False])
+
+        with self.assertRaises(ValueError) as cm:
+            analytics.get_mask(arrays, {'epa': (0, None)})
+        logger.debug(cm.exception)
+
+    def test_aggregate(self):
+        """Test that metrics are averaged over the plays with a value, over every season."""
+        seasons = [get_season_arrays(2018), get_season_arrays(2019)]
+        results = analytics.aggregate(seasons, {'qtr': [4]})
+        logger.debug(results)
+        self.assertEqual(results['plays'].tolist(), [8])
+        self.assertAlmostEqual(results['epa_per_play'][0], 1.2 / 3)
+        self.assertAlmostEqual(results['success_rate'][0], 2 / 3)
+        self.assertAlmostEqual(results['total_wpa'][0], 0.1)
+
+        results = analytics.aggregate(seasons, {'qtr': [4]}, group_by='down')
+        self.assertEqual(results['down'].tolist(), [None, 1, 3])
+        self.assertEqual(results['plays'].tolist(), [2, 2, 4])
+        self.assertTrue(np.isnan(results['epa_per_play'][0]))
+
+        results = analytics.aggregate(seasons, {'down': [2]}, group_by='season')
+        self.assertEqual(len(results), 0)
+
+        results = analytics.aggregate(seasons, {}, group_by='play_type')
+        self.assertEqual(results['play_type'].tolist(), ['pass', 'run', 'kickoff'])
+
+        results = analytics.aggregate(seasons, {}, group_by='posteam')
+        self.assertEqual(results['posteam'].tolist(), [None, 'KC', 'NE'])
+        self.assertEqual(results['plays'].tolist(), [2, 4, 4])
+
+    def test_load_season_from_store(self):
+        """Test that a season with an arrow store file is read from it, without the db."""
+        df = pd.DataFrame({column: [1.0, 2.0] for column in analytics.SITUATION_COLUMNS + analytics.METRIC_COLUMNS})
+        df['play_type'] = ['run', 'pass']
+        df['posteam'] = encoding.encode_team_values(['KC', None])
+        df['defteam'] = ['NE', 'KC']
+        df['desc'] = ['not loaded', 'not loaded']
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            template = os.path.join(data_dir, "{}.arrow")
+            etl_tools.load_to_arrow_store(df, template.format(2019))
+            with mock.patch.object(pipeline_config, 'PLAY_BY_PLAY_STORE_TEMPLATE', template):
+                arrays = analytics.load_season(None, 2019)
+
+        self.assertEqual(arrays.season, 2019)
+        self.assertEqual(arrays.columns['play_type'].tolist(), [1, 0])
+        self.assertEqual(arrays.columns['posteam'].tolist(), [encoding.TEAM_CODES['KC'], encoding.NULL_CODE])
+        self.assertEqual(arrays.columns['defteam'].tolist(), [encoding.TEAM_CODES['NE'], encoding.TEAM_CODES['KC']])
+        self.assertNotIn('desc', arrays.columns)
+
+    def test_season_store_data_version(self):
+        """Test that seasons are only reloaded when play_by_play's version changes, not other tables'."""
+        versions = {'games': 1, 'play_by_play': 1}
+        db_conn = mock.Mock()
+        db_conn.execute.side_effect = lambda query: sorted(versions.items())
+        store = analytics.SeasonStore(max_seasons=4, ttl=60)
+        store._cache.data_version_ttl = 0
+
+        with mock.patch.object(analytics, 'load_season', side_effect=lambda db_conn, season: get_season_arrays(season)) as load_season:
+            store.get(db_conn, 2019)
+            versions['games'] = 2
+            store.get(db_conn, 2019)
+            self.assertEqual(load_season.call_count, 1)
+
+            versions['play_by_play'] = 2
+            store.get(db_conn, 2019)
+            self.assertEqual(load_season.call_count, 2)
+
+    def test_situations_formats(self):
+        """Test that /api/situations serves json, arrow and parquet, and 400s on streamed formats."""
+        with mock.patch.object(main, 'get_db', return_value=None), \
+                mock.patch.object(main, 'response_cache', main.cache.ResponseCache()), \
+                mock.patch.object(main.cache.ResponseCache, 'get_data_version', lambda self, db_conn: ()), \
+                mock.patch.object(analytics.season_store, 'get', lambda db_conn, season: get_season_arrays(season)):
+            client = main.app.test_client()
+            response = client.get('/api/situations?season=2019&down=3')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()[0]['plays'], 3)
+            self.assertEqual(client.get('/api/situations?format=parquet').status_code, 200)
+
+            for response in (
+                client.get('/api/situations?format=ndjson'),
+                client.get('/api/situations', headers={'Accept': 'application/x-ndjson'}),
+                client.get('/api/situations?stream=true')
+            ):
+                logger.debug(response.get_data(as_text=True))
+                self.assertEqual(response.status_code, 400)
+
+    def test_get_situation(self):
+        """Test that only the filters given make it into the situation."""
+        kwargs = {'down': ['3'], 'ydstogo_min': ['7'], 'score_differential_min': ['-8'],
+                  'score_differential_max': ['8'], 'season': ['2019'], 'posteam': ['NE', 'KC']}
+        self.assertEqual(api_situations._get_situation(kwargs),
+                         {'down': [3], 'ydstogo': (7, None), 'score_differential': (-8, 8), 'posteam': ['NE', 'KC']})
+
+        for kwargs in ({'down': ['5']}, {'play_type': ['blah']}, {'ydstogo_min': ['7', '8']}, {'defteam': ['BLAH']}):
+            with self.assertRaises(BadRequest) as cm:
+                api_situations._get_situation(kwargs)
+            logger.debug(cm.exception)
+
+
+if __name__ == '__main__':
+    unittest.main()
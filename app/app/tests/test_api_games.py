@@ -0,0 +1,61 @@
+# flake8: noqa
+import logging
+import unittest
+
+from werkzeug.exceptions import BadRequest
+
+import api_utils
+import config
+import main  # puts api/ on the path
+import games as api_games
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestApiGames(unittest.TestCase):
+
+    def test_build_query(self):
+        """Test that only the given filters make it into the query, as bind params."""
+        query, params, limit = api_games._build_query({})
+        logger.debug(query)
+        self.assertEqual(limit, config.API_DEFAULT_LIMIT)
+        self.assertEqual(params, {'fetch_limit': config.API_DEFAULT_LIMIT + 1})
+        self.assertNotIn('ANY', query)
+
+        kwargs = {'season': ['2018', '2019'], 'team': ['ne'], 'after': ['2019090800'], 'limit': ['10']}
+        query, params, limit = api_games._build_query(kwargs)
+        logger.debug(query)
+        self.assertEqual(params, {'season': [2018, 2019], 'team': ['NE'], 'after': 2019090800, 'fetch_limit': 11})
+        self.assertIn('season = ANY(:season)', query)
+        self.assertIn('game_id < :after', query)
+        self.assertNotIn('week', query)
+        self.assertNotIn('2019', query)
+
+    def test_build_query_stream(self):
+        """Test that streams have no limit unless one is given, and no max."""
+        query, params, limit = api_games._build_query({}, stream=True)
+        self.assertIsNone(limit)
+        self.assertEqual(params, {'fetch_limit': None})
+
+        limit = config.API_MAX_LIMIT + 1
+        query, params, limit = api_games._build_query({'limit': [str(limit)]}, stream=True)
+        self.assertEqual(params, {'fetch_limit': limit})
+
+    def test_invalid_params(self):
+        """Test that invalid params are rejected with a 400."""
+        for kwargs in (
+            {'season': ['blah']},
+            {'type': ['blah']},
+            {'limit': ['0']},
+            {'limit': [str(config.API_MAX_LIMIT + 1)]},
+            {'after': ['1', '2']}
+        ):
+            with self.assertRaises(BadRequest) as cm:
+                api_games._build_query(kwargs)
+            logger.debug(cm.exception)
+
+    def test_next_after_headers(self):
+        """Test that the next page header is only set when there is a next page."""
+        self.assertEqual(api_utils.get_next_after_headers(None), {})
+        self.assertEqual(api_utils.get_next_after_headers(2019090800), {api_utils.NEXT_AFTER_HEADER: '2019090800'})
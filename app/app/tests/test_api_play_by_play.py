@@ -0,0 +1,58 @@
+# flake8: noqa
+import logging
+import unittest
+
+from werkzeug.exceptions import BadRequest
+
+import config
+import main  # puts api/ on the path
+import models
+import play_by_play as api_play_by_play
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestApiPlayByPlay(unittest.TestCase):
+
+    def test_get_columns(self):
+        """Test that only the requested columns are selected, with the key columns first."""
+        self.assertEqual(api_play_by_play._get_columns({}), list(api_play_by_play.DEFAULT_COLUMNS))
+        self.assertEqual(api_play_by_play._get_columns({'columns': ['epa,play_id', 'desc', 'epa']}),
+                         ['game_id', 'play_id', 'epa', 'desc'])
+
+        with self.assertRaises(BadRequest) as cm:
+            api_play_by_play._get_columns({'columns': ['epa,blah;DROP TABLE games']})
+        logger.debug(cm.exception)
+
+    def test_build_query(self):
+        """Test that the filters and the cursor make it into the query as bind params, with no SELECT *."""
+        kwargs = {'season': ['2018', '2019'], 'team': ['ne'], 'down': ['3'], 'after': ['2019090800,55'],
+                  'columns': ['epa']}
+        query, params, limit = api_play_by_play._build_query(kwargs)
+        logger.debug(query)
+        self.assertIn('SELECT "game_id", "play_id", "epa"', query)
+        self.assertNotIn('*', query)
+        self.assertNotIn('play_type', query)
+        self.assertIn('(game_id, play_id) > (:after_game_id, :after_play_id)', query)
+        self.assertEqual(limit, config.API_DEFAULT_LIMIT)
+        self.assertEqual(params, {
+            'team': ['NE'], 'down': [3],
+            'season_start_0': 2018030100, 'season_end_0': 2019030100,
+            'season_start_1': 2019030100, 'season_end_1': 2020030100,
+            'after_game_id': 2019090800, 'after_play_id': 55,
+            'fetch_limit': config.API_DEFAULT_LIMIT + 1
+        })
+
+        for kwargs in ({'after': ['2019090800']}, {'after': ['1,2,3']}, {'down': ['5']}, {'qtr': ['first']}):
+            with self.assertRaises(BadRequest) as cm:
+                api_play_by_play._build_query(kwargs)
+            logger.debug(cm.exception)
+
+    def test_season_game_id_range(self):
+        """Test that a season's range covers its preseason to its super bowl."""
+        start, end = models.season_game_id_range(2019)
+        for game_id in (2019080100, 2019090800, 2019122900, 2020020200):
+            self.assertTrue(start <= game_id < end)
+        for game_id in (2019020300, 2020080600):
+            self.assertFalse(start <= game_id < end)
@@ -0,0 +1,115 @@
+# flake8: noqa
+import logging
+import unittest
+
+from werkzeug.exceptions import BadRequest
+
+import config
+import main  # puts api/ on the path
+import models
+import players as api_players
+from pipeline import (
+    player_stats,
+    players
+)
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestApiPlayers(unittest.TestCase):
+
+    def test_roles(self):
+        """Test that every player column pair of play_by_play is a role, unpivoted into the bridge table."""
+        self.assertEqual(players.ROLES[:3], ('passer', 'receiver', 'rusher'))
+        self.assertIn('solo_tackle_2', players.ROLES)
+        self.assertIn('forced_fumble_player_1', players.ROLES)
+
+        query = players._get_play_participants_query()
+        logger.debug(query)
+        self.assertIn("('passer', pbp.passer_player_id, pbp.passer_player_name)", query)
+        self.assertIn("ON CONFLICT (game_id, play_id, role)", query)
+
+    def test_build_query(self):
+        """Test that names are matched as substrings, with their LIKE wildcards escaped."""
+        query, params, limit = api_players._build_query({'name': ['T.Brady_%']})
+        logger.debug(query)
+        self.assertEqual(params['name'], r'%T.Brady\_\%%')
+        self.assertIn("player_name ILIKE :name", query)
+        self.assertNotIn("player_id = ANY", query)
+
+    def test_build_plays_query(self):
+        """Test that plays are selected through the bridge table, paginated on game_id,play_id,role."""
+        kwargs = {'player_id': ['00-0019596'], 'role': ['passer'], 'season': ['2019'],
+                  'after': ['2019090800,55,passer'], 'columns': ['epa']}
+        query, params, limit = api_players._build_plays_query(kwargs)
+        logger.debug(query)
+        self.assertIn('participant.role, pbp."game_id", pbp."play_id", pbp."epa"', query)
+        self.assertIn("JOIN play_participants", query)
+        self.assertEqual(params, {
+            'player_id': ['00-0019596'], 'role': ['passer'],
+            'season_start_0': 2019030100, 'season_end_0': 2020030100,
+            'after_game_id': 2019090800, 'after_play_id': 55, 'after_role': 'passer',
+            'fetch_limit': config.API_DEFAULT_LIMIT + 1
+        })
+
+        for kwargs in ({}, {'player_id': ['00-0019596'], 'role': ['blah']},
+                       {'player_id': ['00-0019596'], 'after': ['2019090800,55']}):
+            with self.assertRaises(BadRequest) as cm:
+                api_players._build_plays_query(kwargs)
+            logger.debug(cm.exception)
+
+    def test_player_game_stats_query(self):
+        """Test that the rollup writes every column of player_game_stats, in the order of the model."""
+        columns = [column.name for column in models.PlayerGameStats.__table__.columns]
+        self.assertEqual(list(player_stats.PLAYER_GAME_STATS_COLUMNS), columns)
+
+        query = player_stats._get_player_game_stats_query()
+        logger.debug(query)
+        self.assertIn("participant.role IN ('passer', 'rusher', 'receiver')", query)
+        self.assertIn("COALESCE(SUM(epa) FILTER (WHERE role = 'receiver'), 0) AS receiving_epa", query)
+        self.assertNotIn("EXCLUDED.player_key", query)
+
+    def test_build_season_stats_query(self):
+        """Test that season stat lines are summed from the rollup, paginated on player_key,season,type."""
+        kwargs = {'player_id': ['00-0019596'], 'type': ['reg'], 'after': ['12,2018,reg']}
+        query, params, limit = api_players._build_season_stats_query(kwargs)
+        logger.debug(query)
+        self.assertIn("FROM player_game_stats", query)
+        self.assertIn("SUM(passing_yards) AS passing_yards", query)
+        self.assertIn("AS completion_rate", query)
+        self.assertEqual(params['after_player_key'], 12)
+        self.assertEqual(params['fetch_limit'], limit + 1)
+
+        with self.assertRaises(BadRequest) as cm:
+            api_players._build_season_stats_query({'after': ['12,2018']})
+        logger.debug(cm.exception)
+
+    def test_build_leaderboard_query(self):
+        """Test that leaderboards rank a season by a known stat, among players with enough plays of its kind."""
+        kwargs = {'stat': ['yards_per_carry'], 'season': ['2019'], 'min_plays': ['100'], 'limit': ['10']}
+        query, params, limit = api_players._build_leaderboard_query(kwargs)
+        logger.debug(query)
+        self.assertIsNone(limit)
+        self.assertIn("WHERE carries >= :min_plays", query)
+        self.assertIn("ORDER BY yards_per_carry DESC NULLS LAST", query)
+        self.assertEqual(params, {'season': [2019], 'type': ['reg'], 'min_plays': 100, 'fetch_limit': 10})
+
+        self.assertEqual(api_players.STAT_VOLUMES['receiving_yards'], 'targets')
+        for kwargs in ({'season': ['2019']}, {'stat': ['epa'], 'season': ['2019']},
+                       {'stat': ['passing_yards; DROP TABLE games'], 'season': ['2019']}):
+            with self.assertRaises(BadRequest) as cm:
+                api_players._build_leaderboard_query(kwargs)
+            logger.debug(cm.exception)
+
+    def test_routes(self):
+        """Test that every entrypoint is routed."""
+        self.assertIs(main.ROUTES['players'], api_players.main)
+        self.assertIs(main.ROUTES['players/plays'], api_players.plays)
+        self.assertIs(main.ROUTES['players/season_stats'], api_players.season_stats)
+        self.assertIs(main.ROUTES['players/leaderboard'], api_players.leaderboard)
+        self.assertNotIn('players/_build_plays_query', main.ROUTES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# flake8: noqa
+import datetime
+import io
+import json
+import logging
+import unittest
+
+import pandas as pd
+import pyarrow as pa
+import sqlalchemy as sa
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.exceptions import BadRequest
+
+import api_utils
+import main
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+QUERY = """
+WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < :n)
+SELECT n, 'row ' || n AS name FROM numbers
+"""
+
+
+class TestApiUtils(unittest.TestCase):
+
+    def test_get_format(self):
+        """Test that ndjson is always streamed, and json only when asked to."""
+        self.assertEqual(api_utils.get_format({}), ('json', False))
+        self.assertEqual(api_utils.get_format({'stream': ['true']}), ('json', True))
+        self.assertEqual(api_utils.get_format({'format': ['NDJSON']}), ('ndjson', True))
+
+        for kwargs in ({'format': ['xml']}, {'stream': ['blah']}, {'format': ['arrow'], 'stream': ['true']}):
+            with self.assertRaises(BadRequest) as cm:
+                api_utils.get_format(kwargs)
+            logger.debug(cm.exception)
+
+    def test_get_format_from_accept(self):
+        """Test that the Accept header picks the format, with json as the fallback."""
+        for accept, expected in (
+            ([], 'json'),
+            ([('*/*', 1)], 'json'),
+            ([('text/html', 1)], 'json'),
+            ([('application/vnd.apache.arrow.stream', 1), ('application/json', 0.5)], 'arrow'),
+            ([('application/vnd.apache.parquet', 1)], 'parquet'),
+        ):
+            self.assertEqual(api_utils.get_format_from_accept(MIMEAccept(accept)), expected)
+
+    def test_make_response(self):
+        """Test that every format round trips to the same dataframe."""
+        df = pd.DataFrame({'game_id': [2019090800, 2019090801], 'home_team': ['CHI', 'NE'], 'epa': [0.5, None]})
+        for output_format in ('json', 'arrow', 'parquet'):
+            body, status, headers = api_utils.make_response(df, output_format, {'X-Next-After': '1'})
+            self.assertEqual(headers, {'Content-Type': api_utils.CONTENT_TYPES[output_format], 'X-Next-After': '1'})
+
+            if output_format == 'json':
+                parsed = pd.DataFrame(json.loads(body))
+            elif output_format == 'arrow':
+                parsed = pa.ipc.open_stream(body).read_pandas()
+            else:
+                parsed = pd.read_parquet(io.BytesIO(body))
+            logger.debug(parsed)
+            pd.testing.assert_frame_equal(parsed, df, check_dtype=False)
+
+    def test_json_dates(self):
+        """Test that dates are written the same whether the response is streamed or not."""
+        game_date = datetime.date(2019, 9, 8)
+        df = pd.DataFrame({'game_id': [2019090800], 'game_date': [game_date]})
+        body, _, _ = api_utils.make_response(df, 'json')
+        chunk = api_utils.format_chunk(['game_id', 'game_date'], [(2019090800, game_date)], 'json', first=True)
+        logger.debug(chunk)
+        self.assertEqual(json.loads(body), json.loads(f"[{chunk}]"))
+        self.assertEqual(json.loads(chunk)['game_date'], "2019-09-08T00:00:00.000")
+
+        body, _, _ = api_utils.make_response(df.astype({'game_date': 'datetime64[ns]'}), 'json')
+        self.assertEqual(json.loads(body)[0]['game_date'], "2019-09-08T00:00:00.000")
+
+    def test_stream_query(self):
+        """Test that every row is streamed, whatever the batch size, in valid json or ndjson."""
+        engine = sa.create_engine('sqlite://')
+        expected = [{'n': n, 'name': f"row {n}"} for n in range(1, 8)]
+
+        with engine.connect() as db_conn, main.app.test_request_context():
+            response = api_utils.stream_query(db_conn, QUERY, {'n': 7}, 'json', batch_size=3)
+            self.assertTrue(response.is_streamed)
+            chunks = list(response.response)
+            logger.debug(chunks)
+            self.assertEqual(len(chunks), 5)
+            self.assertEqual(json.loads("".join(chunks)), expected)
+
+            response = api_utils.stream_query(db_conn, QUERY, {'n': 7}, 'ndjson', batch_size=3)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            lines = "".join(response.response).splitlines()
+            self.assertEqual([json.loads(line) for line in lines], expected)
+
+            response = api_utils.stream_query(db_conn, QUERY + " LIMIT 0", {'n': 7}, 'json')
+            self.assertEqual(json.loads("".join(response.response)), [])
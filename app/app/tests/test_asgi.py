@@ -0,0 +1,117 @@
+# flake8: noqa
+import asyncio
+import logging
+from types import SimpleNamespace
+import unittest
+from unittest import mock
+
+from starlette.datastructures import QueryParams
+
+import asgi
+import main
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+def get(path, query_string=b""):
+    """Sends a GET request straight to the ASGI app, without starting its lifespan (so without a db pool).
+
+    :return: status and body of the response
+    :rtype: tuple of (int, bytes)
+    """
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': query_string, 'headers': [],
+        'client': ('testclient', 50000), 'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b"", 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(asgi.app(scope, receive, send))
+    finally:
+        loop.close()
+    status = next(message['status'] for message in messages if message['type'] == 'http.response.start')
+    body = b"".join(message.get('body', b"") for message in messages if message['type'] == 'http.response.body')
+    return status, body
+
+
+class FakePool:
+    """asyncpg pool counting its acquires, whose queries return no rows."""
+
+    def __init__(self):
+        self.acquires = 0
+
+    def acquire(self):
+        self.acquires += 1
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def fetch(self, query, *args):
+        return [('games', 1)]
+
+    async def prepare(self, query):
+        return SimpleNamespace(get_attributes=lambda: [SimpleNamespace(name='game_id')], fetch=self.fetch_rows)
+
+    async def fetch_rows(self, *args):
+        return []
+
+
+class TestAsgi(unittest.TestCase):
+
+    def test_to_positional(self):
+        """Test that named params become numbered ones, reused params keep their number, and casts are left alone."""
+        query, args = asgi.to_positional(
+            "SELECT x::int FROM t WHERE a = ANY(:team) OR b = ANY(:team) AND c < :after LIMIT :fetch_limit",
+            {'team': ['NE'], 'after': 5, 'fetch_limit': None, 'unused': 1}
+        )
+        self.assertEqual(query, "SELECT x::int FROM t WHERE a = ANY($1) OR b = ANY($1) AND c < $2 LIMIT $3")
+        self.assertEqual(args, [['NE'], 5, None])
+
+        with self.assertRaises(ValueError) as cm:
+            asgi.to_positional("SELECT * FROM t WHERE a = :a", {})
+        logger.debug(cm.exception)
+
+    def test_get_query_builder(self):
+        """Test that only entrypoints with a QueryBuilder run natively."""
+        self.assertIsNotNone(asgi.get_query_builder('games'))
+        self.assertIs(asgi.get_query_builder('play_by_play'), asgi.get_query_builder('play_by_play/main'))
+        self.assertIsNone(asgi.get_query_builder('blah'))
+
+    def test_routing(self):
+        """Test that native entrypoints validate their params, and the rest falls back to the flask app."""
+        status, body = get('/api/games', b"season=blah")
+        logger.debug(body)
+        self.assertEqual((status, body), (400, b"Invalid value for season: blah"))
+
+        self.assertEqual(get('/api/blah')[0], 404)
+        self.assertEqual(get('/'), (200, b'"hello world!"\n'))
+
+    def test_handle_cache_hit_no_acquire(self):
+        """Test that a cache hit with a fresh data version doesn't acquire a connection."""
+        pool = FakePool()
+        request = SimpleNamespace(query_params=QueryParams("season=2019&format=json"), headers={},
+                                  app=SimpleNamespace(state=SimpleNamespace(pool=pool)))
+        query_builder = asgi.get_query_builder('games')
+        loop = asyncio.new_event_loop()
+        try:
+            with mock.patch.object(main, 'response_cache', main.cache.ResponseCache(data_version_ttl=60)):
+                first = loop.run_until_complete(asgi._handle(request, 'games', query_builder))
+                self.assertEqual(pool.acquires, 2)  # data version check, then the miss
+                second = loop.run_until_complete(asgi._handle(request, 'games', query_builder))
+        finally:
+            loop.close()
+        self.assertEqual(pool.acquires, 2)
+        self.assertEqual(first.body, second.body)
@@ -0,0 +1,64 @@
+# flake8: noqa
+import logging
+import time
+import unittest
+
+import cache
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        """Test that the least recently used response is evicted once the cache is full."""
+        with self.assertRaises(ValueError) as cm:
+            cache.ResponseCache(max_entries=0)
+        logger.debug(cm.exception)
+
+        response_cache = cache.ResponseCache(max_entries=2)
+        entries = {key: cache.CacheEntry(key.encode(), 200, [], cache.make_etag(key.encode())) for key in 'abc'}
+        response_cache.set('a', entries['a'])
+        response_cache.set('b', entries['b'])
+        self.assertIs(response_cache.get('a'), entries['a'])
+        response_cache.set('c', entries['c'])
+
+        self.assertIsNone(response_cache.get('b'))
+        self.assertIs(response_cache.get('a'), entries['a'])
+        self.assertIs(response_cache.get('c'), entries['c'])
+        metrics = response_cache.get_metrics()
+        logger.debug(metrics)
+        self.assertEqual(metrics, {'entries': 2, 'hits_total': 3, 'misses_total': 1,
+                                   'evictions_total': 1, 'invalidations_total': 0})
+
+    def test_ttl(self):
+        """Test that responses older than the ttl aren't served."""
+        response_cache = cache.ResponseCache(ttl=0.01)
+        response_cache.set('a', cache.CacheEntry(b'a', 200, [], cache.make_etag(b'a')))
+        time.sleep(0.02)
+        self.assertIsNone(response_cache.get('a'))
+        self.assertEqual(response_cache.get_metrics()['entries'], 0)
+
+    def test_make_key(self):
+        """Test that the parameter order doesn't matter, but the order of repeated values does."""
+        version = (('games', 1),)
+        self.assertEqual(cache.make_key('games', {'a': ['1'], 'b': ['2']}, version),
+                         cache.make_key('games', {'b': ['2'], 'a': ['1']}, version))
+        self.assertNotEqual(cache.make_key('games', {'a': ['1', '2']}, version),
+                            cache.make_key('games', {'a': ['2', '1']}, version))
+        self.assertNotEqual(cache.make_key('games', {}, version), cache.make_key('games', {}, (('games', 2),)))
+
+    def test_update_data_version(self):
+        """Test that a new data version clears the cache, and the same one doesn't."""
+        response_cache = cache.ResponseCache(data_version_ttl=60)
+        self.assertTrue(response_cache.data_version_expired())
+        response_cache.update_data_version([('games', 1)])
+        self.assertFalse(response_cache.data_version_expired())
+
+        response_cache.set('a', cache.CacheEntry(b'a', 200, [], cache.make_etag(b'a')))
+        self.assertEqual(response_cache.update_data_version([('games', 1)]), (('games', 1),))
+        self.assertIsNotNone(response_cache.get('a'))
+        response_cache.update_data_version([('games', 2)])
+        self.assertIsNone(response_cache.get('a'))
+        self.assertEqual(response_cache.get_metrics()['invalidations_total'], 1)
@@ -0,0 +1,74 @@
+# flake8: noqa
+import logging
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import models
+from pipeline import (
+    encoding,
+    schema
+)
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_team_columns(self):
+        """Test that every team column of play_by_play is encoded, and only those."""
+        for column in ('home_team', 'away_team', 'posteam', 'defteam', 'side_of_field', 'td_team', 'timeout_team',
+                       'penalty_team', 'return_team', 'fumbled_1_team', 'solo_tackle_2_team'):
+            self.assertIn(column, encoding.TEAM_COLUMNS)
+        for column in ('posteam_type', 'pass_location', 'yrdln', 'game_id', 'desc'):
+            self.assertNotIn(column, encoding.TEAM_COLUMNS)
+        self.assertEqual(len(encoding.TEAMS), len(encoding.TEAM_CODES))
+
+    def test_encode_teams(self):
+        """Test that teams get the same codes whatever their dtype, and nulls get NULL_CODE."""
+        df = pd.DataFrame({
+            'posteam': ['NE', None, 'KC'],
+            'defteam': ['KC', 'NE', None],
+            'desc': ['a', 'b', 'c']
+        })
+        df = schema.apply_dtypes(df, schema.get_dtypes(models.PlayByPlay))
+        self.assertEqual(df['posteam'].dtype, 'category')
+
+        encoded = encoding.encode_teams(df)
+        logger.debug(encoded.dtypes)
+        self.assertEqual(encoded['posteam'].dtype, encoding.TEAM_DTYPE)
+        self.assertEqual(encoded['posteam'].tolist(), [encoding.TEAM_CODES['NE'], encoding.NULL_CODE,
+                                                       encoding.TEAM_CODES['KC']])
+        self.assertEqual(encoded['defteam'].tolist(), [encoding.TEAM_CODES['KC'], encoding.TEAM_CODES['NE'],
+                                                       encoding.NULL_CODE])
+        self.assertEqual(encoded['desc'].tolist(), ['a', 'b', 'c'])
+        # already encoded columns are left alone
+        self.assertTrue(encoding.encode_teams(encoded).equals(encoded))
+
+        decoded = encoding.decode_teams(encoded)
+        self.assertEqual(decoded['posteam'].tolist()[::2], ['NE', 'KC'])
+        self.assertTrue(pd.isnull(decoded['posteam'][1]))
+        self.assertEqual(list(decoded['defteam'].cat.categories), list(encoding.TEAMS))
+
+        # unknown teams are nulls, with a warning
+        with self.assertLogs(level='WARNING') as cm:
+            encoded = encoding.encode_teams(pd.DataFrame({'posteam': ['NE', 'BLAH', None]}))
+        logger.debug(cm.output)
+        self.assertIn('BLAH', cm.output[0])
+        self.assertEqual(encoded['posteam'].tolist(), [encoding.TEAM_CODES['NE'], encoding.NULL_CODE, encoding.NULL_CODE])
+
+    def test_decode_game_ids(self):
+        """Test that game ids decode to their season, date and game number, playoffs in February included."""
+        games = encoding.decode_game_ids([2017090700, 2018020400, 2019090812])
+        logger.debug(games)
+        self.assertEqual(games['season'].tolist(), [2017, 2017, 2019])
+        self.assertEqual(games['season'].dtype, 'int16')
+        self.assertEqual(games['game_date'].dt.strftime('%Y-%m-%d').tolist(), ['2017-09-07', '2018-02-04', '2019-09-08'])
+        self.assertEqual(games['game_number'].tolist(), [0, 0, 12])
+        self.assertEqual(games['season'].tolist(), [models.game_id_season(game_id) for game_id in (2017090700, 2018020400, 2019090812)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# flake8: noqa
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import models
+from pipeline import (
+    etl_tools,
+    schema
+)
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestEtlTools(unittest.TestCase):
+
+    def test_file_round_trip(self):
+        """Test that every file format loads back the same data, with column projection."""
+        df = pd.DataFrame({
+            'game_id': [2017090700, 2017091007, 2017091008],
+            'home_team': ['NE', 'BUF', 'CHI'],
+            'home_score': [27.0, None, 17.0]
+        })
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            for file_format in etl_tools.FILE_FORMATS:
+                path = os.path.join(data_dir, f"games.{file_format}")
+                etl_tools.load_to_file(df, path)
+                pd.testing.assert_frame_equal(etl_tools.extract_from_file(path), df)
+
+                projected_df = etl_tools.extract_from_file(path, columns=['game_id', 'home_score'])
+                self.assertEqual(list(projected_df.columns), ['game_id', 'home_score'])
+
+                typed_df = etl_tools.extract_from_file(path, dtype={'game_id': 'int32', 'blah': 'int8'})
+                self.assertEqual(typed_df['game_id'].dtype, 'int32')
+
+            with self.assertRaises(ValueError) as cm:
+                etl_tools.load_to_file(df, os.path.join(data_dir, "games.json"))
+            logger.debug(cm.exception)
+
+            with self.assertRaises(ValueError) as cm:
+                etl_tools.extract_from_csv(os.path.join(data_dir, "games.parquet"))
+            logger.debug(cm.exception)
+
+    def test_arrow_store_round_trip(self):
+        """Test that the arrow store loads back the same data, with column projection, and replaces files whole."""
+        df = pd.DataFrame({
+            'game_id': [2017090700, 2017091007, 2017091008],
+            'posteam': pd.Categorical(['NE', None, 'CHI']),
+            'epa': [0.5, None, -1.25]
+        })
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, "play_by_play", "2017.arrow")
+            etl_tools.load_to_arrow_store(df, path)
+            pd.testing.assert_frame_equal(etl_tools.extract_from_arrow_store(path).to_pandas(), df)
+
+            table = etl_tools.extract_from_arrow_store(path, columns=['epa', 'game_id'])
+            self.assertEqual(table.schema.names, ['epa', 'game_id'])
+
+            # a reader of the previous file keeps its data
+            etl_tools.load_to_arrow_store(df.iloc[:1], path)
+            self.assertEqual(table.num_rows, 3)
+            self.assertEqual(etl_tools.extract_from_arrow_store(path).num_rows, 1)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["2017.arrow"])
+
+            with self.assertRaises(ValueError) as cm:
+                etl_tools.extract_from_arrow_store(path, columns=['blah'])
+            logger.debug(cm.exception)
+
+            with self.assertRaises(ValueError) as cm:
+                etl_tools.extract_from_arrow_store(os.path.join(data_dir, "2016.arrow"))
+            logger.debug(cm.exception)
+
+    def test_arrow_store_model_dtypes(self):
+        """Test that a frame with the model's dtypes, nullable ints included, goes through the arrow store."""
+        df = pd.DataFrame({
+            'game_id': [2017090700, 2017091007, 2017091008],
+            'play_id': [1, 2, 3],
+            'down': [1, None, 3],
+            'yards_gained': [None, None, None],
+            'posteam': ['NE', None, 'CHI'],
+            'game_date': ['2017-09-07', '2017-09-10', '2017-09-10'],
+            'desc': ['a', None, 'c'],
+            'epa': [0.5, None, -1.25]
+        })
+        dtypes = schema.get_dtypes(models.PlayByPlay)
+        df = schema.apply_dtypes(df, dtypes)
+        self.assertEqual(str(df['down'].dtype), 'Int8')
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, "2017.arrow")
+            etl_tools.load_to_arrow_store(df, path)
+            table = etl_tools.extract_from_arrow_store(path)
+
+        self.assertEqual(str(table.schema.field('down').type), 'int8')
+        self.assertEqual(table.column('down').null_count, 1)
+        self.assertEqual(table.column('yards_gained').null_count, 3)
+        pd.testing.assert_frame_equal(schema.apply_dtypes(table.to_pandas(), dtypes), df)
+
+    def test_load_to_db_args(self):
+        """Test that bad if_exists and method values are rejected before touching the db."""
+        with self.assertRaises(ValueError) as cm:
+            etl_tools.load_to_db(None, 'games', None, if_exists='blah')
+        logger.debug(cm.exception)
+
+        with self.assertRaises(ValueError) as cm:
+            etl_tools.load_to_db(None, 'games', None, method='blah')
+        logger.debug(cm.exception)
+
+    def test_partitions(self):
+        """Test that a season's partition is named after it and covers the game ids of its season."""
+        self.assertEqual(etl_tools.get_partition_name('play_by_play', 2019), 'play_by_play_2019')
+        self.assertEqual(etl_tools._get_partition_bounds(2019), "FROM (2019030100) TO (2020030100)")
+
+        with self.assertRaises(ValueError) as cm:
+            etl_tools.get_partition_name('play_by_play', '2019; DROP TABLE games')
+        logger.debug(cm.exception)
+
+    def test_load_staging_table(self):
+        """Test that tables with dependents are refused before loading, and grants are copied to the staging table."""
+        conn = mock.MagicMock()
+        conn.execute.return_value = [('team_stats_view',)]
+        with self.assertRaises(ValueError) as cm:
+            etl_tools._load_staging_table(conn, 'games', pd.DataFrame(), 'copy')
+        logger.debug(cm.exception)
+        self.assertEqual(conn.execute.call_count, 1)
+
+        conn = mock.MagicMock()
+        conn.execute.return_value.fetchall.return_value = [('PUBLIC', 'SELECT'), ('api', 'SELECT')]
+        etl_tools._copy_grants(conn, 'games', 'games__staging')
+        statements = [args[0] for _, args, _ in conn.execute.mock_calls if args and isinstance(args[0], str)]
+        self.assertEqual(statements, ['GRANT SELECT ON games__staging TO PUBLIC', 'GRANT SELECT ON games__staging TO "api"'])
+
+    def test_csv_stream(self):
+        """Test that the csv is the same read whole or in chunks of any size, across row chunks."""
+        df = pd.DataFrame({'game_id': range(2017090700, 2017090725), 'epa': [0.25] * 25, 'posteam': ['NE'] * 25})
+        expected = df.to_csv(index=False, header=False)
+
+        self.assertEqual(etl_tools._CsvStream(df, chunksize=7).read(), expected)
+        self.assertEqual(etl_tools._CsvStream(df, chunksize=7).read(-1), expected)
+        for size in (1, 10, 64, len(expected) + 1):
+            stream = etl_tools._CsvStream(df, chunksize=7)
+            parts = list(iter(lambda: stream.read(size), ""))
+            self.assertTrue(all(len(part) == size for part in parts[:-1]))
+            self.assertEqual("".join(parts), expected)
+        self.assertEqual(etl_tools._CsvStream(df.iloc[:0], chunksize=7).read(), "")
+
+    def test_csv_stream_values(self):
+        """Test that whole floats are written as ints, other floats as they are, and every kind of null as empty."""
+        df = pd.DataFrame({
+            'down': [1.0, None, 3.0],
+            'epa': [0.5, None, -1.0],
+            'desc': ['pass', None, 'run'],
+            'posteam': pd.Categorical(['NE', None, 'KC']),
+            'play_id': pd.array([1, None, 3], dtype='Int16')
+        })
+        csv = etl_tools._CsvStream(df, chunksize=2).read()
+        logger.debug(csv)
+        self.assertEqual(csv, "1,0.5,pass,NE,1\n,,,,\n3,-1.0,run,KC,3\n")
+
+    def test_staging_index_definition(self):
+        """Test that index definitions are pointed at the staging table under a staging name."""
+        definition = "CREATE INDEX ix_games_season ON public.games USING btree (season, type)"
+        staging_definition = etl_tools._staging_index_definition(definition, 'ix_games_season', 'games', 'games__staging')
+        self.assertEqual(
+            staging_definition,
+            "CREATE INDEX ix_games_season__staging ON public.games__staging USING btree (season, type)"
+        )
+
+        definition = "CREATE UNIQUE INDEX ix_games_url ON ONLY games USING btree (game_url)"
+        staging_definition = etl_tools._staging_index_definition(definition, 'ix_games_url', 'games', 'games__staging')
+        self.assertEqual(
+            staging_definition,
+            "CREATE UNIQUE INDEX ix_games_url__staging ON ONLY games__staging USING btree (game_url)"
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
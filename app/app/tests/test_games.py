@@ -1,18 +1,65 @@
 # flake8: noqa
 import logging
 import os
+import re
+import sqlite3
 import unittest
 
 import pandas as pd
 
+import models
+from benchmarks import games_integrity_check
 from pipeline import (
     games,
-    config
+    config,
+    nflscrapr,
+    schema
 )
 
 logger = logging.getLogger('test_logger')
 logger.setLevel(logging.DEBUG)
 
+# postgres functions of the games check queries, rewritten to their sqlite equivalents
+SQLITE_REWRITES = (
+    (r"array_agg\((DISTINCT \w+)\)", r"group_concat(\1)"),
+    (r"array_agg\(([\w.]+) ORDER BY [\w.]+\)", r"group_concat(\1)"),
+    (r"generate_series\(1, 17\) AS target_weeks\(week\)",
+     "(SELECT column1 AS week FROM (VALUES " + ", ".join(f"({week})" for week in range(1, 18)) + ")) AS target_weeks"),
+)
+
+
+class SqliteResult:
+    """Result of a query run on sqlite, with group_concat lists split back into the arrays postgres returns."""
+
+    def __init__(self, rows):
+        self.rows = [
+            tuple([int(v) if v.isdigit() else v for v in value.split(',')] if isinstance(value, str) else value
+                  for value in row)
+            for row in rows
+        ]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalar(self):
+        return self.rows[0][0]
+
+    def first(self):
+        return self.rows[0] if self.rows and self.rows[0][0] is not None else None
+
+
+class SqliteGames:
+    """Connection to an in-memory sqlite games table, running the games check queries rewritten for sqlite."""
+
+    def __init__(self, df):
+        self.conn = sqlite3.connect(':memory:')
+        df.to_sql('games', self.conn, index=False)
+
+    def execute(self, query):
+        for pattern, replacement in SQLITE_REWRITES:
+            query = re.sub(pattern, replacement, query)
+        return SqliteResult(self.conn.execute(query).fetchall())
+
 
 class TestGames(unittest.TestCase):
 
@@ -70,6 +117,50 @@ class TestGames(unittest.TestCase):
                 games._data_integrity_check(bad_df)
             logger.debug(cm.exception)
 
+            # same error as the per-season version the check replaced
+            with self.assertRaises(games.DataIntegrityError) as legacy_cm:
+                games_integrity_check._legacy_data_integrity_check(bad_df)
+            self.assertEqual(str(cm.exception), str(legacy_cm.exception))
+
+    def test_summarize_games_table(self):
+        """Test that the sql check summarizes the games table the same as the pandas check does the dataframe."""
+        dfs = [
+            self.test_df,
+            self.test_df[(self.test_df['season'] == 2011) & (self.test_df['type'] != 'post')],
+            self.test_df[self.test_df['season'] != 2012],
+            self.test_df[~((self.test_df['season'] == 2011) & (self.test_df['type'] == 'reg') &
+                           (self.test_df['week'].isin([2, 17])))],
+            pd.concat([self.test_df, self.test_df.iloc[:3]])
+        ]
+        for df in dfs:
+            db_conn = SqliteGames(df)
+            summary = games._summarize_games_table(db_conn)
+            logger.debug(summary)
+            self.assertEqual(summary, games._summarize_games(df))
+            self.assertEqual(games._get_latest_season_and_type_db(db_conn), games._get_latest_season_and_type(df))
+
+        # the same violations are raised
+        db_conn = SqliteGames(dfs[3])
+        with self.assertRaises(games.DataIntegrityError) as cm:
+            games._data_integrity_check_db(db_conn)
+        with self.assertRaises(games.DataIntegrityError) as pandas_cm:
+            games._data_integrity_check(dfs[3])
+        self.assertEqual(str(cm.exception), str(pandas_cm.exception))
+
+        self.assertEqual(games._summarize_games_table(SqliteGames(self.test_df.iloc[:0])), ({}, 0, {}))
+
+    def test_data_integrity_check_with_schema_dtypes(self):
+        """Test that the check gives the same result on data cast to the models' dtypes."""
+        typed_df = schema.apply_dtypes(self.test_df, schema.get_dtypes(models.Game))
+        games._data_integrity_check(typed_df)
+
+        with self.assertRaises(games.DataIntegrityError) as cm:
+            games._data_integrity_check(typed_df[typed_df['season'] != 2012])
+        logger.debug(cm.exception)
+
+        batches = games._get_refresh_batches(typed_df, 2013, 'post')
+        self.assertEqual(batches[0], (2015, 'pre', None))
+
     def test_get_latest_season_type(self):
         """Test that the function preserves semantic ordering"""
         with self.assertRaises(ValueError) as cm:
@@ -159,6 +250,31 @@ class TestGames(unittest.TestCase):
         self.assertEqual(latest_season_and_type, (2012, 'post'))
         games._data_integrity_check(df)
 
+    def test_get_refresh_batches(self):
+        """Test that only incomplete weeks and missing season types are refreshed."""
+        df = self.test_df[self.test_df['season'].isin([2011, 2012])].copy()
+        df = df[(df['season'] != 2012) | (df['type'] != 'post')]
+        incomplete = (df['season'] == 2012) & (df['type'] == 'reg') & (df['week'].isin([16, 17]))
+        df.loc[incomplete, 'state_of_game'] = 'PRE'
+
+        batches = games._get_refresh_batches(df, 2012, 'reg')
+        self.assertEqual(batches[0], (2012, 'reg', [16, 17]))
+        self.assertEqual(batches[1], (2012, 'post', None))
+        self.assertEqual(batches[-1], (config.CURRENT_SEASON, 'post', None))
+        self.assertEqual(len(batches), 2 + (config.CURRENT_SEASON - 2012) * len(config.SEASON_TYPES))
+
+        df.loc[incomplete, 'state_of_game'] = 'POST'
+        batches = games._get_refresh_batches(df, 2012, 'reg')
+        self.assertEqual(batches[0], (2012, 'post', None))
+
+    def test_games_command_weeks(self):
+        """Test that the games job can be narrowed down to some weeks."""
+        command = nflscrapr._get_command('games', season=2019, season_type='reg')
+        self.assertFalse(any(arg.startswith('--weeks') for arg in command))
+
+        command = nflscrapr._get_command('games', season=2019, season_type='reg', weeks=[3, 4])
+        self.assertIn('--weeks=3,4', command)
+
     def test_run_nflscrapr(self):
         """Test that the subprocess is correctly."""
         pass
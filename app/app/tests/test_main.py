@@ -0,0 +1,127 @@
+# flake8: noqa
+import logging
+import unittest
+from unittest import mock
+
+import db
+import main
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestMain(unittest.TestCase):
+
+    def test_format_metrics(self):
+        """Test that metrics are prefixed and typed, with _total metrics as counters."""
+        text = main.format_metrics({'checked_out': 2, 'checkouts_total': 10}, prefix='test_')
+        logger.debug(text)
+        self.assertEqual(text, (
+            "# TYPE test_checked_out gauge\n"
+            "test_checked_out 2\n"
+            "# TYPE test_checkouts_total counter\n"
+            "test_checkouts_total 10\n"
+        ))
+
+    def test_metrics(self):
+        """Test that /metrics serves the pool metrics as prometheus text."""
+        pool_metrics = {'pool_size': 10, 'checked_out': 0, 'checkouts_total': 0, 'checkout_wait_seconds_max': 0.0}
+        with mock.patch.object(db, 'get_pool_metrics', return_value=pool_metrics), \
+                mock.patch.object(main, 'response_cache', main.cache.ResponseCache()):
+            response = main.app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        logger.debug(body)
+        for name in ('pool_size', 'checked_out', 'checkouts_total', 'checkout_wait_seconds_max'):
+            self.assertIn(f"data_nfl_{name} ", body)
+        self.assertIn("# TYPE data_nfl_response_cache_hits_total counter", body)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+
+    def test_build_routes(self):
+        """Test that only public functions of controllers are routed, and main is routed by controller name."""
+        routes = main.build_routes()
+        logger.debug(sorted(routes))
+        self.assertIs(routes['games'], routes['games/main'])
+        self.assertNotIn('games/pd', routes)
+        self.assertTrue(all(not path.split('/')[-1].startswith('_') for path in routes))
+        with self.assertRaises(TypeError):
+            routes['games/blah'] = routes['games']
+
+    def test_api_handler_not_found(self):
+        """Test that unknown controllers and entrypoints 404 without touching the db."""
+        client = main.app.test_client()
+        for path in ('/api/blah', '/api/games/blah', '/api/games/main/blah', '/api/games/pd'):
+            self.assertEqual(client.get(path).status_code, 404)
+
+    def test_api_handler_cache(self):
+        """Test that responses are cached until the data version changes, and revalidate with ETags."""
+        calls = []
+
+        def entrypoint(db_conn, **kwargs):
+            calls.append(kwargs)
+            return f"response {len(calls)}"
+
+        routes = {'test': entrypoint}
+        response_cache = main.cache.ResponseCache(data_version_ttl=0)
+        data_version = [(('games', 1),)]
+        with mock.patch.object(main, 'ROUTES', routes), \
+                mock.patch.object(main, 'response_cache', response_cache), \
+                mock.patch.object(main, 'get_db', return_value=None), \
+                mock.patch.object(main.cache.ResponseCache, 'get_data_version',
+                                  lambda self, db_conn: data_version[0]):
+            client = main.app.test_client()
+            first = client.get('/api/test?a=1&b=2')
+            second = client.get('/api/test?b=2&a=1')
+            self.assertEqual(second.get_data(as_text=True), "response 1")
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+
+            not_modified = client.get('/api/test?a=1&b=2', headers={'If-None-Match': first.headers['ETag']})
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified.get_data(), b"")
+
+            data_version[0] = (('games', 2),)
+            third = client.get('/api/test?a=1&b=2')
+            self.assertEqual(third.get_data(as_text=True), "response 2")
+            self.assertNotEqual(first.headers['ETag'], third.headers['ETag'])
+
+        metrics = response_cache.get_metrics()
+        logger.debug(metrics)
+        self.assertEqual((metrics['hits_total'], metrics['misses_total']), (2, 2))
+
+    def test_api_handler_cache_hit_no_db(self):
+        """Test that a cache hit with a fresh data version doesn't check out a db connection."""
+        def entrypoint(db_conn, **kwargs):
+            return "response"
+
+        response_cache = main.cache.ResponseCache(data_version_ttl=60)
+        get_db = mock.Mock(return_value=mock.Mock(execute=mock.Mock(return_value=[('games', 1)])))
+        with mock.patch.object(main, 'ROUTES', {'test': entrypoint}), \
+                mock.patch.object(main, 'response_cache', response_cache), \
+                mock.patch.object(main, 'get_db', get_db):
+            client = main.app.test_client()
+            first = client.get('/api/test')
+            self.assertEqual(get_db.call_count, 2)  # data version check, then the miss
+
+            second = client.get('/api/test')
+            not_modified = client.get('/api/test', headers={'If-None-Match': first.headers['ETag']})
+            self.assertEqual(second.get_data(as_text=True), "response")
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(get_db.call_count, 2)
+
+    def test_api_handler_accept(self):
+        """Test that the format is negotiated from the Accept header, unless the format param is given."""
+        def entrypoint(db_conn, **kwargs):
+            return kwargs['format'][0]
+
+        with mock.patch.object(main, 'ROUTES', {'test': entrypoint}), \
+                mock.patch.object(main, 'response_cache', main.cache.ResponseCache(data_version_ttl=60)), \
+                mock.patch.object(main, 'get_db', return_value=None), \
+                mock.patch.object(main.cache.ResponseCache, 'get_data_version', lambda self, db_conn: ()):
+            client = main.app.test_client()
+            self.assertEqual(client.get('/api/test').get_data(as_text=True), 'json')
+            response = client.get('/api/test', headers={'Accept': 'application/vnd.apache.parquet'})
+            self.assertEqual(response.get_data(as_text=True), 'parquet')
+            self.assertIn('Accept', response.vary)
+            response = client.get('/api/test?format=ndjson', headers={'Accept': 'application/vnd.apache.parquet'})
+            self.assertEqual(response.get_data(as_text=True), 'ndjson')
@@ -0,0 +1,118 @@
+# flake8: noqa
+import logging
+import os
+import subprocess
+import sys
+import threading
+import unittest
+from unittest import mock
+
+from pipeline import nflscrapr
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+FAKE_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/fake_worker.py')
+POPEN = subprocess.Popen
+
+
+def fake_popen(*worker_args):
+    """Popen starting the fake worker instead of the R one, whatever the command."""
+    return mock.Mock(side_effect=lambda command, **kwargs: POPEN(
+        [sys.executable, FAKE_WORKER_PATH, *worker_args], **kwargs
+    ))
+
+
+class TestNflscrapr(unittest.TestCase):
+
+    def setUp(self):
+        """Give every test its own workers, and stop them after it."""
+        patches = [
+            mock.patch.object(nflscrapr, '_local', threading.local()),
+            mock.patch.object(nflscrapr, '_workers', []),
+            mock.patch.object(nflscrapr, '_worker_unavailable', False),
+            mock.patch.object(nflscrapr.config, 'NFLSCRAPR_PERSISTENT_WORKER', True)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(nflscrapr.shutdown_workers)
+
+    def test_worker_run(self):
+        """Test that a job's output comes back with its status, and the worker stays up between jobs."""
+        with mock.patch.object(nflscrapr.subprocess, 'Popen', fake_popen()):
+            worker = nflscrapr.RWorker()
+        command = nflscrapr._get_command('games', season=2019, season_type='reg')
+
+        status, output = worker.run(command)
+        logger.debug(output)
+        self.assertEqual(status, 'OK')
+        self.assertTrue(output.startswith("running games with --year=2019 --type=reg"))
+
+        status, output = worker.run(nflscrapr._get_command('games', season=0, season_type='reg'))
+        self.assertEqual(status, 'ERROR no games found')
+        self.assertTrue(worker.alive)
+
+        worker.close()
+        self.assertFalse(worker.alive)
+
+    def test_run_on_worker(self):
+        """Test that jobs run on one worker per thread, and a failed job exits like a failed subprocess."""
+        with mock.patch.object(nflscrapr.subprocess, 'Popen', fake_popen()) as popen, \
+                mock.patch.object(nflscrapr, '_run_subprocess') as run_subprocess:
+            nflscrapr.run('games', season=2019, season_type='reg')
+            nflscrapr.run('games', season=2019, season_type='post')
+            self.assertEqual(popen.call_count, 1)
+            run_subprocess.assert_not_called()
+
+            with self.assertRaises(SystemExit):
+                nflscrapr.run('games', season=0, season_type='reg')
+            run_subprocess.assert_not_called()
+
+    def test_worker_death_falls_back(self):
+        """Test that a job whose worker dies runs as a subprocess, and the next job gets a new worker."""
+        with mock.patch.object(nflscrapr.subprocess, 'Popen', fake_popen()) as popen, \
+                mock.patch.object(nflscrapr, '_run_subprocess') as run_subprocess:
+            command = nflscrapr._get_command('games', season=-1, season_type='reg')
+            nflscrapr.run('games', season=-1, season_type='reg')
+            run_subprocess.assert_called_once_with(command)
+            self.assertEqual(nflscrapr._workers, [])
+            self.assertFalse(nflscrapr._worker_unavailable)
+
+            nflscrapr.run('games', season=2019, season_type='reg')
+            self.assertEqual(popen.call_count, 2)
+            self.assertEqual(run_subprocess.call_count, 1)
+
+    def test_worker_start_failure_falls_back(self):
+        """Test that a worker that fails to start is only tried once, every job then runs as a subprocess."""
+        with mock.patch.object(nflscrapr.subprocess, 'Popen', fake_popen('--no-start')) as popen, \
+                mock.patch.object(nflscrapr, '_run_subprocess') as run_subprocess:
+            with self.assertRaises(nflscrapr.RWorkerError) as cm:
+                nflscrapr.RWorker()
+            logger.debug(cm.exception)
+            self.assertIn("there is no package called", str(cm.exception))
+
+            nflscrapr.run('games', season=2019, season_type='reg')
+            nflscrapr.run('games', season=2019, season_type='post')
+            self.assertTrue(nflscrapr._worker_unavailable)
+            self.assertEqual(popen.call_count, 2)
+            self.assertEqual(run_subprocess.call_count, 2)
+
+    def test_shutdown_workers(self):
+        """Test that every thread's worker is stopped."""
+        workers = []
+        with mock.patch.object(nflscrapr.subprocess, 'Popen', fake_popen()):
+            workers.append(nflscrapr._get_worker())
+            thread = threading.Thread(target=lambda: workers.append(nflscrapr._get_worker()))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(workers), 2)
+        self.assertIsNot(workers[0], workers[1])
+        nflscrapr.shutdown_workers()
+        self.assertEqual(nflscrapr._workers, [])
+        self.assertFalse(any(worker.alive for worker in workers))
+
+
+if __name__ == '__main__':
+    unittest.main()
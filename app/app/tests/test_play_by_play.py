@@ -0,0 +1,128 @@
+# flake8: noqa
+import logging
+import unittest
+from unittest import mock
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
+
+import pandas as pd
+
+import models
+from pipeline import (
+    etl_tools,
+    nflscrapr,
+    play_by_play,
+    player_stats,
+    players,
+    team_stats
+)
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestPlayByPlay(unittest.TestCase):
+
+    def test_get_executor(self):
+        """Test that the pool type and size are validated."""
+        with self.assertRaises(ValueError) as cm:
+            play_by_play._get_executor('blah', 2)
+        logger.debug(cm.exception)
+
+        with self.assertRaises(ValueError) as cm:
+            play_by_play._get_executor('thread', 0)
+        logger.debug(cm.exception)
+
+        with play_by_play._get_executor('thread', 2) as executor:
+            self.assertIsInstance(executor, ThreadPoolExecutor)
+
+        with play_by_play._get_executor('process', 2) as executor:
+            self.assertIsInstance(executor, ProcessPoolExecutor)
+
+    def test_get_batches(self):
+        """Test that every game lands in exactly one batch of at most batch_size."""
+        with self.assertRaises(ValueError) as cm:
+            play_by_play._get_batches(list(play_by_play.TEST_GAME_IDS), 0)
+        logger.debug(cm.exception)
+
+        game_ids = list(range(2017090700, 2017090770))
+        batches = play_by_play._get_batches(game_ids, 32)
+        self.assertEqual([len(batch) for batch in batches], [32, 32, 6])
+        self.assertEqual([game_id for batch in batches for game_id in batch], game_ids)
+        self.assertEqual(play_by_play._get_batches([], 32), [])
+
+    def test_split_by_season(self):
+        """Test that plays are split by the season of their game, playoffs in February included."""
+        game_ids = [2017090700, 2018020400, 2018090600, 2019020300]
+        self.assertEqual([models.game_id_season(game_id) for game_id in game_ids], [2017, 2017, 2018, 2018])
+
+        df = pd.DataFrame({'game_id': game_ids, 'play_id': [1, 2, 3, 4]})
+        seasons = play_by_play._split_by_season(df)
+        self.assertEqual(list(seasons), [2017, 2018])
+        self.assertEqual(list(seasons[2017]['play_id']), [1, 2])
+        self.assertEqual(list(seasons[2018]['play_id']), [3, 4])
+
+    def test_reload_season(self):
+        """Test that a reload recomputes the derived tables of the season's games, replacing participants
+        and player stats, after the partition swap, then bumps every reloaded table's version."""
+        game_ids = [2017090700, 2017091007]
+        manager = mock.Mock()
+        with mock.patch.object(play_by_play.db, 'get_db_eng', return_value='db'), \
+                mock.patch.object(play_by_play, '_extract_season_game_ids',
+                                  return_value=pd.DataFrame({'game_id': game_ids})), \
+                mock.patch.object(play_by_play, '_extract_batches',
+                                  return_value=[(game_ids, pd.DataFrame({'game_id': game_ids, 'play_id': [1, 1]}))]), \
+                mock.patch.object(etl_tools, 'load_to_db', manager.load_to_db), \
+                mock.patch.object(play_by_play, 'export_season', manager.export_season), \
+                mock.patch.object(team_stats, 'refresh', manager.team_stats_refresh), \
+                mock.patch.object(players, 'refresh', manager.players_refresh), \
+                mock.patch.object(player_stats, 'refresh', manager.player_stats_refresh), \
+                mock.patch.object(etl_tools, 'bump_data_version', manager.bump_data_version):
+            play_by_play.reload_season(2017)
+
+        names = [name for name, _, _ in manager.mock_calls]
+        self.assertEqual(names[:5], ['load_to_db', 'export_season', 'team_stats_refresh', 'players_refresh',
+                                     'player_stats_refresh'])
+        self.assertEqual(manager.players_refresh.call_args, mock.call('db', game_ids, replace=True))
+        self.assertEqual(manager.player_stats_refresh.call_args, mock.call('db', game_ids, replace=True))
+        self.assertEqual([args[1] for _, args, _ in manager.mock_calls[5:]], list(play_by_play.RELOADED_TABLES))
+
+    def test_refresh_replace(self):
+        """Test that a replacing refresh deletes the games' rows before upserting, in the same transaction."""
+        db_eng = mock.MagicMock()
+        conn = db_eng.begin.return_value.__enter__.return_value
+        players.refresh(db_eng, [2017090700], replace=True)
+        queries = [str(args[0]) for _, args, _ in conn.execute.mock_calls]
+        self.assertEqual(queries[0], players.DELETE_PLAY_PARTICIPANTS_QUERY)
+        self.assertEqual(len(queries), 3)
+
+        conn.reset_mock()
+        player_stats.refresh(db_eng, [2017090700])
+        queries = [str(args[0]) for _, args, _ in conn.execute.mock_calls]
+        self.assertNotIn(player_stats.DELETE_PLAYER_GAME_STATS_QUERY, queries)
+
+    def test_play_by_play_command(self):
+        """Test that the job can take one game, a batch of games or a season, and its own dump file."""
+        command = nflscrapr._get_command('play_by_play', game_id=2017090700, file='/tmp/dump_2017090700.csv')
+        self.assertIn('--game=2017090700', command)
+        self.assertIn('--file=/tmp/dump_2017090700.csv', command)
+
+        command = nflscrapr._get_command('play_by_play', game_ids=play_by_play.TEST_GAME_IDS)
+        self.assertIn('--game=2017090700,2017091007,2017091008', command)
+
+        command = nflscrapr._get_command('play_by_play', season=2017, season_type='reg', weeks=[1, 2])
+        self.assertEqual(command[2:5], ['--year=2017', '--type=reg', '--weeks=1,2'])
+
+        with self.assertRaises(ValueError) as cm:
+            nflscrapr._get_command('play_by_play', game_ids=[])
+        logger.debug(cm.exception)
+
+        with self.assertRaises(ValueError) as cm:
+            nflscrapr._get_command('play_by_play')
+        logger.debug(cm.exception)
+
+
+if __name__ == '__main__':
+    unittest.main()
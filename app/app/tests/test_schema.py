@@ -0,0 +1,69 @@
+# flake8: noqa
+import logging
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import models
+from pipeline import schema
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+class TestSchema(unittest.TestCase):
+
+    def test_get_dtypes(self):
+        """Test that columns get a dtype sized for what they hold, and long strings are left alone."""
+        dtypes = schema.get_dtypes(models.PlayByPlay)
+        self.assertTrue(set(dtypes) < {column.name for column in models.PlayByPlay.__table__.columns})
+
+        expected_dtypes = {
+            'game_id': 'Int32',
+            'play_id': 'Int16',
+            'game_seconds_remaining': 'Int16',
+            'yards_gained': 'Int16',
+            'score_differential': 'Int16',
+            'down': 'Int8',
+            'touchdown': 'Int8',
+            'epa': 'float64',
+            'posteam': 'category',
+            'game_date': schema.DATETIME_DTYPE
+        }
+        for column, dtype in expected_dtypes.items():
+            self.assertEqual(dtypes[column], dtype, column)
+
+        for column in ('penalty_type', 'desc', 'time'):
+            self.assertNotIn(column, dtypes)
+
+        self.assertEqual(schema.get_dtypes(models.Game)['season'], 'Int16')
+        self.assertEqual(schema.get_dtypes(models.Game)['week'], 'Int8')
+
+        # only known small columns are Int8, anything else falls back to Int32
+        player_dtypes = schema.get_dtypes(models.PlayerGameStats)
+        for column in ('completions', 'carries', 'interceptions', 'sacks', 'passing_tds'):
+            self.assertEqual(player_dtypes[column], schema.INT_FALLBACK_DTYPE, column)
+        self.assertEqual(schema.get_dtypes(models.DataVersion)['version'], schema.INT_FALLBACK_DTYPE)
+        self.assertEqual(dtypes['interception'], 'Int8')
+        self.assertTrue(schema.INT8_COLUMNS <= {column.name for column in models.PlayByPlay.__table__.columns} | {'week', 'is_home'})
+
+    def test_apply_dtypes(self):
+        """Test that columns are cast, nulls survive, and columns missing from dtypes are untouched."""
+        df = pd.DataFrame({
+            'game_id': [2017090700.0, np.nan],
+            'posteam': ['NE', None],
+            'game_date': ['2017-09-07', None],
+            'not_a_column': [1, 2]
+        })
+        df = schema.apply_dtypes(df, schema.get_dtypes(models.PlayByPlay))
+
+        self.assertEqual(str(df['game_id'].dtype), 'Int32')
+        self.assertTrue(pd.isna(df['game_id'][1]))
+        self.assertEqual(str(df['posteam'].dtype), 'category')
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['game_date']))
+        self.assertEqual(df['not_a_column'].dtype, np.int64)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# flake8: noqa
+import logging
+import unittest
+
+from werkzeug.exceptions import BadRequest
+
+import main  # puts api/ on the path
+import models
+from pipeline import team_stats
+import team_stats as api_team_stats
+
+logger = logging.getLogger('test_logger')
+logger.setLevel(logging.DEBUG)
+
+
+def get_columns(model):
+    return [column.name for column in model.__table__.columns]
+
+
+class TestTeamStats(unittest.TestCase):
+
+    def test_columns(self):
+        """Test that the upserts write every column of the tables, in the order of the models."""
+        self.assertEqual(list(team_stats.TEAM_GAME_STATS_COLUMNS), get_columns(models.TeamGameStats))
+        self.assertEqual(list(team_stats.TEAM_SEASON_STATS_COLUMNS), get_columns(models.TeamSeasonStats))
+
+        query = team_stats._get_team_game_stats_query()
+        logger.debug(query)
+        self.assertIn("COUNT(*) FILTER (WHERE down = 3 AND epa > 0) AS successes_down_3", query)
+        self.assertIn("COALESCE(def_epa, 0)", query)
+        self.assertIn("ROW(EXCLUDED.season, EXCLUDED.type", query)
+        self.assertNotIn("EXCLUDED.game_id", query)
+
+        query = team_stats._get_team_season_stats_query()
+        logger.debug(query)
+        self.assertIn("SUM(successes_down_3)", query)
+        self.assertNotIn("EXCLUDED.team", query)
+
+    def test_build_queries(self):
+        """Test that the api queries of both tables filter with bind params, and only games is paginated."""
+        query, params, limit = api_team_stats._build_season_query({'season': ['2019'], 'team': ['ne'], 'week': ['1']})
+        logger.debug(query)
+        self.assertIsNone(limit)
+        self.assertEqual(params, {'season': [2019], 'team': ['NE'], 'fetch_limit': None})
+        self.assertIn("points_for::float / NULLIF(games, 0) AS points_per_game", query)
+        self.assertNotIn("week", query)
+
+        query, params, limit = api_team_stats._build_games_query({'week': ['1'], 'after': ['2019090800,ne']})
+        logger.debug(query)
+        self.assertEqual(params['after_team'], 'NE')
+        self.assertIn("(game_id, team) > (:after_game_id, :after_team)", query)
+        self.assertNotIn("points_per_game", query)
+        self.assertEqual(params['fetch_limit'], limit + 1)
+
+        with self.assertRaises(BadRequest) as cm:
+            api_team_stats._build_games_query({'after': ['2019090800']})
+        logger.debug(cm.exception)
+
+    def test_routes(self):
+        """Test that both entrypoints are routed."""
+        self.assertIs(main.ROUTES['team_stats'], api_team_stats.main)
+        self.assertIs(main.ROUTES['team_stats/games'], api_team_stats.games)